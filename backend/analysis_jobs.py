@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from models import JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Job documents in db.analysis_jobs:
+#
+#   id, user_id, kind, payload       what to run
+#   status                           queued, running, completed, failed
+#   result, error                    set when the job finishes
+#   created_at, started_at, finished_at
+#   owner, heartbeat_at              queue instance holding the job in its local
+#                                    queue or running it, refreshed meanwhile
+#   expires_at                       set on completion; a TTL index removes the job
+#
+# A queued or running job whose heartbeat is older than stale_after belongs to
+# an instance that died and is taken over; jobs of live peers are left alone.
+ACTIVE_STATUSES = ["queued", "running"]
+
+# Called with the job payload and the submitting user's id
+JobHandler = Callable[[dict, str], Awaitable[dict]]
+
+class AnalysisJobQueue:
+    """
+    Mongo-backed job queue for analyses too heavy for a synchronous request.
+
+    Jobs are persisted before they are queued, so queued and interrupted jobs
+    are picked up again on the next start. A fixed number of local workers
+    run the registered handler for each job kind. Several instances can share
+    one collection: each heartbeats the jobs it holds or runs and takes over
+    jobs whose heartbeat has gone stale.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        workers: int = 2,
+        max_active_per_user: int = 3,
+        result_ttl: float = 24 * 60 * 60,
+        heartbeat_interval: float = 15,
+        stale_after: float = 60
+    ):
+        self.db = db
+        self.workers = workers
+        self.max_active_per_user = max_active_per_user
+        self.result_ttl = result_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.owner = str(uuid.uuid4())
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._running: Set[str] = set()
+        # Jobs in our local queue, not yet picked up by a worker
+        self._queued: Set[str] = set()
+
+        # Counters exposed through metrics()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.requeued = 0
+
+    def register(self, kind: str, handler: JobHandler):
+        """Register the coroutine that runs jobs of a given kind"""
+        self._handlers[kind] = handler
+
+    async def start(self):
+        """Take over stale jobs and start the workers"""
+        await self._requeue_stale()
+
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+        self._monitor_task = asyncio.create_task(self._monitor())
+
+    async def stop(self):
+        """Stop the workers; a job cut off mid-run is requeued by the next start or a peer"""
+        tasks = self._tasks + ([self._monitor_task] if self._monitor_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._monitor_task = None
+
+        # Mark our waiting and interrupted jobs stale right away instead of after stale_after
+        held = self._running | self._queued
+        if held:
+            await self.db.analysis_jobs.update_many(
+                {"id": {"$in": list(held)}, "status": {"$in": ACTIVE_STATUSES}, "owner": self.owner},
+                {"$set": {"heartbeat_at": None}}
+            )
+            self._running.clear()
+            self._queued.clear()
+
+    async def submit(self, user_id: str, kind: str, payload: dict) -> JobStatus:
+        """Persist and queue a job, enforcing the per-user limit on active jobs"""
+        if kind not in self._handlers:
+            raise HTTPException(status_code=400, detail=f"Unknown job kind: {kind}")
+
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "kind": kind,
+            "payload": payload,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "expires_at": None,
+            "owner": self.owner,
+            "heartbeat_at": now
+        }
+        await self.db.analysis_jobs.insert_one(job)
+        job.pop("_id", None)
+
+        # Insert first, then count the active jobs submitted up to and
+        # including this one: of several concurrent submits only those that
+        # fit under the limit survive, where a count before the insert would
+        # let them all through
+        active = await self.db.analysis_jobs.count_documents({
+            "user_id": user_id,
+            "status": {"$in": ACTIVE_STATUSES},
+            "$or": [
+                {"created_at": {"$lt": job["created_at"]}},
+                {"created_at": job["created_at"], "id": {"$lte": job["id"]}}
+            ]
+        })
+        if active > self.max_active_per_user:
+            await self.db.analysis_jobs.delete_one({"id": job["id"]})
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"At most {self.max_active_per_user} jobs can be queued or running at once"
+            )
+
+        self._enqueue(job["id"])
+        self.submitted += 1
+        return JobStatus(**job)
+
+    async def get(self, job_id: str, user_id: str) -> Optional[JobStatus]:
+        """A user's job by id, None if missing, expired or owned by someone else"""
+        doc = await self.db.analysis_jobs.find_one(
+            {"id": job_id, "user_id": user_id}, {"_id": 0, "payload": 0}
+        )
+        return JobStatus(**doc) if doc else None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        return {
+            "queued": self._queue.qsize(),
+            "workers": len(self._tasks),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "requeued": self.requeued,
+            "running": len(self._running)
+        }
+
+    def _enqueue(self, job_id: str):
+        self._queued.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def _requeue_stale(self):
+        # Queued or running jobs with no recent heartbeat, or none at all
+        # (released by stop, or written before heartbeats were recorded)
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        stale = {
+            "status": {"$in": ACTIVE_STATUSES},
+            "$or": [{"heartbeat_at": {"$lt": cutoff}}, {"heartbeat_at": None}]
+        }
+        async for doc in self.db.analysis_jobs.find(stale, {"id": 1}).sort("created_at", 1):
+            if doc["id"] in self._queued:
+                continue
+            # Re-check the heartbeat in the update so a job revived meanwhile stays put
+            requeued = await self.db.analysis_jobs.find_one_and_update(
+                {**stale, "id": doc["id"]},
+                {"$set": {
+                    "status": "queued", "started_at": None,
+                    "owner": self.owner, "heartbeat_at": datetime.utcnow()
+                }}
+            )
+            if requeued is not None:
+                logger.warning(
+                    f"Took over {requeued['status']} job {doc['id']} from owner {requeued.get('owner')}"
+                )
+                self.requeued += 1
+                self._enqueue(doc["id"])
+
+    async def _monitor(self):
+        # Heartbeat the jobs we hold and take over those of dead peers
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                held = self._running | self._queued
+                if held:
+                    await self.db.analysis_jobs.update_many(
+                        {"id": {"$in": list(held)}, "status": {"$in": ACTIVE_STATUSES}, "owner": self.owner},
+                        {"$set": {"heartbeat_at": datetime.utcnow()}}
+                    )
+                await self._requeue_stale()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {e}")
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error for {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        # Claim atomically so a job is never run twice
+        now = datetime.utcnow()
+        job = await self.db.analysis_jobs.find_one_and_update(
+            {"id": job_id, "status": "queued", "owner": self.owner},
+            {"$set": {"status": "running", "started_at": now, "owner": self.owner, "heartbeat_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            return
+
+        self._running.add(job_id)
+        update: Dict[str, Any]
+        try:
+            result = await self._handlers[job["kind"]](job["payload"], job["user_id"])
+            update = {"status": "completed", "result": result}
+            self.completed += 1
+        except HTTPException as e:
+            update = {"status": "failed", "error": str(e.detail)}
+            self.failed += 1
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            update = {"status": "failed", "error": str(e)}
+            self.failed += 1
+        # Left in _running when cancelled, so stop can flag the job
+        self._running.discard(job_id)
+
+        finished_at = datetime.utcnow()
+        update.update({
+            "finished_at": finished_at,
+            "expires_at": finished_at + timedelta(seconds=self.result_ttl)
+        })
+        # Only while still ours; a job taken over as stale belongs to its new owner
+        await self.db.analysis_jobs.update_one({"id": job_id, "owner": self.owner}, {"$set": update})
@@ -27,6 +27,7 @@ class User(BaseModel):
     hashed_password: str
     subscription_status: str = "inactive"  # inactive, active, cancelled
     subscription_id: Optional[str] = None
+    subscription_plan: Optional[str] = None  # package id: monthly, yearly
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -1,30 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import hashlib
+import os
 import secrets
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from auth_models import User, UserCreate, PasswordResetToken
+from cache import TTLCache
 
 # Security configuration
 SECRET_KEY = "poker_calculator_secret_key_change_in_production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Decoded payloads of verified tokens, keyed by token digest. Entries never
+# outlive the token's own exp claim.
+token_cache = TTLCache(
+    max_size=int(os.environ.get('TOKEN_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('TOKEN_CACHE_TTL', 300))
+)
+
+# bcrypt work factor for new hashes; existing hashes keep verifying and are
+# upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt is CPU bound and releases the GIL, so hashing runs on its own small
+# pool instead of blocking the event loop. The pool size caps how many hashes
+# run at once; further requests queue.
+password_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 4)),
+    thread_name_prefix="password-hash"
+)
+
+# Users by id, shared by all AuthService instances in this process. Writes
+# through AuthService invalidate their entry; the TTL bounds staleness from
+# writes made by other processes.
+user_cache = TTLCache(
+    max_size=int(os.environ.get('USER_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('USER_CACHE_TTL', 60))
+)
 
 class AuthService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a plaintext password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            password_executor, pwd_context.verify, plain_password, hashed_password
+        )
+    
+    async def verify_and_update_password(self, plain_password: str, hashed_password: str):
+        """Verify a password, also returning a new hash if the stored one is outdated"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            password_executor, pwd_context.verify_and_update, plain_password, hashed_password
+        )
     
-    def get_password_hash(self, password: str) -> str:
+    async def get_password_hash(self, password: str) -> str:
         """Generate password hash"""
-        return pwd_context.hash(password)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, pwd_context.hash, password)
     
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
         """Create JWT access token"""
@@ -40,11 +84,23 @@ class AuthService:
     
     def verify_token(self, token: str) -> Optional[dict]:
         """Verify JWT token and return payload"""
+        digest = hashlib.sha256(token.encode()).digest()
+        payload = token_cache.get(digest)
+        if payload is not None:
+            return dict(payload)
+        
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
         except JWTError:
             return None
+        
+        # Only cache tokens that carry an expiry, and never past it
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            remaining = exp - time.time()
+            if remaining > 0:
+                token_cache.set(digest, dict(payload), ttl=min(remaining, token_cache.ttl))
+        return payload
     
     async def get_user_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
@@ -55,10 +111,15 @@ class AuthService:
     
     async def get_user_by_id(self, user_id: str) -> Optional[User]:
         """Get user by ID"""
-        user_data = await self.db.users.find_one({"id": user_id})
-        if user_data:
-            return User(**user_data)
-        return None
+        # The cache holds the raw document; each request gets its own User
+        user_data = user_cache.get(user_id)
+        if user_data is None:
+            generation = user_cache.generation()
+            user_data = await self.db.users.find_one({"id": user_id}, {"_id": 0})
+            if not user_data:
+                return None
+            user_cache.set(user_id, user_data, generation=generation)
+        return User(**user_data)
     
     async def create_user(self, user_create: UserCreate) -> User:
         """Create new user"""
@@ -74,7 +135,7 @@ class AuthService:
         user = User(
             name=user_create.name,
             email=user_create.email,
-            hashed_password=self.get_password_hash(user_create.password)
+            hashed_password=await self.get_password_hash(user_create.password)
         )
         
         # Save to database
@@ -86,8 +147,18 @@ class AuthService:
         user = await self.get_user_by_email(email)
         if not user:
             return None
-        if not self.verify_password(password, user.hashed_password):
+        valid, new_hash = await self.verify_and_update_password(password, user.hashed_password)
+        if not valid:
             return None
+        
+        # Rehash with the current work factor
+        if new_hash:
+            await self.db.users.update_one(
+                {"id": user.id},
+                {"$set": {"hashed_password": new_hash, "updated_at": datetime.utcnow()}}
+            )
+            user_cache.invalidate(user.id)
+            user.hashed_password = new_hash
         return user
     
     async def create_password_reset_token(self, user_id: str) -> str:
@@ -123,7 +194,7 @@ class AuthService:
             return False
         
         # Update password
-        hashed_password = self.get_password_hash(new_password)
+        hashed_password = await self.get_password_hash(new_password)
         await self.db.users.update_one(
             {"id": reset_token.user_id},
             {
@@ -134,6 +205,8 @@ class AuthService:
             }
         )
         
+        user_cache.invalidate(reset_token.user_id)
+        
         # Mark token as used
         await self.db.password_reset_tokens.update_one(
             {"token": token},
@@ -147,7 +220,13 @@ class AuthService:
         
         return True
     
-    async def update_user_subscription(self, user_id: str, subscription_status: str, subscription_id: Optional[str] = None):
+    async def update_user_subscription(
+        self,
+        user_id: str,
+        subscription_status: str,
+        subscription_id: Optional[str] = None,
+        subscription_plan: Optional[str] = None
+    ):
         """Update user subscription status"""
         update_data = {
             "subscription_status": subscription_status,
@@ -156,8 +235,11 @@ class AuthService:
         
         if subscription_id:
             update_data["subscription_id"] = subscription_id
+        if subscription_plan:
+            update_data["subscription_plan"] = subscription_plan
         
         await self.db.users.update_one(
             {"id": user_id},
             {"$set": update_data}
-        )
\ No newline at end of file
+        )
+        user_cache.invalidate(user_id)
\ No newline at end of file
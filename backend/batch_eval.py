@@ -0,0 +1,114 @@
+import itertools
+from collections import Counter
+from typing import List
+import numpy as np
+from treys import Card as TreysCard, Evaluator
+
+# Vectorized hand evaluation over numpy arrays of card indices.
+#
+# Cards are indexed 0..51 as rank * 4 + suit, rank 0 = deuce .. 12 = ace and
+# suit 0..3 = clubs, diamonds, hearts, spades (the same codes as hand_history).
+# Scores match treys: 1 is a royal flush, 7462 is seven high, lower is better.
+
+RANK_CHARS = "23456789TJQKA"
+SUIT_CHARS = "cdhs"
+
+# treys suit bits (spades=1, hearts=2, diamonds=4, clubs=8) to suit index
+_TREYS_SUIT_INDEX = {8: 0, 4: 1, 2: 2, 1: 3}
+
+# Base-13 place values for five sorted ranks
+_RANK_PLACES = np.array([13 ** 4, 13 ** 3, 13 ** 2, 13, 1], dtype=np.int32)
+
+# The 21 five-card subsets of seven cards
+SUBSETS_7 = np.array(list(itertools.combinations(range(7), 5)), dtype=np.intp)
+
+# Board subsets combined with one or two hole cards
+_BOARD_FOURS = np.array(list(itertools.combinations(range(5), 4)), dtype=np.intp)
+_BOARD_THREES = np.array(list(itertools.combinations(range(5), 3)), dtype=np.intp)
+
+# All 1326 two-card combos as (first, second) with first < second
+COMBOS = np.array(list(itertools.combinations(range(52), 2)), dtype=np.intp)
+
+def card_index(card_int: int) -> int:
+    """Index in [0, 52) of a treys card"""
+    return ((card_int >> 8) & 0xF) * 4 + _TREYS_SUIT_INDEX[(card_int >> 12) & 0xF]
+
+def treys_card(index: int) -> int:
+    """treys card for an index in [0, 52)"""
+    return TreysCard.new(RANK_CHARS[index // 4] + SUIT_CHARS[index % 4])
+
+def card_mask(indices) -> np.ndarray:
+    """52-bit uint64 masks over the last axis of an index array"""
+    bits = np.left_shift(np.uint64(1), np.asarray(indices, dtype=np.uint64))
+    return np.bitwise_or.reduce(bits, axis=-1)
+
+def _build_tables():
+    evaluator = Evaluator()
+
+    # Unsuited five-card hands, indexed by ranks sorted high to low in base 13.
+    # Suits are assigned so that no hand is a flush.
+    rank_table = np.zeros(13 ** 5, dtype=np.int16)
+    for ranks in itertools.combinations_with_replacement(range(12, -1, -1), 5):
+        if max(Counter(ranks).values()) > 4:
+            continue
+        seen: Counter = Counter()
+        cards = []
+        for rank in ranks:
+            cards.append(rank * 4 + seen[rank])
+            seen[rank] += 1
+        if len(set(ranks)) == 5:
+            cards[0] += 1
+        treys_cards = [treys_card(card) for card in cards]
+        rank_table[int(np.dot(ranks, _RANK_PLACES))] = evaluator.evaluate(treys_cards[:2], treys_cards[2:])
+
+    # Flushes, indexed by the 13-bit rank mask
+    flush_table = np.zeros(1 << 13, dtype=np.int16)
+    for ranks in itertools.combinations(range(13), 5):
+        treys_cards = [treys_card(rank * 4 + 3) for rank in ranks]
+        flush_table[sum(1 << rank for rank in ranks)] = evaluator.evaluate(treys_cards[:2], treys_cards[2:])
+
+    return rank_table, flush_table
+
+RANK_TABLE, FLUSH_TABLE = _build_tables()
+
+def evaluate5(cards: np.ndarray) -> np.ndarray:
+    """Scores of five-card hands along the last axis"""
+    ranks = cards >> 2
+    suits = cards & 3
+    score = RANK_TABLE[np.sort(ranks, axis=-1)[..., ::-1] @ _RANK_PLACES]
+
+    flush = (suits == suits[..., :1]).all(axis=-1)
+    if flush.any():
+        rank_mask = np.bitwise_or.reduce(np.left_shift(1, ranks[flush]), axis=-1)
+        score[flush] = FLUSH_TABLE[rank_mask]
+    return score
+
+def evaluate7(cards: np.ndarray) -> np.ndarray:
+    """Scores of seven-card hands along the last axis, best five-card subset"""
+    return evaluate5(cards[..., SUBSETS_7]).min(axis=-1)
+
+def evaluate_combos(board: List[int]) -> np.ndarray:
+    """
+    Scores of all 1326 COMBOS on a complete five-card board of indices
+
+    Of the 21 subsets of hole cards plus board, only the ten that use both
+    hole cards depend on the combo. The five that use one hole card are
+    scored once per card and the board-only hand once, which halves the
+    number of five-card evaluations.
+    """
+    board = np.asarray(board, dtype=np.intp)
+    board_only = evaluate5(board[None, :])[0]
+
+    single = np.concatenate([
+        np.repeat(np.arange(52), len(_BOARD_FOURS))[:, None],
+        np.tile(board[_BOARD_FOURS], (52, 1))
+    ], axis=1)
+    per_card = evaluate5(single).reshape(52, len(_BOARD_FOURS)).min(axis=1)
+
+    pairs = np.concatenate([
+        np.repeat(COMBOS, len(_BOARD_THREES), axis=0),
+        np.tile(board[_BOARD_THREES], (len(COMBOS), 1))
+    ], axis=1)
+    both = evaluate5(pairs).reshape(len(COMBOS), len(_BOARD_THREES)).min(axis=1)
+
+    return np.minimum(np.minimum(both, board_only), np.minimum(per_card[COMBOS[:, 0]], per_card[COMBOS[:, 1]]))
@@ -0,0 +1,140 @@
+import itertools
+from dataclasses import dataclass, replace
+from typing import List, Optional, Tuple
+import numpy as np
+from batch_eval import COMBOS, card_mask, evaluate5, evaluate_combos, treys_card
+from canonical import canonicalize, permute
+from hand_tables import RANK_NAMES, STRAIGHT_WINDOWS, classify_cards
+
+# Board texture from rank and suit bitmasks, plus where a holding stands
+# among every opponent combo on the board.
+#
+# Cards are batch_eval indices, rank * 4 + suit. Texture depends on the board
+# only up to a relabeling of suits, so the expensive part (scoring all 1,326
+# combos) is cached per canonical board and hero's cards are mapped into the
+# canonical suits before they are looked up.
+
+COMBO_MASKS = card_mask(COMBOS)
+
+# Position in COMBOS of each unordered pair of card indices
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.intp)
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(len(COMBOS))
+COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(len(COMBOS))
+
+# Combos holding each card, shape (52, 1326)
+CARD_COMBOS = (COMBOS[None, :, 0] == np.arange(52)[:, None]) | (COMBOS[None, :, 1] == np.arange(52)[:, None])
+
+# Score given to combos that share a card with the board; worse than any hand
+BLOCKED_SCORE = np.iinfo(np.int16).max
+
+@dataclass
+class BoardTexture:
+    paired: bool
+    trips: bool
+    monotone: bool
+    two_tone: bool
+    rainbow: bool
+    flush_possible: bool
+    flush_draw_possible: bool
+    straight_possible: bool
+    connectedness: int
+    high_card: str
+    nut_hand: str
+    nut_combos: int
+    combos: Optional[int] = None
+    combos_beating: Optional[int] = None
+    combos_tying: Optional[int] = None
+
+@dataclass
+class _BoardScores:
+    texture: BoardTexture
+    scores: np.ndarray
+    valid: np.ndarray
+
+def board_features(board: List[int]) -> dict:
+    """Texture flags of a board from its rank and suit bitmasks"""
+    rank_mask = pair_mask = trips_mask = 0
+    suit_counts = [0, 0, 0, 0]
+    for card in board:
+        bit = 1 << (card >> 2)
+        if pair_mask & bit:
+            trips_mask |= bit
+        elif rank_mask & bit:
+            pair_mask |= bit
+        rank_mask |= bit
+        suit_counts[card & 3] += 1
+
+    suits = sum(1 for count in suit_counts if count)
+    most = max(suit_counts)
+    # Most board ranks inside any one five-rank straight window
+    connectedness = max(bin(rank_mask & window).count("1") for window, _ in STRAIGHT_WINDOWS)
+    return dict(
+        paired=pair_mask != 0,
+        trips=trips_mask != 0,
+        monotone=suits == 1,
+        two_tone=suits == 2,
+        rainbow=suits == len(board),
+        flush_possible=most >= 3,
+        flush_draw_possible=most == 2 and len(board) < 5,
+        straight_possible=connectedness >= 3,
+        connectedness=connectedness,
+        high_card=RANK_NAMES[rank_mask.bit_length() - 1]
+    )
+
+def combo_scores(board: List[int]) -> np.ndarray:
+    """treys scores of all 1,326 COMBOS played with a 3- to 5-card board"""
+    if len(board) == 5:
+        return evaluate_combos(board)
+    cards = np.concatenate([COMBOS, np.broadcast_to(np.asarray(board, dtype=np.intp), (len(COMBOS), len(board)))], axis=1)
+    subsets = np.array(list(itertools.combinations(range(len(board) + 2), 5)), dtype=np.intp)
+    return evaluate5(cards[:, subsets]).min(axis=1)
+
+def _board_scores(board: Tuple[int, ...]) -> _BoardScores:
+    valid = (COMBO_MASKS & card_mask(board)) == 0
+    scores = np.where(valid, combo_scores(list(board)), BLOCKED_SCORE).astype(np.int16)
+
+    nut = int(scores.argmin())
+    nut_cards = [treys_card(card) for card in (*COMBOS[nut], *board)]
+    texture = BoardTexture(
+        nut_hand=classify_cards(nut_cards)[1],
+        nut_combos=int((scores == scores[nut]).sum()),
+        **board_features(list(board))
+    )
+    return _BoardScores(texture=texture, scores=scores, valid=valid)
+
+def analyze_board(board: List[int], hole_cards: Optional[List[int]] = None, cache=None) -> BoardTexture:
+    """
+    Texture of a flop, turn or river, and hero's rank among opponent combos
+
+    With hole cards, counts the opponent holdings left after removing the
+    board and hero's cards (1,081 on the flop), and how many of them beat or
+    tie hero right now. The per-board part is stored in cache (a TTLCache or
+    anything with get and set) under the canonical board. Raises ValueError
+    for boards outside 3 to 5 cards and for repeated cards.
+    """
+    if not 3 <= len(board) <= 5:
+        raise ValueError("Board texture needs 3 to 5 community cards")
+    hole_cards = hole_cards or []
+    if len(set(board) | set(hole_cards)) != len(board) + len(hole_cards):
+        raise ValueError("Duplicate cards detected")
+
+    canonical = canonicalize(board=board)
+    key = canonical.situation.board
+    entry = cache.get(key) if cache is not None else None
+    if entry is None:
+        entry = _board_scores(key)
+        if cache is not None:
+            cache.set(key, entry)
+
+    if len(hole_cards) != 2:
+        return replace(entry.texture)
+
+    first, second = permute(hole_cards, canonical.perm)
+    hero_score = entry.scores[COMBO_INDEX[first, second]]
+    opponents = entry.valid & ~CARD_COMBOS[first] & ~CARD_COMBOS[second]
+    return replace(
+        entry.texture,
+        combos=int(opponents.sum()),
+        combos_beating=int((opponents & (entry.scores < hero_score)).sum()),
+        combos_tying=int((opponents & (entry.scores == hero_score)).sum())
+    )
@@ -0,0 +1,139 @@
+import itertools
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+from batch_eval import treys_card
+
+# Canonical forms of poker situations under suit isomorphism.
+#
+# A situation is hero's hole cards, the board and any dead cards, each an
+# unordered group of batch_eval card indices (rank * 4 + suit). Relabeling the
+# suits never changes equities, so every situation is mapped to one
+# representative of its class: each suit gets a signature made of its rank
+# masks in the hole, board and dead groups, the suits are sorted by signature
+# (largest first) and renumbered in that order, and each group is sorted.
+# Suits with equal signatures are interchangeable, so the result does not
+# depend on how ties are broken. The sorted signatures packed into one
+# integer identify the class.
+
+# Board cards known on each street
+STREET_BOARD_CARDS = {"preflop": 0, "flop": 3, "turn": 4, "river": 5}
+
+# Bits per group in a suit signature and per suit in a key
+_GROUP_BITS = 13
+_SUIT_BITS = 3 * _GROUP_BITS
+
+# treys card <-> index lookups
+TREYS_CARDS = [treys_card(index) for index in range(52)]
+CARD_INDICES = {card: index for index, card in enumerate(TREYS_CARDS)}
+
+class Situation(NamedTuple):
+    hole: Tuple[int, ...]
+    board: Tuple[int, ...] = ()
+    dead: Tuple[int, ...] = ()
+
+@dataclass
+class Canonical:
+    situation: Situation
+    # perm[original suit] = canonical suit
+    perm: Tuple[int, int, int, int]
+    key: int
+
+    @property
+    def weight(self) -> int:
+        """Distinct situations in the class, 24 / number of suit symmetries"""
+        mask = (1 << _SUIT_BITS) - 1
+        signatures = [self.key >> (_SUIT_BITS * i) & mask for i in range(4)]
+        return 24 // math.prod(math.factorial(count) for count in Counter(signatures).values())
+
+def _signatures(hole: Iterable[int], board: Iterable[int], dead: Iterable[int]) -> List[int]:
+    signatures = [0, 0, 0, 0]
+    for shift, group in ((2 * _GROUP_BITS, hole), (_GROUP_BITS, board), (0, dead)):
+        for card in group:
+            signatures[card & 3] |= 1 << (shift + (card >> 2))
+    return signatures
+
+def permute(cards: Iterable[int], perm: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Cards with every suit s relabeled perm[s]"""
+    return tuple(card & ~3 | perm[card & 3] for card in cards)
+
+def invert(perm: Tuple[int, ...]) -> Tuple[int, ...]:
+    """The relabeling that undoes perm"""
+    inverse = [0] * len(perm)
+    for suit, target in enumerate(perm):
+        inverse[target] = suit
+    return tuple(inverse)
+
+def restore(cards: Iterable[int], canonical: Canonical) -> Tuple[int, ...]:
+    """Map canonical cards back to the suits of the original situation"""
+    return permute(cards, invert(canonical.perm))
+
+def canonicalize(
+    hole: Iterable[int] = (),
+    board: Iterable[int] = (),
+    dead: Iterable[int] = ()
+) -> Canonical:
+    """
+    Canonical form of a situation, with the suit relabeling that produces it
+
+    Isomorphic situations (equal up to suit relabeling and card order) get
+    the same situation and key. Raises ValueError for repeated cards.
+    """
+    hole, board, dead = tuple(hole), tuple(board), tuple(dead)
+    if len(set(hole + board + dead)) != len(hole) + len(board) + len(dead):
+        raise ValueError("Duplicate cards detected")
+
+    signatures = _signatures(hole, board, dead)
+    order = sorted(range(4), key=signatures.__getitem__, reverse=True)
+    perm = [0, 0, 0, 0]
+    key = 0
+    for position, suit in enumerate(order):
+        perm[suit] = position
+        key = key << _SUIT_BITS | signatures[suit]
+
+    return Canonical(
+        situation=Situation(
+            hole=tuple(sorted([card & ~3 | perm[card & 3] for card in hole])),
+            board=tuple(sorted([card & ~3 | perm[card & 3] for card in board])),
+            dead=tuple(sorted([card & ~3 | perm[card & 3] for card in dead]))
+        ),
+        perm=tuple(perm),
+        key=key
+    )
+
+def canonicalize_treys(
+    hole: Iterable[int] = (),
+    board: Iterable[int] = (),
+    dead: Iterable[int] = ()
+) -> Canonical:
+    """canonicalize for treys cards; the situation is still in card indices"""
+    return canonicalize(
+        (CARD_INDICES[card] for card in hole),
+        (CARD_INDICES[card] for card in board),
+        (CARD_INDICES[card] for card in dead)
+    )
+
+def to_treys(cards: Iterable[int]) -> List[int]:
+    """treys cards for card indices"""
+    return [TREYS_CARDS[card] for card in cards]
+
+def enumerate_canonical(street: str, hole_cards: int = 2) -> Iterator[Canonical]:
+    """
+    Every canonical (hole cards, board) situation of a street, each once
+
+    The class weights sum to the number of raw situations, e.g. 1,326 over
+    the 169 preflop classes. With hole_cards=0 the board alone is enumerated
+    (1,755 canonical flops). Hole cards are chosen first: a situation can
+    only be canonical if its hole cards alone already are, so boards are only
+    tried on canonical hole cards.
+    """
+    board_cards = STREET_BOARD_CARDS[street]
+    for hole in itertools.combinations(range(52), hole_cards):
+        if canonicalize(hole).situation.hole != hole:
+            continue
+        rest = [card for card in range(52) if card not in hole]
+        for board in itertools.combinations(rest, board_cards):
+            canonical = canonicalize(hole, board)
+            if canonical.situation.board == board and canonical.situation.hole == hole:
+                yield canonical
@@ -0,0 +1,94 @@
+from typing import Iterable, Tuple
+import numpy as np
+
+# Dense integer indexes for sets of cards in the combinatorial number system.
+#
+# A set of k distinct card indices c1 < c2 < ... < ck (batch_eval indices,
+# 0..51) has colex rank C(c1, 1) + C(c2, 2) + ... + C(ck, k), a bijection onto
+# 0 .. C(52, k) - 1. Hole cards and board together are ranked as
+# hole_rank * C(50, k) + the board's rank among the 50 cards left, so every
+# (hand, board) pair of a street has its own slot in one flat array.
+
+MAX_CARDS = 52
+MAX_GROUP = 7
+
+# BINOMIAL[n][k] = C(n, k) for n <= 52, k <= 7
+BINOMIAL = [[0] * (MAX_GROUP + 1) for _ in range(MAX_CARDS + 1)]
+for _n in range(MAX_CARDS + 1):
+    BINOMIAL[_n][0] = 1
+    for _k in range(1, min(_n, MAX_GROUP) + 1):
+        BINOMIAL[_n][_k] = BINOMIAL[_n - 1][_k - 1] + BINOMIAL[_n - 1][_k]
+BINOMIAL_TABLE = np.array(BINOMIAL, dtype=np.int64)
+
+# Two-card hands
+HAND_COUNT = BINOMIAL[MAX_CARDS][2]
+
+def rank_combo(cards: Iterable[int]) -> int:
+    """Colex rank of a set of distinct card indices"""
+    rank = 0
+    for k, card in enumerate(sorted(cards), 1):
+        rank += BINOMIAL[card][k]
+    return rank
+
+def unrank_combo(rank: int, k: int) -> Tuple[int, ...]:
+    """The k cards, ascending, with the given colex rank"""
+    cards = []
+    card = MAX_CARDS
+    for size in range(k, 0, -1):
+        # Largest card whose binomial still fits
+        card -= 1
+        while BINOMIAL[card][size] > rank:
+            card -= 1
+        cards.append(card)
+        rank -= BINOMIAL[card][size]
+    return tuple(reversed(cards))
+
+def rank_hand(first: int, second: int) -> int:
+    """Colex rank of a two-card hand in [0, 1326)"""
+    if first > second:
+        first, second = second, first
+    return first + BINOMIAL[second][2]
+
+def rank_combos(cards: np.ndarray) -> np.ndarray:
+    """Colex ranks of card sets along the last axis of an index array"""
+    ordered = np.sort(np.asarray(cards, dtype=np.intp), axis=-1)
+    sizes = np.arange(1, ordered.shape[-1] + 1)
+    return BINOMIAL_TABLE[ordered, sizes].sum(axis=-1)
+
+def situation_count(hole_cards: int, board_cards: int) -> int:
+    """Slots needed for every (hole cards, board) pair"""
+    return BINOMIAL[MAX_CARDS][hole_cards] * BINOMIAL[MAX_CARDS - hole_cards][board_cards]
+
+def rank_situation(hole: Iterable[int], board: Iterable[int]) -> int:
+    """
+    Dense index of hole cards and a board in [0, situation_count(...))
+
+    The board is ranked among the cards not in the hand, with each board card
+    shifted down by the number of hole cards below it.
+    """
+    hole = sorted(hole)
+    board = list(board)
+    relative = [card - sum(1 for held in hole if held < card) for card in board]
+    return rank_combo(hole) * BINOMIAL[MAX_CARDS - len(hole)][len(board)] + rank_combo(relative)
+
+def unrank_situation(index: int, hole_cards: int, board_cards: int) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """Hole cards and board, both ascending, for a dense situation index"""
+    hole_rank, board_rank = divmod(index, BINOMIAL[MAX_CARDS - hole_cards][board_cards])
+    hole = unrank_combo(hole_rank, hole_cards)
+    remaining = [card for card in range(MAX_CARDS) if card not in hole]
+    return hole, tuple(remaining[card] for card in unrank_combo(board_rank, board_cards))
+
+def open_table(
+    path: str,
+    hole_cards: int,
+    board_cards: int,
+    dtype=np.float32,
+    mode: str = "r"
+) -> np.memmap:
+    """
+    Memory-mapped flat table with one slot per (hole cards, board) pair
+
+    Address it with rank_situation. Mode "w+" creates (or overwrites) the
+    file; "r" and "r+" map an existing one, which must have the right size.
+    """
+    return np.memmap(path, dtype=dtype, mode=mode, shape=(situation_count(hole_cards, board_cards),))
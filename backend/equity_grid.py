@@ -0,0 +1,157 @@
+import itertools
+import math
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+from batch_eval import COMBOS, card_mask, evaluate7, evaluate_combos
+from canonical import canonicalize
+
+# Grid rows and columns, strongest rank first
+GRID_RANKS = "AKQJT98765432"
+
+# Opponent deals scored against each sampled runout; the runout's 1,326 hero
+# evaluations are the expensive part, so each one is shared by several deals
+DEALS_PER_RUNOUT = 8
+
+# Deals scored per vectorized block, bounds peak memory at a few tens of MB
+DEAL_BLOCK = 1024
+
+# Equity values are percentages scaled by this factor and rounded to ints
+EQUITY_SCALE = 100
+
+@dataclass
+class EquityGrid:
+    equity: List[int]
+    runouts: int
+    deals: int
+    enumerated: bool
+    # False when the time budget ran out before every deal was scored
+    complete: bool = True
+
+def _combo_classes() -> np.ndarray:
+    # Row-major 13x13 index of each combo's starting-hand class: pairs on the
+    # diagonal, suited hands above it (row = higher rank), offsuit below
+    low = 12 - (COMBOS[:, 0] >> 2)
+    high = 12 - (COMBOS[:, 1] >> 2)
+    suited = (COMBOS[:, 0] & 3) == (COMBOS[:, 1] & 3)
+    row = np.where(suited, high, low)
+    col = np.where(suited, low, high)
+    return row * 13 + col
+
+COMBO_CLASSES = _combo_classes()
+COMBO_MASKS = card_mask(COMBOS)
+
+def canonical_board(board: List[int]) -> Tuple[int, ...]:
+    """
+    Board card indices in canonical suits.
+
+    The grid only depends on the board up to a permutation of suits, so
+    boards with the same canonical form share a cached grid.
+    """
+    return canonicalize(board=board).situation.board
+
+def compute_equity_grid(
+    board: List[int],
+    player_count: int,
+    samples: int,
+    rng: Optional[np.random.Generator] = None,
+    time_budget_ms: Optional[int] = None
+) -> EquityGrid:
+    """
+    Equity of every starting-hand class on a board against random hands.
+
+    Runouts are enumerated when there are few enough of them (always on the
+    turn and river) and sampled otherwise. All 1,326 hero combos are scored
+    once per runout, then each opponent deal is scored once and compared
+    against every combo at the same time; combos that share a card with the
+    runout or the opponents' cards are rejected for that deal, which leaves
+    each combo with an unbiased sample of its own situation. Ties are split
+    evenly between the tied players.
+
+    With a time budget, runouts are processed in random order and the
+    deadline is checked after every block of deals, so a cut-off grid is
+    still an unbiased estimate from the runouts and deals reached.
+    """
+    deadline = time.perf_counter() + time_budget_ms / 1000 if time_budget_ms else None
+    rng = rng or np.random.default_rng()
+    deck = np.array([card for card in range(52) if card not in board], dtype=np.intp)
+    missing = 5 - len(board)
+    opponent_cards = 2 * (player_count - 1)
+
+    # Runouts: every one if they fit the sample budget, else a random sample
+    runout_count = math.comb(len(deck), missing)
+    enumerated = runout_count * DEALS_PER_RUNOUT <= samples
+    if enumerated:
+        runouts = np.array(list(itertools.combinations(deck, missing)), dtype=np.intp).reshape(runout_count, missing)
+        runouts = runouts[rng.permutation(runout_count)]
+    else:
+        runout_count = max(1, samples // DEALS_PER_RUNOUT)
+        runouts = np.sort(rng.random((runout_count, len(deck))).argsort(axis=1)[:, :missing], axis=1)
+        runouts = deck[runouts]
+    deals_per_runout = max(1, samples // runout_count)
+
+    boards = np.concatenate([np.broadcast_to(np.asarray(board, dtype=np.intp), (runout_count, len(board))), runouts], axis=1)
+    runout_masks = card_mask(runouts) if missing else np.zeros(runout_count, dtype=np.uint64)
+    valid_base = (COMBO_MASKS & card_mask(board)) == 0 if board else np.ones(len(COMBOS), dtype=bool)
+
+    # Position of each card in the deck, to exclude runout cards from opponent deals
+    deck_position = np.full(52, -1, dtype=np.intp)
+    deck_position[deck] = np.arange(len(deck))
+
+    equity_sum = np.zeros(len(COMBOS))
+    trials = np.zeros(len(COMBOS))
+    runouts_done = deals = 0
+    out_of_time = False
+
+    # Hero scores are computed a block of runouts at a time, just ahead of
+    # their deals, so a deadline cut wastes at most one block of them
+    runouts_per_block = max(1, DEAL_BLOCK // deals_per_runout)
+    for first in range(0, runout_count, runouts_per_block):
+        last = min(first + runouts_per_block, runout_count)
+        hero_scores = np.stack([evaluate_combos(full_board) for full_board in boards[first:last]])
+        deal_runouts = np.repeat(np.arange(first, last), deals_per_runout)
+
+        for start in range(0, len(deal_runouts), DEAL_BLOCK):
+            ids = deal_runouts[start:start + DEAL_BLOCK]
+            n = len(ids)
+
+            # Opponent cards from the deck minus each deal's runout
+            keys = rng.random((n, len(deck)))
+            if missing:
+                keys[np.arange(n)[:, None], deck_position[runouts[ids]]] = 2.0
+            dealt = deck[keys.argsort(axis=1)[:, :opponent_cards]]
+
+            hands = dealt.reshape(n, player_count - 1, 2)
+            full_boards = np.broadcast_to(boards[ids][:, None, :], (n, player_count - 1, 5))
+            opponent_scores = evaluate7(np.concatenate([hands, full_boards], axis=2))
+            best = opponent_scores.min(axis=1)
+            tied_opponents = (opponent_scores == best[:, None]).sum(axis=1)
+
+            valid = valid_base & ((COMBO_MASKS & (runout_masks[ids] | card_mask(dealt))[:, None]) == 0)
+            hero = hero_scores[ids - first]
+            share = np.where(hero < best[:, None], 1.0, 0.0)
+            share += np.where(hero == best[:, None], 1.0 / (tied_opponents[:, None] + 1), 0.0)
+
+            equity_sum += (share * valid).sum(axis=0)
+            trials += valid.sum(axis=0)
+            deals += n
+            runouts_done = int(ids[-1]) + 1
+
+            if deadline is not None and time.perf_counter() >= deadline:
+                out_of_time = True
+                break
+        if out_of_time:
+            break
+
+    class_equity = np.bincount(COMBO_CLASSES, weights=equity_sum, minlength=169)
+    class_trials = np.bincount(COMBO_CLASSES, weights=trials, minlength=169)
+    equity = np.divide(class_equity, class_trials, out=np.zeros(169), where=class_trials > 0)
+
+    return EquityGrid(
+        equity=[int(round(value * 100 * EQUITY_SCALE)) for value in equity],
+        runouts=runouts_done,
+        deals=deals,
+        enumerated=enumerated and not out_of_time,
+        complete=not out_of_time
+    )
@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+@dataclass
+class BettingContext:
+    """
+    Chips at stake for the decision, all in the same unit.
+
+    pot includes every bet already made this street, including the bet hero
+    is facing. stack is hero's stack behind before acting. raise_to is hero's
+    total raise (defaults to a pot-sized raise) and opponent_stack caps what
+    each opponent can put in (defaults to unlimited).
+    """
+    pot: float
+    to_call: float
+    stack: float
+    raise_to: Optional[float] = None
+    opponent_stack: Optional[float] = None
+
+def pot_odds(context: BettingContext) -> float:
+    """Equity (%) needed for a call to break even"""
+    call = min(context.to_call, context.stack)
+    if call <= 0:
+        return 0.0
+    return call / (context.pot - (context.to_call - call) + call) * 100
+
+def raise_amount(context: BettingContext) -> float:
+    """Chips hero puts in when raising, capped at the stack"""
+    if context.raise_to is not None:
+        return min(context.raise_to, context.stack)
+    # Pot-sized raise: call, then raise by the pot after calling
+    return min(context.to_call + context.pot + context.to_call, context.stack)
+
+def expected_values(equity: float, context: BettingContext, opponents: int) -> Dict[str, float]:
+    """
+    EV in chips of folding, calling and raising for hero's equity (%)
+
+    EVs are measured against hero's stack before acting, so folding is 0.
+    Calling puts in the bet faced (less any excess hero cannot cover, which
+    goes back to the bettor) and counts only chips already in the pot.
+    Raising assumes every opponent calls the raise and sees a showdown, which
+    is what the equity was computed against, so it carries no fold equity and
+    is a lower bound for a bluff-capable raise. The bettor adds the raise on
+    top of the bet already in the pot; the other opponents are taken to act
+    after hero and put in the bet and the raise. Each opponent puts in at most
+    opponent_stack, and side pots are not modeled.
+    """
+    share = equity / 100
+
+    call = min(context.to_call, context.stack)
+    contested = context.pot - (context.to_call - call) + call
+    evs = {"fold": 0.0, "call": share * contested - call}
+
+    amount = raise_amount(context)
+    if amount > context.to_call:
+        extra = amount - context.to_call
+        if context.opponent_stack is not None:
+            extra = min(extra, context.opponent_stack)
+        # The bettor owes only the raise; with no bet faced there is no bettor
+        bettors = 1 if context.to_call > 0 else 0
+        owed = context.to_call + extra
+        if context.opponent_stack is not None:
+            owed = min(owed, context.opponent_stack)
+        contested = context.pot + context.to_call + extra + bettors * extra + (opponents - bettors) * owed
+        evs["raise"] = share * contested - (context.to_call + extra)
+
+    return {action: round(ev, 2) for action, ev in evs.items()}
+
+def best_action(
+    equity: float,
+    margin: float,
+    context: BettingContext,
+    opponents: int
+) -> Tuple[str, Dict[str, float], bool]:
+    """
+    Highest-EV action, the EVs, and whether it stays best across equity ± margin
+
+    The margin is the equity estimate's confidence half-width, so an unstable
+    answer means the decision is too close to call from this simulation.
+    """
+    evs = expected_values(equity, context, opponents)
+    action = max(evs, key=evs.get)
+    stable = all(
+        max(bound, key=bound.get) == action
+        for bound in (
+            expected_values(max(equity - margin, 0.0), context, opponents),
+            expected_values(min(equity + margin, 100.0), context, opponents)
+        )
+    )
+    return action, evs, stable
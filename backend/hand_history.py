@@ -0,0 +1,625 @@
+import asyncio
+import logging
+import re
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from models import (
+    AnalysisRequest, AnalysisResponse, BettingContext, Card, HandHistory, HandHistoryEntry,
+    HandHistoryPage, OpponentSeat, Recommendation, TournamentContext
+)
+from poker_engine import (
+    ACTION_CODES, ACTIONS, EV_CONFIDENCES, EV_LABELS, OPPONENT_PROFILES, RECOMMENDATIONS
+)
+from hand_stats import stats_updates
+
+logger = logging.getLogger(__name__)
+
+# Compact document layout (schema version 4). Query fields keep their names so
+# the (user_id, timestamp) index serves legacy and compact documents alike.
+#
+#   id, user_id, timestamp   unchanged
+#   v   schema version
+#   h   hole cards as card codes (rank_index * 4 + suit_index)
+#   b   present community cards as card codes
+#   n   player count
+#   i   simulation iterations
+#   p   [win, tie, lose] in hundredths of a percent
+#   s   [name, description, strength, category]; name and category as codes
+#   r   RECOMMENDATIONS code, or [action, reason, confidence, expected_values,
+#       pot_odds] with action and confidence as codes where they fit the tables
+#       and expected_values as [fold, call, raise] when the betting context
+#       gives their labels
+#   c   [method, confidence, cards_remaining, simulation_time_ms, iterations_completed];
+#       method as a code, confidence in hundredths of a percent; either falls
+#       back to text when it does not fit the format
+#   o   opponent seats, each known hole cards as card codes, a range string or
+#       null for a random hand; only when opponents were given
+#   e   betting [pot, to_call, stack, raise_to, opponent_stack]; only when given
+#   t   tournament [stacks, payouts, hero_seat, opponent_seat, pot]; only when given
+#   d   1 when an equity distribution was requested
+#
+# Opponent profile ranges are not stored: they are a pure function of player
+# count.
+SCHEMA_VERSION = 4
+
+CARD_RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+CARD_SUITS = ['clubs', 'diamonds', 'hearts', 'spades']
+
+_RANK_INDEX = {rank: i for i, rank in enumerate(CARD_RANKS)}
+_RANK_INDEX['T'] = _RANK_INDEX['10']
+_SUIT_INDEX = {suit: i for i, suit in enumerate(CARD_SUITS)}
+
+# Text tables; append only, codes are persisted
+HAND_NAMES = [
+    "Straight Flush", "Four of a Kind", "Full House", "Flush", "Straight",
+    "Three of a Kind", "Two Pair", "Pair", "High Card", "Straight Flush Draw",
+    "Straight Draw", "Flush Draw", "Premium Pair", "Pocket Pair", "Premium Suited",
+    "Suited Cards", "Premium Offsuit", "High Cards", "Unknown"
+]
+HAND_CATEGORIES = [
+    "made_hand", "high_card", "drawing_hand", "premium", "strong", "playable",
+    "marginal", "unknown"
+]
+METHODS = ["Combinatorial Analysis", "Monte Carlo", "Exact enumeration"]
+# Recommended actions outside the RECOMMENDATIONS table; confidences use
+# EV_CONFIDENCES
+ACTION_LABELS = ["Fold", "Check", "Call", "Bet", "Raise"]
+
+_HAND_NAME_CODES = {name: i for i, name in enumerate(HAND_NAMES)}
+_HAND_CATEGORY_CODES = {name: i for i, name in enumerate(HAND_CATEGORIES)}
+
+# Confidence as formatted by the engine, "±0.93%"
+_CONFIDENCE_FORMAT = re.compile(r"^±(\d+\.\d{2})%$")
+_RECOMMENDATION_CODES = {rec: i for i, rec in enumerate(RECOMMENDATIONS)}
+_ACTION_LABEL_CODES = {label: i for i, label in enumerate(ACTION_LABELS)}
+_EV_CONFIDENCE_CODES = {confidence: i for i, confidence in enumerate(EV_CONFIDENCES)}
+
+def encode_card(card: Card) -> int:
+    """Encode a card as a small int in [0, 52)"""
+    return _RANK_INDEX[card.rank] * 4 + _SUIT_INDEX[card.suit]
+
+def decode_card(code: int) -> Card:
+    """Decode a small-int card code"""
+    return Card(rank=CARD_RANKS[code // 4], suit=CARD_SUITS[code % 4])
+
+def _encode_text(value: str, codes: Dict[str, int]) -> Any:
+    return codes.get(value, value)
+
+def _decode_text(value: Any, table: List[str]) -> str:
+    return table[value] if isinstance(value, int) else value
+
+def _scale(probability: float) -> int:
+    return int(round(probability * 100))
+
+def _monte_carlo_method(iterations: int) -> str:
+    return f"Monte Carlo ({iterations:,} simulations)"
+
+def _exact_method(deals: int) -> str:
+    return f"Exact enumeration ({deals:,} deals)"
+
+def _encode_method(method: str, iterations: Optional[int]) -> Any:
+    if method == METHODS[0]:
+        return 0
+    if iterations is not None and method == _monte_carlo_method(iterations):
+        return 1
+    if iterations is not None and method == _exact_method(iterations):
+        return 2
+    return method
+
+def _decode_method(method: Any, iterations: Optional[int]) -> str:
+    if method == 0:
+        return METHODS[0]
+    if method == 1:
+        return _monte_carlo_method(iterations)
+    if method == 2:
+        return _exact_method(iterations)
+    return method
+
+def _encode_recommendation(recommendation: Recommendation, request: AnalysisRequest) -> Any:
+    rec_key = (recommendation.action, recommendation.reason, recommendation.confidence)
+    if rec_key in _RECOMMENDATION_CODES:
+        return _RECOMMENDATION_CODES[rec_key]
+
+    expected_values: Any = recommendation.expected_values
+    if expected_values is not None and request.betting is not None:
+        labels = EV_LABELS[request.betting.to_call > 0]
+        if set(expected_values) <= set(labels.values()):
+            expected_values = [expected_values.get(labels[action]) for action in ACTIONS]
+    return [
+        _encode_text(recommendation.action, _ACTION_LABEL_CODES),
+        recommendation.reason,
+        _encode_text(recommendation.confidence, _EV_CONFIDENCE_CODES),
+        expected_values,
+        recommendation.pot_odds
+    ]
+
+def _decode_recommendation(rec: Any, doc: dict) -> Recommendation:
+    expected_values = pot_odds = None
+    if isinstance(rec, int):
+        action, reason, confidence = RECOMMENDATIONS[rec]
+    else:
+        action, reason, confidence, expected_values, pot_odds = rec
+        action = _decode_text(action, ACTION_LABELS)
+        confidence = _decode_text(confidence, EV_CONFIDENCES)
+        if isinstance(expected_values, list):
+            labels = EV_LABELS[doc["e"][1] > 0]
+            expected_values = {
+                labels[name]: value for name, value in zip(ACTIONS, expected_values) if value is not None
+            }
+    return Recommendation(
+        action=action,
+        reason=reason,
+        confidence=confidence,
+        expected_values=expected_values,
+        pot_odds=pot_odds,
+        action_code=ACTION_CODES.get(action)
+    )
+
+def recommendation_action(rec: Any) -> str:
+    """Recommended action label of a stored recommendation, without decoding the rest"""
+    if isinstance(rec, int):
+        return RECOMMENDATIONS[rec][0]
+    return _decode_text(rec[0], ACTION_LABELS)
+
+def _encode_confidence(confidence: str) -> Any:
+    match = _CONFIDENCE_FORMAT.match(confidence)
+    return int(round(float(match.group(1)) * 100)) if match else confidence
+
+def _decode_confidence(confidence: Any) -> str:
+    return f"±{confidence / 100:.2f}%" if isinstance(confidence, int) else confidence
+
+def encode_hand_history(
+    request: AnalysisRequest,
+    response: AnalysisResponse,
+    user_id: Optional[str],
+    timestamp: datetime,
+    history_id: Optional[str] = None
+) -> dict:
+    """Build a compact hand history document straight from the API models"""
+    strength = response.hand_strength
+    recommendation = response.recommendation
+    calculations = response.calculations
+
+    document = {
+        "id": history_id or str(uuid.uuid4()),
+        "user_id": user_id,
+        "timestamp": timestamp,
+        "v": SCHEMA_VERSION,
+        "h": [encode_card(card) for card in request.hole_cards],
+        "b": [encode_card(card) for card in request.community_cards if card],
+        "n": request.player_count,
+        "i": request.simulation_iterations,
+        "p": [
+            _scale(response.win_probability),
+            _scale(response.tie_probability),
+            _scale(response.lose_probability)
+        ],
+        "s": [
+            _encode_text(strength.name, _HAND_NAME_CODES),
+            strength.description,
+            strength.strength,
+            _encode_text(strength.category, _HAND_CATEGORY_CODES)
+        ],
+        "r": _encode_recommendation(recommendation, request),
+        "c": [
+            _encode_method(calculations.method, calculations.iterations_completed),
+            _encode_confidence(calculations.confidence),
+            calculations.cards_remaining,
+            calculations.simulation_time_ms,
+            calculations.iterations_completed
+        ]
+    }
+    document.update(_encode_options(request))
+    return document
+
+def _encode_seat(seat: OpponentSeat) -> Any:
+    if seat.hole_cards:
+        return [encode_card(card) for card in seat.hole_cards]
+    return seat.range
+
+def _decode_seat(seat: Any) -> OpponentSeat:
+    if isinstance(seat, list):
+        return OpponentSeat(hole_cards=[decode_card(code) for code in seat])
+    return OpponentSeat(range=seat)
+
+def _encode_options(request: AnalysisRequest) -> dict:
+    """Optional request fields, only stored when set"""
+    options: Dict[str, Any] = {}
+    if request.opponents:
+        options["o"] = [_encode_seat(seat) for seat in request.opponents]
+    if request.betting:
+        betting = request.betting
+        options["e"] = [betting.pot, betting.to_call, betting.stack, betting.raise_to, betting.opponent_stack]
+    if request.tournament:
+        tournament = request.tournament
+        options["t"] = [
+            tournament.stacks, tournament.payouts, tournament.hero_seat,
+            tournament.opponent_seat, tournament.pot
+        ]
+    if request.include_distribution:
+        options["d"] = 1
+    return options
+
+def _decode_options(doc: dict) -> dict:
+    options: Dict[str, Any] = {}
+    if doc.get("o"):
+        options["opponents"] = [_decode_seat(seat) for seat in doc["o"]]
+    if doc.get("e"):
+        pot, to_call, stack, raise_to, opponent_stack = doc["e"]
+        options["betting"] = BettingContext(
+            pot=pot, to_call=to_call, stack=stack, raise_to=raise_to, opponent_stack=opponent_stack
+        )
+    if doc.get("t"):
+        stacks, payouts, hero_seat, opponent_seat, pot = doc["t"]
+        options["tournament"] = TournamentContext(
+            stacks=stacks, payouts=payouts, hero_seat=hero_seat, opponent_seat=opponent_seat, pot=pot
+        )
+    if doc.get("d"):
+        options["include_distribution"] = True
+    return options
+
+def decode_hand_history(doc: dict) -> HandHistory:
+    """Rebuild the full HandHistory model from a compact or legacy document"""
+    if "analysis_request" in doc:
+        return HandHistory(**doc)
+
+    player_count = doc["n"]
+    iterations = doc["i"]
+    community_cards: List[Optional[Card]] = [decode_card(code) for code in doc["b"]]
+    community_cards += [None] * (5 - len(community_cards))
+
+    name, description, strength, category = doc["s"]
+    method, confidence, cards_remaining, time_ms, completed = doc["c"]
+    request = AnalysisRequest(
+        hole_cards=[decode_card(code) for code in doc["h"]],
+        community_cards=community_cards,
+        player_count=player_count,
+        simulation_iterations=iterations,
+        **_decode_options(doc)
+    )
+    response = AnalysisResponse(
+        win_probability=doc["p"][0] / 100,
+        tie_probability=doc["p"][1] / 100,
+        lose_probability=doc["p"][2] / 100,
+        hand_strength={
+            "name": _decode_text(name, HAND_NAMES),
+            "description": description,
+            "strength": strength,
+            "category": _decode_text(category, HAND_CATEGORIES)
+        },
+        opponent_ranges=[
+            {"profile": profile, "range": range_text, "likely_holdings": list(holdings)}
+            for profile, range_text, holdings in OPPONENT_PROFILES[:min(player_count - 1, len(OPPONENT_PROFILES))]
+        ],
+        recommendation=_decode_recommendation(doc["r"], doc),
+        calculations={
+            "method": _decode_method(method, completed),
+            "confidence": _decode_confidence(confidence),
+            "cards_remaining": cards_remaining,
+            "simulation_time_ms": time_ms,
+            "iterations_completed": completed
+        }
+    )
+
+    return HandHistory(
+        id=doc["id"],
+        analysis_request=request,
+        analysis_response=response,
+        timestamp=doc["timestamp"],
+        user_id=doc.get("user_id")
+    )
+
+# Fields read by the history listing; legacy documents are projected to the
+# same subset of their nested request and response
+_ENTRY_PROJECTION = {
+    "_id": 0, "id": 1, "timestamp": 1, "h": 1, "b": 1, "n": 1, "p": 1, "s": 1, "r": 1, "o": 1,
+    "analysis_request.hole_cards": 1,
+    "analysis_request.opponents": 1,
+    "analysis_request.community_cards": 1,
+    "analysis_request.player_count": 1,
+    "analysis_response.win_probability": 1,
+    "analysis_response.tie_probability": 1,
+    "analysis_response.lose_probability": 1,
+    "analysis_response.hand_strength.name": 1,
+    "analysis_response.recommendation.action": 1
+}
+
+def _to_entry(doc: dict) -> HandHistoryEntry:
+    if "analysis_request" in doc:
+        request = doc["analysis_request"]
+        response = doc["analysis_response"]
+        return HandHistoryEntry(
+            id=doc["id"],
+            timestamp=doc["timestamp"],
+            hole_cards=request["hole_cards"],
+            community_cards=request["community_cards"],
+            player_count=request["player_count"],
+            win_probability=response["win_probability"],
+            tie_probability=response["tie_probability"],
+            lose_probability=response["lose_probability"],
+            hand_strength=response["hand_strength"]["name"],
+            recommendation=response["recommendation"]["action"],
+            action_code=ACTION_CODES.get(response["recommendation"]["action"]),
+            opponents_specified=bool(request.get("opponents"))
+        )
+
+    community_cards: List[Optional[Card]] = [decode_card(code) for code in doc["b"]]
+    community_cards += [None] * (5 - len(community_cards))
+    action = recommendation_action(doc["r"])
+
+    return HandHistoryEntry(
+        id=doc["id"],
+        timestamp=doc["timestamp"],
+        hole_cards=[decode_card(code) for code in doc["h"]],
+        community_cards=community_cards,
+        player_count=doc["n"],
+        win_probability=doc["p"][0] / 100,
+        tie_probability=doc["p"][1] / 100,
+        lose_probability=doc["p"][2] / 100,
+        hand_strength=_decode_text(doc["s"][0], HAND_NAMES),
+        recommendation=action,
+        action_code=ACTION_CODES.get(action),
+        opponents_specified=bool(doc.get("o"))
+    )
+
+def _encode_cursor(doc: dict) -> str:
+    timestamp_ms = int(doc["timestamp"].timestamp() * 1000)
+    return f"{timestamp_ms}_{doc['id']}"
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    timestamp_ms, history_id = cursor.split("_", 1)
+    try:
+        timestamp = datetime.utcfromtimestamp(int(timestamp_ms) / 1000)
+    except (OverflowError, OSError):
+        raise ValueError("Cursor timestamp out of range")
+    return timestamp, history_id
+
+async def ensure_hand_history_indexes(db: AsyncIOMotorDatabase):
+    """Create the per-user timeline index (idempotent)"""
+    await db.hand_history.create_index(
+        [("user_id", 1), ("timestamp", -1), ("id", -1)],
+        name="user_id_timestamp"
+    )
+
+async def get_hand_history_page(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> HandHistoryPage:
+    """Newest-first page of a user's hand history, keyed by an opaque cursor"""
+    query: Dict[str, Any] = {"user_id": user_id}
+    if cursor:
+        # Raises ValueError on malformed cursors
+        timestamp, history_id = _decode_cursor(cursor)
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": history_id}}
+        ]
+
+    # Fetch one extra document to know whether another page exists
+    docs = await db.hand_history.find(query, _ENTRY_PROJECTION) \
+        .sort([("timestamp", -1), ("id", -1)]) \
+        .limit(limit + 1) \
+        .to_list(length=limit + 1)
+
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    return HandHistoryPage(
+        items=[_to_entry(doc) for doc in docs],
+        next_cursor=_encode_cursor(docs[-1]) if has_more else None
+    )
+
+async def migrate_hand_history(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """Rewrite legacy nested documents in the compact format, returns the count"""
+    migrated = 0
+    operations = []
+
+    async for doc in db.hand_history.find({"analysis_request": {"$exists": True}}):
+        history = HandHistory(**doc)
+        compact = encode_hand_history(
+            history.analysis_request,
+            history.analysis_response,
+            history.user_id,
+            history.timestamp,
+            history_id=history.id
+        )
+        operations.append(ReplaceOne({"_id": doc["_id"]}, compact))
+
+        if len(operations) >= batch_size:
+            await db.hand_history.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            operations = []
+
+    if operations:
+        await db.hand_history.bulk_write(operations, ordered=False)
+        migrated += len(operations)
+
+    return migrated
+
+# (request, response, user_id, timestamp) as captured on the request path
+PendingRecord = Tuple[AnalysisRequest, AnalysisResponse, Optional[str], datetime]
+
+class HandHistoryWriter:
+    """
+    Write-behind buffer for hand history.
+
+    Requests only append to an in-memory deque; a background task serializes
+    the records and writes them with insert_many once a batch fills up or the
+    flush interval elapses. When the buffer is full new records are dropped
+    and counted instead of growing memory without bound.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_buffer_size: int = 10000
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer_size = max_buffer_size
+
+        self._buffer: Deque[PendingRecord] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+        # Counters exposed through metrics()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.stats_failed = 0
+        self.flushes = 0
+
+    def start(self):
+        """Start the background flush loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write everything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._buffer:
+            await self.flush()
+
+    def record(
+        self,
+        request: AnalysisRequest,
+        response: AnalysisResponse,
+        user_id: Optional[str] = None
+    ) -> bool:
+        """Queue a hand history record without touching the database"""
+        if len(self._buffer) >= self.max_buffer_size:
+            self.dropped += 1
+            return False
+
+        self._buffer.append((request, response, user_id, datetime.utcnow()))
+        self.enqueued += 1
+
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> int:
+        """Write up to one batch of buffered records, returns the number written"""
+        async with self._flush_lock:
+            batch = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+
+            if not batch:
+                return 0
+
+            # One record that cannot be encoded must not cost the rest of the batch
+            records, documents = [], []
+            for record in batch:
+                try:
+                    documents.append(self._to_document(*record))
+                    records.append(record)
+                except Exception as e:
+                    self.failed += 1
+                    logger.warning(f"Failed to encode hand history record: {e}")
+            if not documents:
+                return 0
+
+            try:
+                await self.db.hand_history.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # Unordered: every document without a write error was inserted
+                rejected = {error["index"] for error in e.details.get("writeErrors", [])}
+                records = [record for i, record in enumerate(records) if i not in rejected]
+                self.failed += len(documents) - len(records)
+                logger.warning(f"Failed to save {len(documents) - len(records)} hand history records: {e}")
+            except Exception as e:
+                self.failed += len(documents)
+                logger.warning(f"Failed to save {len(documents)} hand history records: {e}")
+                return 0
+
+            self.written += len(records)
+            self.flushes += 1
+
+            # Keep the per-user aggregates in step with what was persisted
+            try:
+                updates = stats_updates(records)
+                if updates:
+                    await self.db.user_stats.bulk_write(updates, ordered=False)
+            except Exception as e:
+                self.stats_failed += len(records)
+                logger.warning(f"Failed to update user stats for {len(records)} records: {e}")
+
+            return len(records)
+
+    def metrics(self) -> Dict[str, int]:
+        """Buffer counters for the metrics endpoint"""
+        return {
+            "buffered": len(self._buffer),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "stats_failed": self.stats_failed,
+            "flushes": self.flushes
+        }
+
+    def _to_document(
+        self,
+        request: AnalysisRequest,
+        response: AnalysisResponse,
+        user_id: Optional[str],
+        timestamp: datetime
+    ) -> dict:
+        """Serialize a buffered record, done off the request path"""
+        return encode_hand_history(request, response, user_id, timestamp)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            # Drain full batches first, then whatever is left after the interval;
+            # an unexpected error must not end the loop and strand the buffer
+            try:
+                while self._buffer:
+                    await self.flush()
+            except Exception:
+                logger.exception("Hand history flush failed")
+
+
+if __name__ == "__main__":
+    # One-off migration: python hand_history.py
+    import os
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        await ensure_hand_history_indexes(db)
+        migrated = await migrate_hand_history(db)
+        print(f"Migrated {migrated} hand history documents")
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+import random
+import time
+from array import array
+from typing import Dict, List, Tuple
+from treys import Deck
+from poker_engine import AnalysisResult, PokerEngine
+
+# Cap on cards held by one session's pool (opponent cards plus runout per deal)
+MAX_POOL_CARDS = 200000
+
+# Outcome codes stored per deal
+LOSE, TIE, WIN = 0, 1, 2
+
+class HandSession:
+    """
+    Engine state for one hand analyzed street by street.
+
+    Keeps a pool of sampled deals (opponent holdings plus a full runout) with
+    their outcomes. When cards are added to the board, deals that put one of
+    the new cards in an opponent's hand are discarded, deals whose runout
+    already matches the new street keep their outcome, and the rest keep
+    their opponent holdings and only redeal the missing board cards. Because
+    the discards are plain rejection on the new cards, the pool stays an
+    unbiased sample of the narrower situation.
+    """
+
+    def __init__(
+        self,
+        engine: PokerEngine,
+        hole_cards: List[int],
+        player_count: int,
+        dead_cards: List[int],
+        pool_size: int
+    ):
+        self.engine = engine
+        self.hole_cards = list(hole_cards)
+        self.player_count = player_count
+        self.dead_cards = list(dead_cards)
+        self.board: List[int] = []
+
+        self.opponent_slots = 2 * (player_count - 1)
+        self.pool_size = max(1, min(pool_size, MAX_POOL_CARDS // (self.opponent_slots + 5)))
+
+        # Deal i occupies opponents[i*slots:(i+1)*slots] and runouts[i*5:(i+1)*5]
+        self._opponents = array('i')
+        self._runouts = array('i')
+        self._outcomes = bytearray()
+
+        # Hero's score per completed board, shared by every deal with that runout
+        self._hero_scores: Dict[Tuple[int, ...], int] = {}
+
+        # Work done by the last advance()
+        self.reused = 0
+        self.redealt = 0
+        self.fresh = 0
+
+    def advance(self, board: List[int]) -> AnalysisResult:
+        """Move the session to a board that extends the current one and re-analyze"""
+        if not set(self.board).issubset(board) or len(board) > 5:
+            raise ValueError("Board must extend the previous street")
+
+        start_time = time.time()
+        new_cards = set(board) - set(self.board)
+        street_start, street_end = len(self.board), len(board)
+        self.board = list(board)
+        self._hero_scores = {
+            key: score for key, score in self._hero_scores.items() if new_cards.issubset(key)
+        }
+
+        slots = self.opponent_slots
+        known = set(self.hole_cards) | set(self.dead_cards) | set(board)
+        remaining = [card for card in Deck.GetFullDeck() if card not in known]
+        missing = 5 - len(board)
+
+        opponents, runouts, outcomes = self._opponents, self._runouts, self._outcomes
+        kept = reused = redealt = 0
+
+        for i in range(len(outcomes)):
+            deal = opponents[i * slots:(i + 1) * slots]
+            if new_cards.intersection(deal):
+                continue
+
+            runout = runouts[i * 5:(i + 1) * 5]
+            if set(runout[street_start:street_end]) == new_cards:
+                # The sampled runout already dealt this street
+                full_board = board + list(runout[street_end:])
+                outcome = outcomes[i]
+                reused += 1
+            else:
+                excluded = set(deal)
+                full_board = board + random.sample([c for c in remaining if c not in excluded], missing)
+                outcome = self._outcome(full_board, deal)
+                redealt += 1
+
+            opponents[kept * slots:(kept + 1) * slots] = deal
+            runouts[kept * 5:(kept + 1) * 5] = array('i', full_board)
+            outcomes[kept] = outcome
+            kept += 1
+
+        del opponents[kept * slots:]
+        del runouts[kept * 5:]
+        del outcomes[kept:]
+
+        # Top the pool back up with fresh deals
+        fresh = self.pool_size - kept
+        for _ in range(fresh):
+            cards = random.sample(remaining, slots + missing)
+            deal = cards[:slots]
+            full_board = board + cards[slots:]
+            opponents.extend(deal)
+            runouts.extend(full_board)
+            outcomes.append(self._outcome(full_board, deal))
+
+        self.reused, self.redealt, self.fresh = reused, redealt, fresh
+
+        probabilities = self.engine.summarize_outcomes(
+            outcomes.count(WIN), outcomes.count(TIE), len(outcomes)
+        )
+        method = f"Incremental session ({reused + redealt:,} of {len(outcomes):,} deals carried over)"
+        return self.engine.build_result(
+            self.hole_cards, self.board, self.player_count, probabilities, method, start_time
+        )
+
+    def _outcome(self, full_board: List[int], deal) -> int:
+        evaluate = self.engine.evaluator.evaluate
+        key = tuple(sorted(full_board))
+        hero_score = self._hero_scores.get(key)
+        if hero_score is None:
+            hero_score = evaluate(full_board, self.hole_cards)
+            self._hero_scores[key] = hero_score
+
+        best = min(evaluate(full_board, [deal[k], deal[k + 1]]) for k in range(0, len(deal), 2))
+        if hero_score < best:
+            return WIN
+        if hero_score == best:
+            return TIE
+        return LOSE
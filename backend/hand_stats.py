@@ -0,0 +1,206 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import ReplaceOne, UpdateOne
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from models import AnalysisRequest, AnalysisResponse, StreetStats, UserStats
+from poker_engine import ACTION_CODES
+
+# Per-user aggregate documents in db.user_stats:
+#
+#   user_id
+#   hands                               total analyses
+#   streets.<street>.hands              analyses on that street
+#   streets.<street>.equity             sum of equity in hundredths of a percent
+#   recommendations.<action>            count per action code (fold, call, raise),
+#                                       the same for threshold and EV advice
+#   updated_at
+#
+# Equity is win + tie / 2, kept as an integer sum so $inc stays exact. Street
+# counts and equity only cover analyses against random opponents; analyses with
+# given opponent hands or ranges count towards hands and recommendations only.
+STREETS = ["preflop", "flop", "turn", "river"]
+
+def street_name(community_count: int) -> str:
+    """Street for a given number of community cards"""
+    if community_count >= 5:
+        return "river"
+    if community_count == 4:
+        return "turn"
+    if community_count == 3:
+        return "flop"
+    return "preflop"
+
+def _action_key(action: str) -> str:
+    if action in ACTION_CODES:
+        return ACTION_CODES[action]
+    # Field names may not contain dots or start with $
+    return action.replace(".", "_").replace("$", "_")
+
+def stats_updates(
+    records: Iterable[Tuple[AnalysisRequest, AnalysisResponse, Optional[str], datetime]]
+) -> List[UpdateOne]:
+    """One upserting $inc per user for a batch of hand history records"""
+    increments: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    last_seen: Dict[str, datetime] = {}
+
+    for request, response, user_id, timestamp in records:
+        if not user_id:
+            continue
+
+        inc = increments[user_id]
+        inc["hands"] += 1
+        if not request.opponents:
+            street = street_name(len([c for c in request.community_cards if c]))
+            equity = int(round(response.win_probability * 100 + response.tie_probability * 50))
+            inc[f"streets.{street}.hands"] += 1
+            inc[f"streets.{street}.equity"] += equity
+        inc[f"recommendations.{_action_key(response.recommendation.action)}"] += 1
+        last_seen[user_id] = max(timestamp, last_seen.get(user_id, timestamp))
+
+    return [
+        UpdateOne(
+            {"user_id": user_id},
+            {"$inc": dict(inc), "$max": {"updated_at": last_seen[user_id]}},
+            upsert=True
+        )
+        for user_id, inc in increments.items()
+    ]
+
+def _to_user_stats(doc: Optional[dict]) -> UserStats:
+    if not doc:
+        return UserStats(hands_analyzed=0, streets={}, recommendations={})
+
+    streets = {}
+    for street in STREETS:
+        street_doc = doc.get("streets", {}).get(street)
+        if street_doc and street_doc.get("hands"):
+            streets[street] = StreetStats(
+                hands=street_doc["hands"],
+                average_equity=round(street_doc["equity"] / street_doc["hands"] / 100, 2)
+            )
+
+    # Documents written before action codes count by label
+    recommendations: Dict[str, int] = {}
+    for action, count in doc.get("recommendations", {}).items():
+        key = _action_key(action)
+        recommendations[key] = recommendations.get(key, 0) + count
+
+    return UserStats(
+        hands_analyzed=doc.get("hands", 0),
+        streets=streets,
+        recommendations=recommendations,
+        updated_at=doc.get("updated_at")
+    )
+
+async def ensure_user_stats_indexes(db: AsyncIOMotorDatabase):
+    """Create the unique user_id index used by the upserts (idempotent)"""
+    await db.user_stats.create_index("user_id", unique=True, name="user_id_unique")
+
+async def get_user_stats(db: AsyncIOMotorDatabase, user_id: str) -> UserStats:
+    """Read a user's precomputed aggregates, a single indexed lookup"""
+    doc = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0})
+    return _to_user_stats(doc)
+
+async def rebuild_user_stats(
+    db: AsyncIOMotorDatabase,
+    user_id: Optional[str] = None,
+    batch_size: int = 500
+) -> int:
+    """
+    Recompute aggregates from hand_history with aggregation pipelines.
+
+    Offline backfill: expects compact documents (run the hand history
+    migration first) and should not race live writes for the same users.
+    Returns the number of users written.
+    """
+    # Import here to avoid circular imports
+    from hand_history import SCHEMA_VERSION, recommendation_action
+
+    match = {"v": SCHEMA_VERSION, "user_id": {"$ne": None}}
+    if user_id:
+        match["user_id"] = user_id
+
+    street_pipeline = [
+        {"$match": match},
+        {"$project": {
+            "user_id": 1,
+            "cards": {"$size": "$b"},
+            "specified": {"$gt": [{"$size": {"$ifNull": ["$o", []]}}, 0]},
+            "equity": {"$add": [
+                {"$arrayElemAt": ["$p", 0]},
+                {"$divide": [{"$arrayElemAt": ["$p", 1]}, 2]}
+            ]},
+            "updated_at": "$timestamp"
+        }},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "cards": "$cards", "specified": "$specified"},
+            "hands": {"$sum": 1},
+            "equity": {"$sum": "$equity"},
+            "updated_at": {"$max": "$updated_at"}
+        }}
+    ]
+    recommendation_pipeline = [
+        {"$match": match},
+        # Table codes as they are, other recommendations by their action only
+        {"$project": {
+            "user_id": 1,
+            "r": {"$cond": [{"$isArray": "$r"}, {"$slice": ["$r", 1]}, "$r"]}
+        }},
+        {"$group": {"_id": {"user_id": "$user_id", "r": "$r"}, "count": {"$sum": 1}}}
+    ]
+
+    docs: Dict[str, dict] = {}
+
+    def user_doc(uid: str) -> dict:
+        if uid not in docs:
+            docs[uid] = {"user_id": uid, "hands": 0, "streets": {}, "recommendations": {}, "updated_at": None}
+        return docs[uid]
+
+    async for row in db.hand_history.aggregate(street_pipeline, allowDiskUse=True):
+        doc = user_doc(row["_id"]["user_id"])
+        doc["hands"] += row["hands"]
+        if not row["_id"]["specified"]:
+            street = doc["streets"].setdefault(
+                street_name(row["_id"]["cards"]), {"hands": 0, "equity": 0}
+            )
+            street["hands"] += row["hands"]
+            street["equity"] += int(round(row["equity"]))
+        if doc["updated_at"] is None or row["updated_at"] > doc["updated_at"]:
+            doc["updated_at"] = row["updated_at"]
+
+    async for row in db.hand_history.aggregate(recommendation_pipeline, allowDiskUse=True):
+        action = recommendation_action(row["_id"]["r"])
+        recommendations = user_doc(row["_id"]["user_id"])["recommendations"]
+        key = _action_key(action)
+        recommendations[key] = recommendations.get(key, 0) + row["count"]
+
+    operations = [ReplaceOne({"user_id": uid}, doc, upsert=True) for uid, doc in docs.items()]
+    for start in range(0, len(operations), batch_size):
+        await db.user_stats.bulk_write(operations[start:start + batch_size], ordered=False)
+
+    return len(operations)
+
+
+if __name__ == "__main__":
+    # Offline backfill: python hand_stats.py [user_id]
+    import asyncio
+    import os
+    import sys
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from hand_history import migrate_hand_history
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        await ensure_user_stats_indexes(db)
+        await migrate_hand_history(db)
+        users = await rebuild_user_stats(db, user_id=sys.argv[1] if len(sys.argv) > 1 else None)
+        print(f"Rebuilt stats for {users} users")
+        client.close()
+
+    asyncio.run(main())
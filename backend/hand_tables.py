@@ -0,0 +1,170 @@
+from typing import List, Tuple
+
+# Made-hand and draw classification for partial boards from precomputed tables.
+#
+# Ranks are treys rank indices, (card >> 8) & 0xF: 0 = deuce .. 12 = ace. A set
+# of ranks is a 13-bit mask. Straight tables are indexed by that mask, made
+# hands by the sorted rank multiplicities and flushes by per-suit rank masks,
+# so classifying a 5- or 6-card state is a fixed number of lookups.
+
+RANK_NAMES = ["Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine",
+              "Ten", "Jack", "Queen", "King", "Ace"]
+RANK_PLURALS = ["Twos", "Threes", "Fours", "Fives", "Sixes", "Sevens", "Eights", "Nines",
+                "Tens", "Jacks", "Queens", "Kings", "Aces"]
+
+# treys suit bits, (card >> 12) & 0xF
+SUIT_NAMES = {1: "Spades", 2: "Hearts", 4: "Diamonds", 8: "Clubs"}
+
+# Straight draw kinds
+NO_DRAW, BACKDOOR, GUTSHOT, DOUBLE_GUTSHOT, OPEN_ENDED = range(5)
+
+DRAW_DESCRIPTIONS = {
+    BACKDOOR: "backdoor straight draw",
+    GUTSHOT: "gutshot straight draw",
+    DOUBLE_GUTSHOT: "double gutshot straight draw",
+    OPEN_ENDED: "open-ended straight draw",
+}
+
+# Five-rank straight windows with their high card; the wheel is A-2-3-4-5
+STRAIGHT_WINDOWS = [(0b1000000001111, 3)] + [(0b11111 << low, low + 4) for low in range(9)]
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+def _open_four(mask: int) -> bool:
+    # Four consecutive ranks with a completing rank free on both ends. The
+    # ace also plays low, so shift it in below the deuce.
+    extended = (mask << 1) | (mask >> 12 & 1)
+    for low in range(1, 10):
+        if extended >> low & 0b1111 == 0b1111:
+            return True
+    return False
+
+def _build_straight_tables() -> Tuple[List[int], List[int], List[int]]:
+    high = [-1] * (1 << 13)
+    outs = [0] * (1 << 13)
+    draws = [NO_DRAW] * (1 << 13)
+    for mask in range(1 << 13):
+        backdoor = False
+        for window, window_high in STRAIGHT_WINDOWS:
+            present = _popcount(mask & window)
+            if present == 5:
+                high[mask] = max(high[mask], window_high)
+            elif present == 4:
+                outs[mask] |= window & ~mask
+            elif present == 3:
+                backdoor = True
+
+        out_count = _popcount(outs[mask])
+        if out_count >= 2:
+            draws[mask] = OPEN_ENDED if _open_four(mask) else DOUBLE_GUTSHOT
+        elif out_count == 1:
+            draws[mask] = GUTSHOT
+        elif backdoor:
+            draws[mask] = BACKDOOR
+    return high, outs, draws
+
+# Highest straight in a rank mask (rank index of its top card, 3 for the wheel), or -1
+# Ranks that would complete a straight, as a mask
+# Straight draw kind
+STRAIGHT_HIGH, STRAIGHT_OUTS, STRAIGHT_DRAW = _build_straight_tables()
+
+# Made hand by sorted rank multiplicities: (name, strength)
+def _multiplicity_category(counts: Tuple[int, ...]) -> Tuple[str, int]:
+    if counts[0] == 4:
+        return "Four of a Kind", 8
+    if counts[0] == 3 and len(counts) > 1 and counts[1] >= 2:
+        return "Full House", 7
+    if counts[0] == 3:
+        return "Three of a Kind", 5
+    if counts[0] == 2 and len(counts) > 1 and counts[1] == 2:
+        return "Two Pair", 4
+    if counts[0] == 2:
+        return "Pair", 3
+    return "High Card", 2
+
+def _build_multiplicity_table():
+    table = {}
+
+    def partitions(remaining: int, largest: int, prefix: Tuple[int, ...]):
+        if remaining == 0:
+            if len(prefix) <= 13:
+                table[prefix] = _multiplicity_category(prefix)
+            return
+        for part in range(min(remaining, largest), 0, -1):
+            partitions(remaining - part, part, prefix + (part,))
+
+    for card_count in range(1, 8):
+        partitions(card_count, 4, ())
+    return table
+
+MULTIPLICITY_CATEGORIES = _build_multiplicity_table()
+
+def classify_cards(cards: List[int]) -> Tuple[str, str, int, str]:
+    """
+    Classify a hand of up to seven treys cards as (name, description, strength, category)
+
+    Made hands rank straight flush, quads, full house, flush, straight,
+    trips, two pair, pair. Pairs and high cards also describe flush and
+    straight draws; backdoor draws only count with two cards to come.
+    """
+    counts = [0] * 13
+    rank_mask = 0
+    suit_masks = {1: 0, 2: 0, 4: 0, 8: 0}
+    for card in cards:
+        rank = (card >> 8) & 0xF
+        counts[rank] += 1
+        rank_mask |= 1 << rank
+        suit_masks[(card >> 12) & 0xF] |= 1 << rank
+
+    flush_suit, flush_mask = max(suit_masks.items(), key=lambda item: _popcount(item[1]))
+    suited = _popcount(flush_mask)
+
+    if suited >= 5 and STRAIGHT_HIGH[flush_mask] >= 0:
+        return "Straight Flush", f"{RANK_NAMES[STRAIGHT_HIGH[flush_mask]]}-high straight flush", 9, "made_hand"
+
+    # Ranks by multiplicity, then rank, highest first
+    by_count = sorted((rank for rank in range(13) if counts[rank]), key=lambda rank: (counts[rank], rank), reverse=True)
+    name, strength = MULTIPLICITY_CATEGORIES[tuple(counts[rank] for rank in by_count)]
+    top, second = by_count[0], by_count[1] if len(by_count) > 1 else None
+
+    if name == "Four of a Kind":
+        return name, f"Quad {RANK_PLURALS[top]}", strength, "made_hand"
+    if name == "Full House":
+        return name, f"{RANK_PLURALS[top]} full of {RANK_PLURALS[second]}", strength, "made_hand"
+    if suited >= 5:
+        return "Flush", f"{SUIT_NAMES[flush_suit]} flush", 6, "made_hand"
+    if STRAIGHT_HIGH[rank_mask] >= 0:
+        return "Straight", f"{RANK_NAMES[STRAIGHT_HIGH[rank_mask]]}-high straight", 5, "made_hand"
+    if name == "Three of a Kind":
+        return name, f"Trip {RANK_PLURALS[top]}", strength, "made_hand"
+
+    # Draws, with backdoor draws only on the flop
+    flush_draw = suited == 4
+    backdoor_flush = suited == 3 and len(cards) == 5
+    straight_draw = STRAIGHT_DRAW[rank_mask]
+    if straight_draw == BACKDOOR and len(cards) != 5:
+        straight_draw = NO_DRAW
+
+    draws = []
+    if flush_draw:
+        draws.append("flush draw")
+    if straight_draw != NO_DRAW:
+        draws.append(DRAW_DESCRIPTIONS[straight_draw])
+    if backdoor_flush:
+        draws.append("backdoor flush draw")
+    suffix = f" with {' and '.join(draws)}" if draws else ""
+
+    if name == "Two Pair":
+        return name, f"{RANK_PLURALS[top]} and {RANK_PLURALS[second]}", strength, "made_hand"
+    if name == "Pair":
+        return name, f"Pair of {RANK_PLURALS[top]}{suffix}", strength, "made_hand"
+
+    if flush_draw and straight_draw >= GUTSHOT:
+        return "Straight Flush Draw", f"Flush draw with {DRAW_DESCRIPTIONS[straight_draw]}", 6, "drawing_hand"
+    if straight_draw >= GUTSHOT:
+        description = DRAW_DESCRIPTIONS[straight_draw]
+        return "Straight Draw", description[0].upper() + description[1:], 4 if straight_draw != GUTSHOT else 3, "drawing_hand"
+    if flush_draw:
+        return "Flush Draw", "4-card flush draw", 4, "drawing_hand"
+    return "High Card", f"{RANK_NAMES[top]} high{suffix}", 2, "high_card"
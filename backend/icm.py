@@ -0,0 +1,127 @@
+from dataclasses import dataclass
+from typing import List
+
+# Largest table the calculator accepts; the DP has 2^n states
+MAX_ICM_PLAYERS = 10
+
+@dataclass
+class AllInEquity:
+    fold_equity: float
+    call_equity: float
+    required_equity: float
+    chip_required_equity: float
+
+def icm_equity(stacks: List[float], payouts: List[float]) -> List[float]:
+    """
+    Prize equity of each stack under the Malmuth-Harville model
+
+    A player finishes first with probability proportional to their chips,
+    and each later place is decided the same way among the players left.
+    Rather than walking every finishing order (n! of them), the DP runs over
+    sets of players: prob[mask] is the probability that exactly the players
+    in mask took the first popcount(mask) places, in any order, so each set
+    is expanded once. Players with no chips finish below everyone still in
+    and split the payouts for those places evenly.
+
+    Raises ValueError for tables over MAX_ICM_PLAYERS, negative stacks and
+    empty or negative payouts.
+    """
+    if not 2 <= len(stacks) <= MAX_ICM_PLAYERS:
+        raise ValueError(f"ICM needs between 2 and {MAX_ICM_PLAYERS} players")
+    if any(stack < 0 for stack in stacks):
+        raise ValueError("Stacks cannot be negative")
+    if not payouts or any(payout < 0 for payout in payouts):
+        raise ValueError("Payouts must be a non-empty list of non-negative amounts")
+
+    alive = [i for i, stack in enumerate(stacks) if stack > 0]
+    chips = [stacks[i] for i in alive]
+    n = len(chips)
+    places = min(len(payouts), n)
+    size = 1 << n
+
+    # Chips held by the players in each mask
+    mask_chips = [0.0] * size
+    for mask in range(1, size):
+        low = mask & -mask
+        mask_chips[mask] = mask_chips[mask ^ low] + chips[low.bit_length() - 1]
+
+    total = mask_chips[size - 1]
+    prob = [0.0] * size
+    prob[0] = 1.0
+    equity = [0.0] * n
+
+    # Every subset of a mask is numerically smaller, so prob[mask] is final when reached
+    for mask in range(size):
+        p = prob[mask]
+        if p == 0.0:
+            continue
+        place = bin(mask).count("1")
+        if place >= places:
+            continue
+        payout = payouts[place]
+        rest = total - mask_chips[mask]
+        for j in range(n):
+            bit = 1 << j
+            if mask & bit:
+                continue
+            q = p * chips[j] / rest
+            equity[j] += q * payout
+            prob[mask | bit] += q
+
+    result = [0.0] * len(stacks)
+    for i, value in zip(alive, equity):
+        result[i] = value
+
+    busted = [i for i, stack in enumerate(stacks) if stack == 0]
+    if busted:
+        share = sum(payouts[n:n + len(busted)]) / len(busted)
+        for i in busted:
+            result[i] = share
+    return result
+
+def all_in_equity(
+    stacks: List[float],
+    payouts: List[float],
+    hero: int,
+    opponent: int,
+    win_probability: float,
+    tie_probability: float,
+    pot: float = 0.0
+) -> AllInEquity:
+    """
+    Hero's prize equity for folding versus calling an all-in from one opponent
+
+    Stacks are chips behind; pot is dead money already in the middle (blinds,
+    antes, earlier bets), won by the opponent when hero folds and split on a
+    tie. Probabilities are percentages from the hand analysis. The required
+    equity is the win probability (ties ignored) at which calling and folding
+    are worth the same, alongside the chip-EV break-even for comparison.
+    """
+    if hero == opponent or not (0 <= hero < len(stacks) and 0 <= opponent < len(stacks)):
+        raise ValueError("Hero and opponent must be two different seats")
+    if stacks[hero] <= 0 or stacks[opponent] <= 0:
+        raise ValueError("Hero and opponent must both have chips")
+
+    covered = min(stacks[hero], stacks[opponent])
+
+    def hero_equity(hero_delta: float, opponent_delta: float) -> float:
+        outcome = list(stacks)
+        outcome[hero] += hero_delta
+        outcome[opponent] += opponent_delta
+        return icm_equity(outcome, payouts)[hero]
+
+    fold = hero_equity(0.0, pot)
+    win = hero_equity(covered + pot, -covered)
+    lose = hero_equity(-covered, covered + pot)
+    tie = hero_equity(pot / 2, pot / 2)
+
+    p_win = win_probability / 100
+    p_tie = tie_probability / 100
+    call = p_win * win + p_tie * tie + (1 - p_win - p_tie) * lose
+
+    return AllInEquity(
+        fold_equity=round(fold, 4),
+        call_equity=round(call, 4),
+        required_equity=round((fold - lose) / (win - lose) * 100, 2) if win != lose else 100.0,
+        chip_required_equity=round(covered / (2 * covered + pot) * 100, 2)
+    )
@@ -0,0 +1,140 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from pymongo import monitoring
+from pymongo.errors import OperationFailure
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from hand_history import ensure_hand_history_indexes
+from hand_stats import ensure_user_stats_indexes
+
+logger = logging.getLogger(__name__)
+
+# (collection, keys, options) for every index the services rely on
+INDEXES: List[Tuple[str, Any, Dict[str, Any]]] = [
+    ("users", "email", {"unique": True, "name": "email_unique"}),
+    ("users", "id", {"unique": True, "name": "id_unique"}),
+    ("payment_transactions", "session_id", {"unique": True, "name": "session_id_unique"}),
+    ("payment_transactions", [("user_id", 1), ("payment_status", 1)], {"name": "user_id_payment_status"}),
+    ("password_reset_tokens", "token", {"name": "token"}),
+    # Documents are removed once expires_at has passed
+    ("password_reset_tokens", "expires_at", {"expireAfterSeconds": 0, "name": "expires_at_ttl"}),
+    ("analysis_jobs", "id", {"unique": True, "name": "id_unique"}),
+    ("analysis_jobs", [("user_id", 1), ("status", 1)], {"name": "user_id_status"}),
+    ("analysis_jobs", [("status", 1), ("created_at", 1)], {"name": "status_created_at"}),
+    ("analysis_jobs", [("status", 1), ("heartbeat_at", 1)], {"name": "status_heartbeat_at"}),
+    # Finished jobs only; queued and running jobs have no expires_at
+    ("analysis_jobs", "expires_at", {"expireAfterSeconds": 0, "name": "expires_at_ttl"}),
+]
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    """Create all service indexes, safe to run on every startup"""
+    for collection, keys, options in INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            # e.g. duplicate emails from before the unique index existed
+            logger.error(f"Could not create index {options['name']} on {collection}: {e}")
+
+    await ensure_hand_history_indexes(db)
+    await ensure_user_stats_indexes(db)
+
+def _query_shapes() -> List[Tuple[str, dict]]:
+    # Filters issued by AuthService, SubscriptionService and the history services
+    return [
+        ("users", {"email": ""}),
+        ("users", {"id": ""}),
+        ("password_reset_tokens", {"token": "", "used": False, "expires_at": {"$gt": datetime.utcnow()}}),
+        ("payment_transactions", {"session_id": ""}),
+        ("hand_history", {"user_id": ""}),
+        ("user_stats", {"user_id": ""}),
+        ("analysis_jobs", {"id": "", "user_id": ""}),
+        ("analysis_jobs", {"user_id": "", "status": {"$in": ["queued", "running"]}}),
+    ]
+
+def _plan_stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+async def audit_query_plans(db: AsyncIOMotorDatabase) -> List[str]:
+    """Explain the known query shapes and warn about any collection scan"""
+    unindexed = []
+    for collection, query in _query_shapes():
+        try:
+            explain = await db[collection].find(query).explain()
+        except Exception as e:
+            logger.warning(f"Could not explain query on {collection}: {e}")
+            continue
+
+        if "COLLSCAN" in _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {})):
+            shape = _filter_shape(query)
+            unindexed.append(f"{collection} {shape}")
+            logger.warning(f"Unindexed query on {collection}: {shape} uses a collection scan")
+
+    return unindexed
+
+def _filter_shape(value: Any) -> Any:
+    """Replace literal values so filters can be logged without user data"""
+    if isinstance(value, dict):
+        return {key: _filter_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_filter_shape(item) for item in value]
+    return "?"
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Log database commands slower than a threshold, with their filter shape"""
+
+    # Commands worth reporting; others (hello, ping, ...) are ignored
+    WATCHED_COMMANDS = {
+        "find", "aggregate", "count", "distinct", "update", "delete",
+        "findAndModify", "insert"
+    }
+
+    def __init__(self, threshold_ms: int = 100, max_pending: int = 10000):
+        self.threshold_ms = threshold_ms
+        self.max_pending = max_pending
+        self.slow_commands = 0
+        self._pending: Dict[int, Tuple[str, Any]] = {}
+
+    def started(self, event):
+        if event.command_name not in self.WATCHED_COMMANDS:
+            return
+        if len(self._pending) >= self.max_pending:
+            self._pending.clear()
+
+        command = event.command
+        collection = command.get(event.command_name)
+        if event.command_name == "update":
+            query = [u.get("q") for u in command.get("updates", [])]
+        elif event.command_name == "delete":
+            query = [d.get("q") for d in command.get("deletes", [])]
+        elif event.command_name == "aggregate":
+            query = command.get("pipeline", [])[:1]
+        else:
+            query = command.get("filter", command.get("query"))
+
+        self._pending[event.request_id] = (f"{event.database_name}.{collection}", query)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= self.threshold_ms:
+            self.slow_commands += 1
+            namespace, query = pending
+            logger.warning(
+                f"Slow {event.command_name} on {namespace} took {duration_ms:.0f}ms "
+                f"filter={_filter_shape(query)}"
+            )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 import uuid
 
@@ -7,11 +7,34 @@ class Card(BaseModel):
     rank: str = Field(..., description="Card rank: 2-9, 10, J, Q, K, A")
     suit: str = Field(..., description="Card suit: hearts, diamonds, clubs, spades")
 
+class OpponentSeat(BaseModel):
+    hole_cards: Optional[List[Card]] = Field(None, description="Opponent's known hole cards")
+    range: Optional[str] = Field(None, description="Opponent's range, e.g. 'QQ+, AKs, ATo+'; ignored when hole cards are known")
+
+class BettingContext(BaseModel):
+    pot: float = Field(..., ge=0, description="Chips in the pot, including the bet being faced")
+    to_call: float = Field(0, ge=0, description="Chips needed to call; 0 when not facing a bet")
+    stack: float = Field(..., gt=0, description="Player's stack behind before acting")
+    raise_to: Optional[float] = Field(None, gt=0, description="Total raise size to evaluate; defaults to a pot-sized raise")
+    opponent_stack: Optional[float] = Field(None, gt=0, description="Largest amount an opponent can put in; defaults to unlimited")
+
+class TournamentContext(BaseModel):
+    stacks: List[float] = Field(..., min_length=2, max_length=10, description="Chips behind for every player at the table")
+    payouts: List[float] = Field(..., min_length=1, max_length=10, description="Prize for each paid place, first place first")
+    hero_seat: int = Field(0, ge=0, description="Index of the player in stacks")
+    opponent_seat: int = Field(1, ge=0, description="Index of the all-in opponent in stacks")
+    pot: float = Field(0, ge=0, description="Dead money in the pot besides the all-in amounts")
+
 class AnalysisRequest(BaseModel):
     hole_cards: List[Card] = Field(..., description="Player's two hole cards")
     community_cards: List[Optional[Card]] = Field(..., description="Community cards (flop, turn, river)")
     player_count: int = Field(2, ge=2, le=10, description="Number of players in the hand")
     simulation_iterations: int = Field(100000, ge=10000, le=500000, description="Monte Carlo simulation iterations")
+    time_budget_ms: Optional[int] = Field(None, ge=10, le=60000, description="Stop simulating after this many milliseconds and return the estimate so far")
+    opponents: Optional[List[OpponentSeat]] = Field(None, description="Known hands or ranges per opponent seat; unlisted seats hold random hands")
+    betting: Optional[BettingContext] = Field(None, description="Pot, bet and stacks for an EV-based recommendation")
+    tournament: Optional[TournamentContext] = Field(None, description="Stacks and payouts for the prize equity of calling an all-in")
+    include_distribution: bool = Field(False, description="Also return a histogram of equity against the opponent's possible holdings")
 
 class HandStrength(BaseModel):
     name: str = Field(..., description="Name of the hand (e.g., 'Pair', 'Straight')")
@@ -28,12 +51,68 @@ class Recommendation(BaseModel):
     action: str = Field(..., description="Recommended action (Fold, Check/Call, Bet/Raise)")
     reason: str = Field(..., description="Explanation for the recommendation")
     confidence: str = Field(..., description="Confidence level in the recommendation")
+    expected_values: Optional[Dict[str, float]] = Field(None, description="EV in chips of each action, when a betting context is given")
+    pot_odds: Optional[float] = Field(None, description="Equity needed to call profitably (%)")
+    action_code: Optional[str] = Field(None, description="fold, call or raise; the same for threshold and EV recommendations")
 
 class CalculationDetails(BaseModel):
     method: str = Field(..., description="Calculation method used")
     confidence: str = Field(..., description="Statistical confidence interval")
     cards_remaining: int = Field(..., description="Number of unknown cards remaining")
     simulation_time_ms: int = Field(..., description="Time taken for calculations in milliseconds")
+    iterations_completed: Optional[int] = Field(None, description="Simulations actually run, fewer than requested if the time budget ran out")
+
+class NextCardEquity(BaseModel):
+    card: Card
+    win_probability: float = Field(..., description="Win probability if this card comes next (%)")
+    tie_probability: float = Field(..., description="Tie probability if this card comes next (%)")
+    hand_class: str = Field(..., description="Player's hand class after this card")
+    is_out: bool = Field(..., description="Whether this card improves the hand to a favorite")
+
+class DrawAnalysis(BaseModel):
+    next_street: str = Field(..., description="Street the next card completes (turn or river)")
+    current_class: str = Field(..., description="Player's hand class on the current board")
+    outs: List[Card] = Field(..., description="Cards that improve the hand to at least 50% equity")
+    improve_probability: float = Field(..., description="Probability the next card improves the hand class (%)")
+    improvement_probabilities: Dict[str, float] = Field(..., description="Probability of improving to each hand class (%)")
+    next_cards: List[NextCardEquity] = Field(..., description="Equity after each possible next card, best first")
+
+class SeatEquity(BaseModel):
+    seat: int = Field(..., description="Seat number, 0 is the player")
+    hole_cards: Optional[List[Card]] = None
+    range: Optional[str] = None
+    win_probability: float = Field(..., description="Probability of winning outright (%)")
+    tie_probability: float = Field(..., description="Probability of splitting the pot (%)")
+    equity: float = Field(..., description="Share of the pot won on average (%)")
+
+class AllInEquity(BaseModel):
+    fold_equity: float = Field(..., description="Prize equity after folding")
+    call_equity: float = Field(..., description="Expected prize equity after calling")
+    required_equity: float = Field(..., description="Win probability (%) at which calling matches folding under ICM")
+    chip_required_equity: float = Field(..., description="Win probability (%) at which calling breaks even in chips")
+
+class BoardTexture(BaseModel):
+    paired: bool
+    trips: bool
+    monotone: bool = Field(..., description="All board cards share one suit")
+    two_tone: bool = Field(..., description="The board has exactly two suits")
+    rainbow: bool = Field(..., description="No two board cards share a suit")
+    flush_possible: bool = Field(..., description="Three or more board cards of one suit")
+    flush_draw_possible: bool = Field(..., description="Two board cards of one suit with cards still to come")
+    straight_possible: bool = Field(..., description="Three or more board ranks fit in one straight")
+    connectedness: int = Field(..., description="Most board ranks inside any five-rank straight window")
+    high_card: str
+    nut_hand: str = Field(..., description="Best hand possible on this board")
+    nut_combos: int = Field(..., description="Combos that make the nut hand")
+    combos: Optional[int] = Field(None, description="Opponent combos left given the board and hole cards")
+    combos_beating: Optional[int] = Field(None, description="Opponent combos that beat the hole cards right now")
+    combos_tying: Optional[int] = Field(None, description="Opponent combos that tie the hole cards right now")
+
+class EquityDistribution(BaseModel):
+    seat: int = Field(..., description="Opponent seat whose holdings the distribution is taken over")
+    buckets: List[float] = Field(..., description="Share of holdings (%) per equity bucket; bucket i covers [5i, 5i + 5)% equity")
+    holdings: int = Field(..., description="Distinct opponent holdings sampled")
+    samples_per_holding: float = Field(..., description="Average deals per holding; fewer samples widen the histogram")
 
 class AnalysisResponse(BaseModel):
     win_probability: float = Field(..., ge=0, le=100, description="Probability of winning (%)")
@@ -43,10 +122,105 @@ class AnalysisResponse(BaseModel):
     opponent_ranges: List[OpponentRange]
     recommendation: Recommendation
     calculations: CalculationDetails
+    draws: Optional[DrawAnalysis] = Field(None, description="Outs and next-card equity on the flop and turn")
+    seats: Optional[List[SeatEquity]] = Field(None, description="Equity of every seat when opponents are specified")
+    icm: Optional[AllInEquity] = Field(None, description="Prize equity of folding and calling an all-in, when a tournament context is given")
+    distribution: Optional[EquityDistribution] = Field(None, description="Equity histogram, when include_distribution is set")
+    texture: Optional[BoardTexture] = Field(None, description="Board texture and opponent combos beating the hand, from the flop on")
 
 class HandHistory(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     analysis_request: AnalysisRequest
     analysis_response: AnalysisResponse
     timestamp: datetime = Field(default_factory=datetime.utcnow)
-    user_id: Optional[str] = None
\ No newline at end of file
+    user_id: Optional[str] = None
+
+class HandHistoryEntry(BaseModel):
+    id: str
+    timestamp: datetime
+    hole_cards: List[Card]
+    community_cards: List[Optional[Card]]
+    player_count: int
+    win_probability: float
+    tie_probability: float
+    lose_probability: float
+    hand_strength: str = Field(..., description="Hand strength name at analysis time")
+    recommendation: str = Field(..., description="Recommended action at analysis time")
+    action_code: Optional[str] = Field(None, description="fold, call or raise, as counted in the user's stats")
+    opponents_specified: bool = Field(False, description="Equity was computed against given opponent hands or ranges")
+
+class HandHistoryPage(BaseModel):
+    items: List[HandHistoryEntry]
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page")
+
+class StreetStats(BaseModel):
+    hands: int
+    average_equity: float = Field(..., description="Average of win + tie/2 (%)")
+
+class UserStats(BaseModel):
+    hands_analyzed: int
+    streets: Dict[str, StreetStats] = Field(..., description="Keyed by preflop, flop, turn, river")
+    recommendations: Dict[str, int] = Field(..., description="Count per recommended action")
+    updated_at: Optional[datetime] = None
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str = Field(..., description="queued, running, completed or failed")
+    result: Optional[Dict[str, Any]] = Field(None, description="Job output once completed")
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = Field(None, description="When the finished job is deleted")
+
+class ComputeUsage(BaseModel):
+    available: int = Field(..., description="Simulation budget available now (iterations x players)")
+    capacity: int = Field(..., description="Maximum budget that can accumulate")
+    refill_per_second: float
+    charged: int = Field(..., description="Total budget spent")
+    requests: int
+    rejected: int
+
+class SessionCreateRequest(BaseModel):
+    hole_cards: List[Card] = Field(..., description="Player's two hole cards")
+    community_cards: List[Optional[Card]] = Field([], description="Community cards known so far")
+    player_count: int = Field(2, ge=2, le=10, description="Number of players in the hand")
+    dead_cards: List[Card] = Field([], description="Cards known to be out of play (e.g. folded hands)")
+    pool_size: int = Field(20000, ge=1000, le=100000, description="Sampled deals kept between streets")
+
+class SessionStreetRequest(BaseModel):
+    community_cards: List[Optional[Card]] = Field(..., description="Full board so far, extending the previous street")
+
+class SessionAnalysis(BaseModel):
+    session_id: str
+    expires_in_seconds: int
+    analysis: AnalysisResponse
+
+class EquityGridRequest(BaseModel):
+    community_cards: List[Optional[Card]] = Field([], description="Community cards known so far")
+    player_count: int = Field(2, ge=2, le=10, description="Number of players in the hand")
+    samples: int = Field(4000, ge=500, le=50000, description="Opponent deals scored against every starting hand")
+
+class EquityGrid(BaseModel):
+    community_cards: List[Card]
+    player_count: int
+    ranks: str = Field(..., description="Row and column rank order of the grid")
+    scale: int = Field(..., description="Equity values are percentages multiplied by this factor")
+    equity: List[int] = Field(..., description="169 equities, row-major 13x13; pairs on the diagonal, suited above, offsuit below")
+    runouts: int = Field(..., description="Board runouts evaluated")
+    deals: int = Field(..., description="Opponent deals scored")
+    enumerated: bool = Field(..., description="Whether every runout was evaluated rather than a sample")
+    cached: bool = False
+
+class BoardTextureRequest(BaseModel):
+    community_cards: List[Optional[Card]] = Field(..., description="Flop, turn or river")
+    hole_cards: Optional[List[Card]] = Field(None, description="Player's hole cards, to count the opponent combos that beat them")
+
+class IcmRequest(BaseModel):
+    stacks: List[float] = Field(..., min_length=2, max_length=10, description="Chips for every player")
+    payouts: List[float] = Field(..., min_length=1, max_length=10, description="Prize for each paid place, first place first")
+
+class IcmResult(BaseModel):
+    equities: List[float] = Field(..., description="Prize equity of each stack, in payout units")
+    chip_shares: List[float] = Field(..., description="Each stack's share of the chips (%)")
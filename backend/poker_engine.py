@@ -1,3 +1,4 @@
+import math
 import random
 import time
 from typing import List, Dict, Optional, Tuple, Union
@@ -5,6 +6,11 @@ from dataclasses import dataclass
 from treys import Deck, Evaluator, Card as TreysCard
 from pydantic import BaseModel
 import itertools
+from ranges import parse_range
+from ev import BettingContext, best_action, pot_odds
+from hand_tables import classify_cards
+from colex import HAND_COUNT, rank_hand
+from canonical import CARD_INDICES, TREYS_CARDS, canonicalize_treys, restore, to_treys
 
 class Card(BaseModel):
     rank: str
@@ -25,6 +31,14 @@ class Card(BaseModel):
         
         return TreysCard.new(f"{treys_rank}{treys_suit}")
 
+    @classmethod
+    def from_treys_format(cls, card_int: int) -> "Card":
+        """Convert from treys library card format"""
+        treys_str = TreysCard.int_to_str(card_int)
+        rank = '10' if treys_str[0] == 'T' else treys_str[0]
+        suit = {'h': 'hearts', 'd': 'diamonds', 'c': 'clubs', 's': 'spades'}[treys_str[1]]
+        return cls(rank=rank, suit=suit)
+
 @dataclass
 class HandStrength:
     name: str
@@ -43,6 +57,9 @@ class Recommendation:
     action: str
     reason: str
     confidence: str
+    expected_values: Optional[Dict[str, float]] = None
+    pot_odds: Optional[float] = None
+    action_code: Optional[str] = None
 
 @dataclass
 class CalculationDetails:
@@ -50,6 +67,45 @@ class CalculationDetails:
     confidence: str
     cards_remaining: int
     simulation_time_ms: int
+    iterations_completed: int = 0
+
+@dataclass
+class NextCardEquity:
+    card: Dict[str, str]
+    win_probability: float
+    tie_probability: float
+    hand_class: str
+    is_out: bool
+
+@dataclass
+class DrawAnalysis:
+    next_street: str
+    current_class: str
+    outs: List[Dict[str, str]]
+    improve_probability: float
+    improvement_probabilities: Dict[str, float]
+    next_cards: List[NextCardEquity]
+
+@dataclass
+class OpponentSpec:
+    hole_cards: Optional[List[Card]] = None
+    range: Optional[str] = None
+
+@dataclass
+class SeatEquity:
+    seat: int
+    hole_cards: Optional[List[Dict[str, str]]]
+    range: Optional[str]
+    win_probability: float
+    tie_probability: float
+    equity: float
+
+@dataclass
+class EquityDistribution:
+    seat: int
+    buckets: List[float]
+    holdings: int
+    samples_per_holding: float
 
 @dataclass
 class AnalysisResult:
@@ -60,6 +116,64 @@ class AnalysisResult:
     opponent_ranges: List[OpponentRange]
     recommendation: Recommendation
     calculations: CalculationDetails
+    draws: Optional[DrawAnalysis] = None
+    seats: Optional[List[SeatEquity]] = None
+    distribution: Optional[EquityDistribution] = None
+
+# treys hand classes, 1 (best) to 9
+HAND_CLASS_NAMES = {
+    1: "Straight Flush",
+    2: "Four of a Kind",
+    3: "Full House",
+    4: "Flush",
+    5: "Straight",
+    6: "Three of a Kind",
+    7: "Two Pair",
+    8: "Pair",
+    9: "High Card"
+}
+
+# Static opponent profiles: (profile, range, likely holdings)
+OPPONENT_PROFILES = [
+    ("Tight-Aggressive", "15-20% of hands", ("High pairs (99+)", "Strong aces (AQ+)", "Suited connectors (JT+)")),
+    ("Loose-Aggressive", "25-35% of hands", ("Medium pairs (66+)", "Suited cards", "Broadway cards")),
+    ("Tight-Passive", "10-15% of hands", ("Premium pairs (JJ+)", "Strong aces (AK, AQ)")),
+    ("Loose-Passive", "30-45% of hands", ("Any pair", "Suited cards", "Face cards", "Connecting cards"))
+]
+
+# Threshold recommendations: (action, reason, confidence), strongest first
+RECOMMENDATIONS = [
+    ("Bet/Raise", "Strong hand with high win probability", "High (85%+)"),
+    ("Call/Check", "Decent hand with reasonable equity", "Medium (70%)"),
+    ("Check/Call", "Drawing hand with some equity", "Low (55%)"),
+    ("Fold", "Weak hand with poor equity", "High (80%+)")
+]
+
+# EV recommendation labels per action, without and with a bet to call
+EV_LABELS = (
+    {"fold": "Fold", "call": "Check", "raise": "Bet"},
+    {"fold": "Fold", "call": "Call", "raise": "Raise"}
+)
+# EV recommendation confidence, indexed by whether the best action is stable
+EV_CONFIDENCES = ["Low (EV ranking changes within the confidence interval)", "High"]
+
+# One code per action for stats and history, whichever path recommended it
+ACTIONS = ["fold", "call", "raise"]
+ACTION_CODES = {
+    "Fold": "fold",
+    "Check/Call": "call", "Call/Check": "call", "Check": "call", "Call": "call",
+    "Bet/Raise": "raise", "Bet": "raise", "Raise": "raise"
+}
+
+# Iterations between deadline checks in the simulation loop
+SIMULATION_BATCH_SIZE = 1000
+
+# Conditional equity (win + half of ties, %) a card must give to count as an out
+OUT_EQUITY_THRESHOLD = 50.0
+
+# Equity histogram resolution; bucket i covers [i, i + 1) * 100 / DISTRIBUTION_BUCKETS %
+DISTRIBUTION_BUCKETS = 20
+
 
 class PokerEngine:
     def __init__(self):
@@ -70,12 +184,27 @@ class PokerEngine:
         hole_cards: List[Card], 
         community_cards: List[Optional[Card]], 
         player_count: int,
-        simulation_iterations: int = 100000
+        simulation_iterations: int = 100000,
+        time_budget_ms: Optional[int] = None,
+        opponents: Optional[List[OpponentSpec]] = None,
+        betting: Optional[BettingContext] = None,
+        include_distribution: bool = False
     ) -> AnalysisResult:
         """
         Main analysis function that determines win probabilities and strategic recommendations
+
+        With a time budget the simulation stops at the first batch boundary past
+        the budget and reports the estimate from the iterations completed so far.
+        Opponents may be given seat by seat as known hole cards, a range or
+        nothing (a random hand); seats not listed are random. With a betting
+        context the recommendation compares the EV of each action. With
+        include_distribution the result also carries a histogram of hero's
+        equity against each holding of the first unknown opponent. Without
+        opponent specs the simulation runs on the suit-canonical situation,
+        so isomorphic hands give identical results under the same seed.
         """
         start_time = time.time()
+        deadline = time.perf_counter() + time_budget_ms / 1000 if time_budget_ms else None
         
         # Convert cards to treys format
         treys_hole = [card.to_treys_format() for card in hole_cards if card]
@@ -83,36 +212,77 @@ class PokerEngine:
         
         # Count remaining community cards needed
         community_cards_count = len([c for c in community_cards if c])
-        cards_remaining = 52 - len(treys_hole) - community_cards_count
         
         # Choose calculation method based on remaining cards
-        if community_cards_count >= 4:  # Turn or river
-            probabilities = self._combinatorial_analysis(
-                treys_hole, treys_community, player_count
+        if opponents:
+            seats = self._resolve_seats(opponents, player_count, treys_hole + treys_community)
+            probabilities = self._multiway_equity(
+                treys_hole, treys_community, seats, simulation_iterations, deadline, include_distribution
             )
-            method = "Combinatorial Analysis"
+            method = probabilities['method']
         else:
-            probabilities = self._monte_carlo_simulation(
-                treys_hole, treys_community, player_count, simulation_iterations
-            )
-            method = f"Monte Carlo ({simulation_iterations:,} simulations)"
+            # Simulate the canonical form of the situation so that situations equal
+            # up to suits run the same deals, then map next-card results back
+            canonical = canonicalize_treys(treys_hole, treys_community)
+            sim_hole = to_treys(canonical.situation.hole)
+            sim_community = to_treys(canonical.situation.board)
+            if community_cards_count >= 4:  # Turn or river
+                probabilities = self._combinatorial_analysis(
+                    sim_hole, sim_community, player_count, deadline, include_distribution
+                )
+                method = "Combinatorial Analysis"
+            else:
+                probabilities = self._monte_carlo_simulation(
+                    sim_hole, sim_community, player_count, simulation_iterations, deadline, include_distribution
+                )
+                method = f"Monte Carlo ({probabilities['iterations']:,} simulations)"
+            if 'next_cards' in probabilities:
+                cards = restore([CARD_INDICES[card] for card, _, _, _ in probabilities['next_cards']], canonical)
+                probabilities['next_cards'] = [
+                    (TREYS_CARDS[card], *counts) for card, (_, *counts) in zip(cards, probabilities['next_cards'])
+                ]
+        
+        return self.build_result(
+            treys_hole, treys_community, player_count, probabilities, method, start_time, betting
+        )
+    
+    def build_result(
+        self,
+        hole_cards: List[int],
+        community_cards: List[int],
+        player_count: int,
+        probabilities: Dict[str, float],
+        method: str,
+        start_time: float,
+        betting: Optional[BettingContext] = None
+    ) -> AnalysisResult:
+        """
+        Combine computed probabilities with hand strength, ranges and recommendation
+        """
+        cards_remaining = 52 - len(hole_cards) - len(community_cards)
         
         # Get current hand strength
-        current_hand = self._evaluate_current_hand(treys_hole, treys_community)
+        current_hand = self._evaluate_current_hand(hole_cards, community_cards)
         
         # Generate opponent ranges
         opponent_ranges = self._generate_opponent_ranges(player_count)
         
         # Generate strategic recommendation
-        recommendation = self._generate_recommendation(probabilities, current_hand)
+        recommendation = self._generate_recommendation(probabilities, current_hand, player_count, betting)
+        
+        # Outs and next-card equity from the stratified simulation counters
+        draws = None
+        if 'next_cards' in probabilities:
+            draws = self._analyze_draws(hole_cards, community_cards, probabilities['next_cards'])
         
         calculation_time = int((time.time() - start_time) * 1000)
         
         calculations = CalculationDetails(
             method=method,
-            confidence="±0.8%",
+            confidence=f"±{probabilities['confidence']:.2f}%",
             cards_remaining=cards_remaining,
-            simulation_time_ms=calculation_time
+            simulation_time_ms=calculation_time,
+            iterations_completed=probabilities['iterations']
         )
         
         return AnalysisResult(
@@ -122,7 +292,10 @@ class PokerEngine:
             hand_strength=current_hand,
             opponent_ranges=opponent_ranges,
             recommendation=recommendation,
-            calculations=calculations
+            calculations=calculations,
+            draws=draws,
+            seats=probabilities.get('seats'),
+            distribution=probabilities.get('distribution')
         )
     
     def _monte_carlo_simulation(
@@ -130,85 +303,481 @@ class PokerEngine:
         hole_cards: List[int], 
         community_cards: List[int], 
         player_count: int,
-        iterations: int
+        iterations: int,
+        deadline: Optional[float] = None,
+        distribution: bool = False
     ) -> Dict[str, float]:
         """
         Perform Monte Carlo simulation to calculate win probabilities
+
+        Iterations run in batches; a perf_counter deadline is checked between
+        batches so the loop itself stays free of timing calls.
+
+        On the flop and turn the next board card is stratified: iterations
+        cycle through every possible next card in turn, with the rest of the
+        deal shuffled as usual, and outcomes are also counted per next card.
+        The overall estimate is unchanged in expectation and the per-card
+        counts give the next-card equity breakdown at no extra evaluations.
+        With distribution, hero's pot share is also accumulated per holding
+        of the first opponent for the equity histogram.
+        
+        The loop allocates nothing per iteration: only the dealt deck
+        positions are shuffled and the board and hands are filled into fixed
+        buffers. Opponents are scored only until one beats hero, since hero's
+        result is all that is counted here.
         """
         wins = 0
         ties = 0
+        tie_share = 0.0
         total_simulations = 0
+        completed = 0
         
-        # Create deck and remove known cards
-        deck = Deck()
+        # Remove known cards from a deck in fixed order; every iteration shuffles
+        # it with the module RNG, so results are reproducible under random.seed
         known_cards = hole_cards + community_cards
-        remaining_deck = [card for card in deck.cards if card not in known_cards]
-        
-        for _ in range(iterations):
-            # Shuffle remaining deck
-            random.shuffle(remaining_deck)
-            
-            # Complete the community cards if needed
-            cards_needed = 5 - len(community_cards)
-            simulated_board = community_cards + remaining_deck[:cards_needed]
-            
-            # Deal opponent hands
-            opponent_hands = []
-            card_index = cards_needed
-            for _ in range(player_count - 1):
-                opponent_hand = remaining_deck[card_index:card_index + 2]
-                opponent_hands.append(opponent_hand)
-                card_index += 2
-            
-            # Skip simulation if we don't have enough cards
-            if card_index > len(remaining_deck):
-                continue
+        remaining_deck = [card for card in Deck.GetFullDeck() if card not in known_cards]
+        
+        # Per next card counters, indexed like next_cards
+        next_cards = list(remaining_deck) if len(community_cards) in (3, 4) else []
+        next_trials = [0] * len(next_cards)
+        next_wins = [0] * len(next_cards)
+        next_ties = [0] * len(next_cards)
+        
+        # Per first-opponent holding counters, fixed size
+        holding_trials = [0] * HAND_COUNT if distribution else None
+        holding_shares = [0.0] * HAND_COUNT if distribution else None
+        
+        cards_needed = 5 - len(community_cards)
+        opponents = player_count - 1
+        dealt = cards_needed + 2 * opponents
+        deck_size = len(remaining_deck)
+        if dealt > deck_size:
+            return self.summarize_outcomes(0, 0, 0)
+        
+        # Buffers filled in place every iteration: the board's unknown slots and
+        # one two-card list per opponent
+        board = community_cards + [0] * cards_needed
+        board_slots = range(len(community_cards), 5)
+        hands = [[0, 0] for _ in range(opponents)]
+        
+        # Hot callables bound once
+        evaluate = self.evaluator.evaluate
+        holding_index = self._holding_index
+        rand = random.random
+        deck_index = remaining_deck.index
+        strata = len(next_cards)
+        # Deck positions dealt at random; with strata position 0 is the stratum card
+        shuffled = range(1 if strata else 0, dealt)
+        
+        while completed < iterations:
+            batch = min(SIMULATION_BATCH_SIZE, iterations - completed)
+            completed += batch
+            for _ in range(batch):
+                if strata:
+                    # Move this iteration's stratum card to the front
+                    slot = total_simulations % strata
+                    j = deck_index(next_cards[slot])
+                    remaining_deck[0], remaining_deck[j] = remaining_deck[j], remaining_deck[0]
                 
-            # Evaluate all hands
-            hero_score = self.evaluator.evaluate(simulated_board, hole_cards)
-            opponent_scores = [
-                self.evaluator.evaluate(simulated_board, opp_hand) 
-                for opp_hand in opponent_hands
-            ]
-            
-            # Determine result (lower score = better hand in treys)
-            all_scores = [hero_score] + opponent_scores
-            min_score = min(all_scores)
-            winners = [i for i, score in enumerate(all_scores) if score == min_score]
-            
-            if len(winners) == 1 and 0 in winners:  # Hero wins alone
-                wins += 1
-            elif 0 in winners:  # Hero ties
-                ties += 1
-            # else: Hero loses (implicit)
+                # Partial Fisher-Yates: only the dealt positions need to be a
+                # uniform draw from the rest of the deck
+                for i in shuffled:
+                    j = i + int(rand() * (deck_size - i))
+                    remaining_deck[i], remaining_deck[j] = remaining_deck[j], remaining_deck[i]
+                
+                # Complete the board, then deal opponent hands after it
+                position = 0
+                for k in board_slots:
+                    board[k] = remaining_deck[position]
+                    position += 1
+                for hand in hands:
+                    hand[0] = remaining_deck[position]
+                    hand[1] = remaining_deck[position + 1]
+                    position += 2
+                
+                # Score opponents against hero (lower is better in treys). The first
+                # opponent to beat hero settles the iteration as a loss, so the rest
+                # are skipped; otherwise every opponent was scored and tied counts
+                # exactly the hands sharing hero's score.
+                hero_score = evaluate(board, hole_cards)
+                tied = 1
+                beaten = False
+                for hand in hands:
+                    score = evaluate(board, hand)
+                    if score < hero_score:
+                        beaten = True
+                        break
+                    if score == hero_score:
+                        tied += 1
+                
+                if beaten:
+                    share = 0.0
+                elif tied == 1:  # Hero wins alone
+                    wins += 1
+                    if strata:
+                        next_wins[slot] += 1
+                    share = 1.0
+                else:  # Hero ties
+                    ties += 1
+                    share = 1 / tied
+                    tie_share += share
+                    if strata:
+                        next_ties[slot] += 1
+                
+                if distribution:
+                    holding = holding_index(hands[0])
+                    holding_trials[holding] += 1
+                    holding_shares[holding] += share
+                
+                if strata:
+                    next_trials[slot] += 1
+                total_simulations += 1
             
-            total_simulations += 1
-        
-        if total_simulations == 0:
-            return {'win': 0.0, 'tie': 0.0, 'lose': 100.0}
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        
+        probabilities = self.summarize_outcomes(wins, ties, total_simulations, tie_share)
+        if next_cards and total_simulations >= len(next_cards):
+            probabilities['next_cards'] = list(zip(next_cards, next_trials, next_wins, next_ties))
+        if distribution:
+            probabilities['distribution'] = self._equity_histogram(1, holding_trials, holding_shares)
+        return probabilities
+    
+    def summarize_outcomes(
+        self,
+        wins: int,
+        ties: int,
+        total: int,
+        tie_share: Optional[float] = None
+    ) -> Dict[str, float]:
+        """
+        Turn outcome counts into the probabilities dict used throughout the engine
+
+        tie_share is the pot share won in ties (1/k for a k-way split, summed);
+        without it ties count as half a pot. Equity is wins plus tie share.
+        """
+        if total == 0:
+            return {'win': 0.0, 'tie': 0.0, 'lose': 100.0, 'equity': 0.0, 'iterations': 0, 'confidence': 100.0}
         
-        win_prob = (wins / total_simulations) * 100
-        tie_prob = (ties / total_simulations) * 100
+        win_prob = (wins / total) * 100
+        tie_prob = (ties / total) * 100
         lose_prob = 100 - win_prob - tie_prob
+        if tie_share is None:
+            tie_share = ties / 2
         
         return {
             'win': round(win_prob, 2),
             'tie': round(tie_prob, 2),
-            'lose': round(lose_prob, 2)
+            'lose': round(lose_prob, 2),
+            'equity': round((wins + tie_share) / total * 100, 2),
+            'iterations': total,
+            'confidence': self._confidence_interval(wins, total)
         }
     
+    def _confidence_interval(self, successes: int, trials: int) -> float:
+        """Half-width of the 95% normal confidence interval, in percentage points"""
+        p = successes / trials
+        return 1.96 * math.sqrt(p * (1 - p) / trials) * 100
+    
     def _combinatorial_analysis(
         self, 
         hole_cards: List[int], 
         community_cards: List[int], 
-        player_count: int
+        player_count: int,
+        deadline: Optional[float] = None,
+        distribution: bool = False
     ) -> Dict[str, float]:
         """
         Use exact combinatorial analysis when few cards remain
         """
         # For now, fall back to Monte Carlo with high precision
         # This can be optimized later with exact enumeration
-        return self._monte_carlo_simulation(hole_cards, community_cards, player_count, 50000)
+        return self._monte_carlo_simulation(hole_cards, community_cards, player_count, 50000, deadline, distribution)
+    
+    def _resolve_seats(
+        self,
+        opponents: List[OpponentSpec],
+        player_count: int,
+        known_cards: List[int]
+    ) -> List[Tuple[str, Union[Tuple[int, int], List[Tuple[int, int]], None], Optional[str]]]:
+        """
+        Turn opponent specs into (kind, hand or combos, range text) seats
+
+        Kinds are "known" with a fixed hand, "range" with its combos and
+        "random" with None.
+
+        Raises ValueError for too many seats, malformed or conflicting hands and
+        ranges with no combos left once known cards are removed.
+        """
+        if len(opponents) > player_count - 1:
+            raise ValueError(f"At most {player_count - 1} opponents for {player_count} players")
+        
+        known_hands = [
+            [card.to_treys_format() for card in spec.hole_cards]
+            for spec in opponents if spec.hole_cards
+        ]
+        if any(len(hand) != 2 for hand in known_hands):
+            raise ValueError("Known opponent hands need exactly 2 cards")
+        dead = set(known_cards)
+        all_known = known_cards + [card for hand in known_hands for card in hand]
+        if len(set(all_known)) != len(all_known):
+            raise ValueError("Duplicate cards detected")
+        dead.update(all_known)
+        
+        seats = []
+        for spec in opponents:
+            if spec.hole_cards:
+                seats.append(("known", tuple(card.to_treys_format() for card in spec.hole_cards), None))
+            elif spec.range:
+                combos = [combo for combo in parse_range(spec.range) if not dead.intersection(combo)]
+                if not combos:
+                    raise ValueError(f"Range {spec.range} has no combos left after removing known cards")
+                seats.append(("range", combos, spec.range))
+            else:
+                seats.append(("random", None, None))
+        seats.extend(("random", None, None) for _ in range(player_count - 1 - len(opponents)))
+        return seats
+    
+    def _multiway_equity(
+        self,
+        hole_cards: List[int],
+        community_cards: List[int],
+        seats: List[Tuple[str, Union[Tuple[int, int], List[Tuple[int, int]], None], Optional[str]]],
+        iterations: int,
+        deadline: Optional[float] = None,
+        distribution: bool = False
+    ) -> Dict[str, float]:
+        """
+        Equity of hero and every opponent seat from one shared set of deals
+
+        When the number of possible deals (runouts times unknown seat holdings)
+        is within the iteration budget every deal is enumerated once, runout by
+        runout in random order so that stopping at the deadline leaves an
+        unbiased partial result. Otherwise deals are sampled, rejecting those
+        where range combos collide. Each
+        deal scores all seats together, so the seat equities are consistent
+        and sum to 100%. The equity distribution, when asked for, is taken
+        over the holdings of the first seat whose hand is not known.
+        """
+        known = set(hole_cards + community_cards)
+        for kind, value, _ in seats:
+            if kind == "known":
+                known.update(value)
+        deck = [card for card in Deck.GetFullDeck() if card not in known]
+        missing = 5 - len(community_cards)
+        
+        # Upper bound on the number of distinct deals
+        space = math.comb(len(deck), missing)
+        cards_left = len(deck) - missing
+        for kind, value, _ in seats:
+            if kind == "range":
+                space *= len(value)
+            elif kind == "random":
+                space *= math.comb(cards_left, 2)
+                cards_left -= 2
+        exact = space <= iterations
+        
+        players = len(seats) + 1
+        wins = [0] * players
+        ties = [0] * players
+        shares = [0.0] * players
+        total = 0
+        evaluate = self.evaluator.evaluate
+        
+        # Per holding counters for the distribution seat, fixed size
+        tracked = next((i for i, (kind, _, _) in enumerate(seats) if kind != "known"), None)
+        if not distribution:
+            tracked = None
+        holding_trials = [0] * HAND_COUNT if tracked is not None else None
+        holding_shares = [0.0] * HAND_COUNT if tracked is not None else None
+        
+        def score(board: List[int], hands: List[Tuple[int, int]]):
+            nonlocal total
+            scores = [evaluate(board, hole_cards)] + [evaluate(board, list(hand)) for hand in hands]
+            best = min(scores)
+            winners = [i for i, value in enumerate(scores) if value == best]
+            if len(winners) == 1:
+                wins[winners[0]] += 1
+                shares[winners[0]] += 1
+            else:
+                for i in winners:
+                    ties[i] += 1
+                    shares[i] += 1 / len(winners)
+            total += 1
+            
+            if tracked is not None:
+                holding = self._holding_index(hands[tracked])
+                holding_trials[holding] += 1
+                if scores[0] == best:
+                    holding_shares[holding] += 1 / len(winners)
+        
+        if exact:
+            # Runouts in random order, so a deadline cut leaves an unbiased sample
+            # of runouts, each with all of its seat holdings
+            runouts = list(itertools.combinations(deck, missing))
+            random.shuffle(runouts)
+            next_check = SIMULATION_BATCH_SIZE
+            finished = 0
+            for runout in runouts:
+                board = community_cards + list(runout)
+                for hands in self._seat_hands(seats, 0, deck, set(runout)):
+                    score(board, hands)
+                finished += 1
+                if deadline is not None and total >= next_check:
+                    next_check = total + SIMULATION_BATCH_SIZE
+                    if time.perf_counter() >= deadline:
+                        break
+            if finished == len(runouts):
+                method = f"Exact enumeration ({total:,} deals)"
+            else:
+                method = f"Partial enumeration ({total:,} deals, {finished:,} of {len(runouts):,} runouts)"
+        else:
+            range_seats = [i for i, (kind, _, _) in enumerate(seats) if kind == "range"]
+            random_seats = [i for i, (kind, _, _) in enumerate(seats) if kind == "random"]
+            draw_count = missing + 2 * len(random_seats)
+            hands: List[Optional[Tuple[int, int]]] = [
+                value if kind == "known" else None for kind, value, _ in seats
+            ]
+            completed = 0
+            while completed < iterations:
+                batch = min(SIMULATION_BATCH_SIZE, iterations - completed)
+                completed += batch
+                for _ in range(batch):
+                    used = set()
+                    for i in range_seats:
+                        combo = random.choice(seats[i][1])
+                        if combo[0] in used or combo[1] in used:
+                            break
+                        used.update(combo)
+                        hands[i] = combo
+                    else:
+                        pool = [card for card in deck if card not in used] if used else deck
+                        drawn = random.sample(pool, draw_count)
+                        for k, i in enumerate(random_seats):
+                            hands[i] = (drawn[missing + 2 * k], drawn[missing + 2 * k + 1])
+                        score(community_cards + drawn[:missing], hands)
+                
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+            method = f"Monte Carlo ({total:,} simulations)"
+        
+        probabilities = self.summarize_outcomes(wins[0], ties[0], total, shares[0] - wins[0])
+        probabilities['method'] = method
+        if tracked is not None:
+            probabilities['distribution'] = self._equity_histogram(tracked + 1, holding_trials, holding_shares)
+        # Seat 0 is hero
+        probabilities['seats'] = []
+        for i, (kind, value, range_text) in enumerate([("known", tuple(hole_cards), None)] + seats):
+            probabilities['seats'].append(SeatEquity(
+                seat=i,
+                hole_cards=[Card.from_treys_format(card).dict() for card in value] if kind == "known" else None,
+                range=range_text,
+                win_probability=round(wins[i] / total * 100, 2) if total else 0.0,
+                tie_probability=round(ties[i] / total * 100, 2) if total else 0.0,
+                equity=round(shares[i] / total * 100, 2) if total else 0.0
+            ))
+        return probabilities
+    
+    def _holding_index(self, hand) -> int:
+        """Slot of a two-card holding in the fixed per-holding counters, its colex rank"""
+        return rank_hand(CARD_INDICES[hand[0]], CARD_INDICES[hand[1]])
+    
+    def _equity_histogram(
+        self,
+        seat: int,
+        holding_trials: List[int],
+        holding_shares: List[float]
+    ) -> Optional[EquityDistribution]:
+        """
+        Bucket hero's equity against each opponent holding, weighted by how often it was dealt
+
+        Each holding's equity is its own sample mean, so with few samples per
+        holding the histogram is wider than the true distribution.
+        """
+        buckets = [0] * DISTRIBUTION_BUCKETS
+        holdings = 0
+        total = 0
+        for trials, share in zip(holding_trials, holding_shares):
+            if trials:
+                bucket = min(int(share / trials * DISTRIBUTION_BUCKETS), DISTRIBUTION_BUCKETS - 1)
+                buckets[bucket] += trials
+                holdings += 1
+                total += trials
+        if not total:
+            return None
+        
+        return EquityDistribution(
+            seat=seat,
+            buckets=[round(count / total * 100, 2) for count in buckets],
+            holdings=holdings,
+            samples_per_holding=round(total / holdings, 1)
+        )
+    
+    def _seat_hands(self, seats, index: int, deck: List[int], used: set):
+        """Yield every consistent assignment of hands to seats[index:]"""
+        if index == len(seats):
+            yield []
+            return
+        kind, value, _ = seats[index]
+        if kind == "known":
+            options = [value]
+        elif kind == "range":
+            options = [combo for combo in value if combo[0] not in used and combo[1] not in used]
+        else:
+            options = itertools.combinations([card for card in deck if card not in used], 2)
+        for hand in options:
+            for rest in self._seat_hands(seats, index + 1, deck, used | set(hand)):
+                yield [hand] + rest
+    
+    def _analyze_draws(
+        self,
+        hole_cards: List[int],
+        community_cards: List[int],
+        next_cards: List[Tuple[int, int, int, int]]
+    ) -> DrawAnalysis:
+        """
+        Build the outs and next-card breakdown from per-card simulation counts
+
+        Hero's hand class after each next card is exact; the conditional win and
+        tie probabilities are estimates from that card's stratum. An out is a
+        card that improves hero's hand class and leaves hero with at least
+        OUT_EQUITY_THRESHOLD equity.
+        """
+        current_class = self._hand_class(self.evaluator.evaluate(community_cards, hole_cards))
+        
+        breakdown = []
+        class_counts: Dict[int, int] = {}
+        for card, trials, card_wins, card_ties in next_cards:
+            hand_class = self._hand_class(self.evaluator.evaluate(community_cards + [card], hole_cards))
+            win_prob = card_wins / trials * 100 if trials else 0.0
+            tie_prob = card_ties / trials * 100 if trials else 0.0
+            improves = hand_class < current_class
+            if improves:
+                class_counts[hand_class] = class_counts.get(hand_class, 0) + 1
+            
+            breakdown.append(NextCardEquity(
+                card=Card.from_treys_format(card).dict(),
+                win_probability=round(win_prob, 2),
+                tie_probability=round(tie_prob, 2),
+                hand_class=HAND_CLASS_NAMES[hand_class],
+                is_out=improves and win_prob + tie_prob / 2 >= OUT_EQUITY_THRESHOLD
+            ))
+        
+        # Best equity first
+        breakdown.sort(key=lambda entry: entry.win_probability + entry.tie_probability / 2, reverse=True)
+        
+        total = len(next_cards)
+        return DrawAnalysis(
+            next_street="turn" if len(community_cards) == 3 else "river",
+            current_class=HAND_CLASS_NAMES[current_class],
+            outs=[entry.card for entry in breakdown if entry.is_out],
+            improve_probability=round(sum(class_counts.values()) / total * 100, 2),
+            improvement_probabilities={
+                HAND_CLASS_NAMES[hand_class]: round(count / total * 100, 2)
+                for hand_class, count in sorted(class_counts.items())
+            },
+            next_cards=breakdown
+        )
     
     def _evaluate_current_hand(self, hole_cards: List[int], community_cards: List[int]) -> HandStrength:
         """
@@ -225,22 +794,9 @@ class PokerEngine:
         
         # Complete board (5 cards) - use treys evaluator
         hand_rank = self.evaluator.evaluate(community_cards, hole_cards)
-        hand_class = self.evaluator.get_rank_class(hand_rank)
-        
-        # Map treys hand classes to readable descriptions
-        class_names = {
-            1: "Straight Flush",
-            2: "Four of a Kind", 
-            3: "Full House",
-            4: "Flush",
-            5: "Straight",
-            6: "Three of a Kind",
-            7: "Two Pair",
-            8: "Pair",
-            9: "High Card"
-        }
+        hand_class = self._hand_class(hand_rank)
         
-        hand_name = class_names.get(hand_class, "Unknown")
+        hand_name = HAND_CLASS_NAMES.get(hand_class, "Unknown")
         description = self._get_hand_description(hand_rank, hand_class, community_cards, hole_cards)
         
         return HandStrength(
@@ -250,112 +806,17 @@ class PokerEngine:
             category="made_hand" if hand_class <= 7 else "high_card"
         )
     
+    def _hand_class(self, hand_rank: int) -> int:
+        """treys hand class of a score, with the royal flush (class 0) kept as a straight flush"""
+        return max(self.evaluator.get_rank_class(hand_rank), 1)
+    
     def _analyze_incomplete_hand(self, hole_cards: List[int], community_cards: List[int]) -> HandStrength:
         """
         Analyze hand strength with incomplete board (flop/turn scenarios)
         """
-        # Convert cards to readable format for analysis
-        hole_readable = [TreysCard.int_to_pretty_str(card) for card in hole_cards]
-        community_readable = [TreysCard.int_to_pretty_str(card) for card in community_cards]
-        
-        # Analyze what we have and potential draws
-        all_cards = hole_cards + community_cards
-        
-        # Check for pairs, trips, etc. in current cards
-        ranks = [self._get_card_rank_value(card) for card in all_cards]
-        suits = [self._get_card_suit(card) for card in all_cards]
-        
-        rank_counts = {}
-        suit_counts = {}
-        
-        for rank in ranks:
-            rank_counts[rank] = rank_counts.get(rank, 0) + 1
-        for suit in suits:
-            suit_counts[suit] = suit_counts.get(suit, 0) + 1
-        
-        # Check for made hands
-        pairs = [rank for rank, count in rank_counts.items() if count == 2]
-        trips = [rank for rank, count in rank_counts.items() if count == 3]
-        quads = [rank for rank, count in rank_counts.items() if count == 4]
-        
-        # Check for flush potential
-        max_suit_count = max(suit_counts.values()) if suit_counts else 0
-        flush_draw = max_suit_count == 4
-        flush_made = max_suit_count >= 5
-        
-        # Check for straight potential
-        unique_ranks = sorted(set(ranks), reverse=True)
-        straight_made, straight_draw = self._check_straight_potential(unique_ranks)
-        
-        # Determine hand strength
-        if quads:
-            return HandStrength("Four of a Kind", f"Quad {self._rank_to_name(quads[0])}s", 8, "made_hand")
-        elif trips:
-            if pairs:
-                return HandStrength("Full House", f"{self._rank_to_name(trips[0])}s full of {self._rank_to_name(pairs[0])}s", 7, "made_hand")
-            else:
-                return HandStrength("Three of a Kind", f"Trip {self._rank_to_name(trips[0])}s", 6, "made_hand")
-        elif flush_made:
-            return HandStrength("Flush", f"{self._get_flush_suit_name(suit_counts)} flush", 6, "made_hand")
-        elif straight_made:
-            return HandStrength("Straight", f"{self._rank_to_name(max(unique_ranks))}-high straight", 5, "made_hand")
-        elif len(pairs) >= 2:
-            return HandStrength("Two Pair", f"{self._rank_to_name(max(pairs))}s and {self._rank_to_name(min(pairs))}s", 4, "made_hand")
-        elif pairs:
-            return HandStrength("Pair", f"Pair of {self._rank_to_name(pairs[0])}s", 3, "made_hand")
-        elif flush_draw and straight_draw:
-            return HandStrength("Straight Flush Draw", "Open-ended straight flush draw", 6, "drawing_hand")
-        elif straight_draw:
-            return HandStrength("Straight Draw", "Open-ended straight draw", 4, "drawing_hand")
-        elif flush_draw:
-            return HandStrength("Flush Draw", f"4-card flush draw", 4, "drawing_hand")
-        else:
-            high_card = max(ranks)
-            return HandStrength("High Card", f"{self._rank_to_name(high_card)} high", 2, "high_card")
-    
-    def _get_card_rank_value(self, card_int: int) -> int:
-        """Extract rank value from treys card integer"""
-        return (card_int >> 8) & 0xF
-    
-    def _get_card_suit(self, card_int: int) -> int:
-        """Extract suit from treys card integer"""
-        return card_int & 0xF
+        name, description, strength, category = classify_cards(hole_cards + community_cards)
+        return HandStrength(name, description, strength, category)
     
-    def _rank_to_name(self, rank_value: int) -> str:
-        """Convert rank value to readable name"""
-        rank_names = {14: "Ace", 13: "King", 12: "Queen", 11: "Jack", 10: "Ten",
-                      9: "Nine", 8: "Eight", 7: "Seven", 6: "Six", 5: "Five",
-                      4: "Four", 3: "Three", 2: "Two"}
-        return rank_names.get(rank_value, str(rank_value))
-    
-    def _get_flush_suit_name(self, suit_counts: dict) -> str:
-        """Get the name of the flush suit"""
-        max_suit = max(suit_counts.items(), key=lambda x: x[1])[0]
-        suit_names = {1: "Spades", 2: "Hearts", 4: "Diamonds", 8: "Clubs"}
-        return suit_names.get(max_suit, "Unknown")
-    
-    def _check_straight_potential(self, sorted_ranks: List[int]) -> tuple:
-        """Check for made straights and straight draws"""
-        if len(sorted_ranks) < 3:
-            return False, False
-            
-        # Check for made straight (5 consecutive)
-        for i in range(len(sorted_ranks) - 4):
-            if sorted_ranks[i] - sorted_ranks[i+4] == 4:
-                return True, False
-        
-        # Check for straight draw (4 consecutive or gaps)
-        for i in range(len(sorted_ranks) - 3):
-            if sorted_ranks[i] - sorted_ranks[i+3] <= 4:
-                return False, True
-                
-        # Special case: A-2-3-4 low straight
-        if 14 in sorted_ranks and 2 in sorted_ranks and 3 in sorted_ranks and 4 in sorted_ranks:
-            return False, True
-            
-        # Default case: no straight potential
-        return False, False
-            
     def _analyze_preflop_hand(self, hole_cards: List[int]) -> HandStrength:
         """
         Analyze pre-flop hand strength
@@ -448,45 +909,75 @@ class PokerEngine:
         """
         Generate opponent range analysis based on player count
         """
-        profiles = [
-            ("Tight-Aggressive", "15-20% of hands", ["High pairs (99+)", "Strong aces (AQ+)", "Suited connectors (JT+)"]),
-            ("Loose-Aggressive", "25-35% of hands", ["Medium pairs (66+)", "Suited cards", "Broadway cards"]),
-            ("Tight-Passive", "10-15% of hands", ["Premium pairs (JJ+)", "Strong aces (AK, AQ)"]),
-            ("Loose-Passive", "30-45% of hands", ["Any pair", "Suited cards", "Face cards", "Connecting cards"])
-        ]
-        
         # Return appropriate number of opponent profiles
-        opponents_needed = min(player_count - 1, len(profiles))
+        opponents_needed = min(player_count - 1, len(OPPONENT_PROFILES))
         return [
-            OpponentRange(profile=profile[0], range=profile[1], likely_holdings=profile[2])
-            for profile in profiles[:opponents_needed]
+            OpponentRange(profile=profile[0], range=profile[1], likely_holdings=list(profile[2]))
+            for profile in OPPONENT_PROFILES[:opponents_needed]
         ]
     
-    def _generate_recommendation(self, probabilities: Dict[str, float], hand_strength: HandStrength) -> Recommendation:
+    def _generate_recommendation(
+        self,
+        probabilities: Dict[str, float],
+        hand_strength: HandStrength,
+        player_count: int = 2,
+        betting: Optional[BettingContext] = None
+    ) -> Recommendation:
         """
         Generate strategic recommendation based on probabilities and hand strength
+
+        With a betting context the action with the highest EV at the simulated
+        equity is recommended; otherwise fixed win probability thresholds apply.
         """
+        if betting is not None:
+            return self._ev_recommendation(probabilities, player_count, betting)
+        
         win_prob = probabilities['win']
         
         if win_prob >= 60:
-            action = "Bet/Raise"
-            reason = "Strong hand with high win probability"
-            confidence = "High (85%+)"
+            action, reason, confidence = RECOMMENDATIONS[0]
         elif win_prob >= 40:
-            action = "Call/Check"
-            reason = "Decent hand with reasonable equity"
-            confidence = "Medium (70%)"
+            action, reason, confidence = RECOMMENDATIONS[1]
         elif win_prob >= 25:
-            action = "Check/Call"
-            reason = "Drawing hand with some equity"
-            confidence = "Low (55%)"
+            action, reason, confidence = RECOMMENDATIONS[2]
         else:
-            action = "Fold"
-            reason = "Weak hand with poor equity"
-            confidence = "High (80%+)"
+            action, reason, confidence = RECOMMENDATIONS[3]
         
         return Recommendation(
             action=action,
             reason=reason,
-            confidence=confidence
-        )
\ No newline at end of file
+            confidence=confidence,
+            action_code=ACTION_CODES[action]
+        )
+    
+    def _ev_recommendation(
+        self,
+        probabilities: Dict[str, float],
+        player_count: int,
+        betting: BettingContext
+    ) -> Recommendation:
+        """
+        Recommend the highest-EV action for the pot, bet and stacks
+        """
+        equity = probabilities['equity']
+        action, evs, stable = best_action(
+            equity, probabilities['confidence'], betting, player_count - 1
+        )
+        odds = pot_odds(betting)
+        
+        facing_bet = betting.to_call > 0
+        labels = EV_LABELS[facing_bet]
+        if facing_bet:
+            reason = f"{equity:.1f}% equity against {odds:.1f}% pot odds"
+        else:
+            reason = f"{equity:.1f}% equity with no bet to call"
+        reason += f"; {labels[action].lower()} EV {evs[action]:+.2f} chips"
+        
+        return Recommendation(
+            action=labels[action],
+            reason=reason,
+            confidence=EV_CONFIDENCES[stable],
+            expected_values={labels[name]: value for name, value in evs.items()},
+            pot_odds=round(odds, 2),
+            action_code=action
+        )
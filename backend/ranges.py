@@ -0,0 +1,84 @@
+import itertools
+import re
+from typing import List, Tuple
+from treys import Card as TreysCard
+
+# Hand range strings, e.g. "QQ+, AKs, ATo+, 76s, 22-55, A2s-A5s, AhKh".
+#
+#   AA, AKs, AKo, AK     a pair, suited, offsuit or any two cards of two ranks
+#   TT+                  the pair and every higher pair
+#   ATs+, ATo+, AT+      kicker from T up to one below the high card
+#   22-55, A2s-A5s       every hand between the two, inclusive
+#   AhKh                 one specific combo
+
+RANKS = "23456789TJQKA"
+SUITS = "cdhs"
+
+_HAND = re.compile(r"^([2-9TJQKA])([2-9TJQKA])([so]?)(\+?)$")
+_SPAN = re.compile(r"^([2-9TJQKA])([2-9TJQKA])([so]?)-([2-9TJQKA])([2-9TJQKA])([so]?)$")
+_COMBO = re.compile(r"^([2-9TJQKA][cdhs])([2-9TJQKA][cdhs])$")
+
+Combo = Tuple[int, int]
+
+def _combos(high: int, low: int, kind: str) -> List[Combo]:
+    if high == low:
+        pairs = itertools.combinations(SUITS, 2)
+        return [(TreysCard.new(RANKS[high] + a), TreysCard.new(RANKS[low] + b)) for a, b in pairs]
+    return [
+        (TreysCard.new(RANKS[high] + a), TreysCard.new(RANKS[low] + b))
+        for a in SUITS for b in SUITS
+        if (kind != "s" or a == b) and (kind != "o" or a != b)
+    ]
+
+def _token_combos(token: str) -> List[Combo]:
+    match = _COMBO.match(token)
+    if match:
+        first, second = TreysCard.new(match.group(1)), TreysCard.new(match.group(2))
+        if first == second:
+            raise ValueError(f"Invalid range combo: {token}")
+        return [(first, second)]
+
+    match = _HAND.match(token)
+    if match:
+        high, low = sorted((RANKS.index(match.group(1)), RANKS.index(match.group(2))), reverse=True)
+        kind, plus = match.group(3), match.group(4)
+        if high == low and kind:
+            raise ValueError(f"Pairs cannot be suited or offsuit: {token}")
+        if not plus:
+            return _combos(high, low, kind)
+        if high == low:
+            return [combo for rank in range(low, 13) for combo in _combos(rank, rank, "")]
+        return [combo for kicker in range(low, high) for combo in _combos(high, kicker, kind)]
+
+    match = _SPAN.match(token)
+    if match:
+        first = sorted((RANKS.index(match.group(1)), RANKS.index(match.group(2))), reverse=True)
+        last = sorted((RANKS.index(match.group(4)), RANKS.index(match.group(5))), reverse=True)
+        kind = match.group(3)
+        if kind != match.group(6):
+            raise ValueError(f"Invalid range span: {token}")
+        if first[0] == first[1] and last[0] == last[1]:
+            lo, hi = sorted((first[0], last[0]))
+            return [combo for rank in range(lo, hi + 1) for combo in _combos(rank, rank, "")]
+        if first[0] == last[0] and first[0] not in (first[1], last[1]):
+            lo, hi = sorted((first[1], last[1]))
+            return [combo for kicker in range(lo, hi + 1) for combo in _combos(first[0], kicker, kind)]
+        raise ValueError(f"Invalid range span: {token}")
+
+    raise ValueError(f"Invalid range token: {token}")
+
+def parse_range(text: str) -> List[Combo]:
+    """Parse a range string into its distinct combos of treys cards; raises ValueError"""
+    combos: List[Combo] = []
+    seen = set()
+    for token in text.replace(" ", "").split(","):
+        if not token:
+            continue
+        for combo in _token_combos(token):
+            key = frozenset(combo)
+            if key not in seen:
+                seen.add(key)
+                combos.append(combo)
+    if not combos:
+        raise ValueError("Range is empty")
+    return combos
@@ -0,0 +1,194 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+# Seconds a store call waits for another process's write lock. Calls run on
+# the event loop, so this stays short and a busy store fails open instead.
+STORE_TIMEOUT = 0.05
+
+# Bucket state: (tokens, updated_at, charged, requests, rejected)
+BucketState = Tuple[float, float, int, int, int]
+
+class _MemoryStore:
+    """Bucket state for this process only"""
+
+    def __init__(self):
+        self._buckets: Dict[str, BucketState] = {}
+        self._lock = threading.Lock()
+
+    def update(self, user_id: str, fn) -> Any:
+        with self._lock:
+            state, result = fn(self._buckets.get(user_id))
+            self._buckets[user_id] = state
+            return result
+
+    def load(self, user_id: str) -> Optional[BucketState]:
+        return self._buckets.get(user_id)
+
+class _SqliteStore:
+    """Bucket state in a local SQLite file so every worker process shares it"""
+
+    def __init__(self, path: str, timeout: float = STORE_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS compute_buckets ("
+                "user_id TEXT PRIMARY KEY, tokens REAL, updated_at REAL, "
+                "charged INTEGER, requests INTEGER, rejected INTEGER)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def update(self, user_id: str, fn) -> Any:
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front so read-modify-write is atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state, result = fn(self.load(user_id))
+            conn.execute(
+                "INSERT OR REPLACE INTO compute_buckets VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, *state)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def load(self, user_id: str) -> Optional[BucketState]:
+        row = self._connect().execute(
+            "SELECT tokens, updated_at, charged, requests, rejected FROM compute_buckets WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+class ComputeRateLimiter:
+    """
+    Per-user token buckets charged by simulated work.
+
+    A request costs iterations x players. Buckets hold up to `capacity` and
+    refill at `refill_per_second`. With a store path the buckets live in a
+    shared SQLite file, otherwise in process memory. When the file is locked
+    for longer than STORE_TIMEOUT or fails, requests are let through
+    uncharged and the error is logged.
+    """
+
+    def __init__(self, capacity: int, refill_per_second: float, store_path: Optional[str] = None):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._store = _SqliteStore(store_path) if store_path else _MemoryStore()
+
+        # Counters exposed through metrics(), this process only
+        self.allowed = 0
+        self.rejected = 0
+        self.store_errors = 0
+
+    def _update(self, user_id: str, fn) -> Any:
+        """Apply fn to the user's bucket; None without changes if the store fails"""
+        try:
+            return self._store.update(user_id, fn)
+        except sqlite3.Error as e:
+            self.store_errors += 1
+            logger.warning("Compute limit store unavailable, skipping update for %s: %s", user_id, e)
+            return None
+
+    def _refill(self, state: Optional[BucketState], now: float) -> BucketState:
+        if state is None:
+            return (float(self.capacity), now, 0, 0, 0)
+        tokens, updated_at, charged, requests, rejected = state
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+        return (tokens, now, charged, requests, rejected)
+
+    def charge(self, user_id: str, cost: int):
+        """Take cost from the user's bucket or raise HTTPException(429) with Retry-After"""
+        # A single request can never need more than a full bucket
+        cost = min(cost, self.capacity)
+        now = time.time()
+
+        def take(state):
+            tokens, updated_at, charged, requests, rejected = self._refill(state, now)
+            if tokens >= cost:
+                return (tokens - cost, updated_at, charged + cost, requests + 1, rejected), None
+            retry_after = (cost - tokens) / self.refill_per_second
+            return (tokens, updated_at, charged, requests, rejected + 1), retry_after
+
+        retry_after = self._update(user_id, take)
+        if retry_after is None:
+            self.allowed += 1
+            return
+
+        self.rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Compute limit reached, retry in {math.ceil(retry_after)}s",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+    def refund(self, user_id: str, amount: int):
+        """Return tokens for work that was charged but not performed"""
+        if amount <= 0:
+            return
+        now = time.time()
+
+        def give(state):
+            tokens, updated_at, charged, requests, rejected = self._refill(state, now)
+            return (min(self.capacity, tokens + amount), updated_at, charged - amount, requests, rejected), None
+
+        self._update(user_id, give)
+
+    def settle(self, user_id: str, charged: int, used: int):
+        """
+        Reconcile an up-front charge with the work actually done
+
+        Refunds the unused part. Work beyond the charge is taken without
+        rejecting, since it is already done; the bucket may go negative,
+        which delays the user's next request until it refills.
+        """
+        charged = min(charged, self.capacity)
+        if used <= charged:
+            self.refund(user_id, charged - used)
+            return
+        extra = used - charged
+        now = time.time()
+
+        def take(state):
+            tokens, updated_at, total, requests, rejected = self._refill(state, now)
+            return (max(-self.capacity, tokens - extra), updated_at, total + extra, requests, rejected), None
+
+        self._update(user_id, take)
+
+    def usage(self, user_id: str) -> Dict[str, Any]:
+        """Current bucket level and lifetime counters for one user"""
+        try:
+            state = self._store.load(user_id)
+        except sqlite3.Error as e:
+            self.store_errors += 1
+            logger.warning("Compute limit store unavailable, reporting a full bucket for %s: %s", user_id, e)
+            state = None
+        tokens, _, charged, requests, rejected = self._refill(state, time.time())
+        return {
+            "available": int(tokens),
+            "capacity": self.capacity,
+            "refill_per_second": self.refill_per_second,
+            "charged": charged,
+            "requests": requests,
+            "rejected": rejected
+        }
+
+    def metrics(self) -> Dict[str, int]:
+        """Counters for the metrics endpoint"""
+        return {"allowed": self.allowed, "rejected": self.rejected, "store_errors": self.store_errors}
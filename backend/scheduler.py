@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import itertools
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Tuple
+
+# Share of engine capacity per subscription tier under contention
+TIER_WEIGHTS: Dict[str, float] = {
+    "yearly": 3.0,
+    "monthly": 2.0,
+    "default": 1.0,
+}
+
+class _FairQueue:
+    """
+    Start-time fair queue over per-user flows.
+
+    Each task gets a virtual start tag of max(virtual time, the user's last
+    finish tag) and a finish tag of start + cost / weight. Tasks are served
+    in start-tag order, so a user who keeps submitting expensive work pushes
+    their own later tasks back without delaying anyone else's.
+    """
+
+    def __init__(self):
+        self.heap: List[Tuple[float, int, Any]] = []
+        self.virtual_time = 0.0
+        self.user_finish: Dict[str, float] = {}
+
+    def push(self, user_id: str, cost: float, weight: float, seq: int, entry: Any):
+        start = max(self.virtual_time, self.user_finish.get(user_id, 0.0))
+        self.user_finish[user_id] = start + cost / weight
+        heapq.heappush(self.heap, (start, seq, entry))
+
+    def pop(self) -> Any:
+        start, _, entry = heapq.heappop(self.heap)
+        self.virtual_time = max(self.virtual_time, start)
+
+        # Users whose tags fall behind virtual time are idle; forget them
+        if len(self.user_finish) > 10000:
+            self.user_finish = {
+                user: tag for user, tag in self.user_finish.items() if tag > self.virtual_time
+            }
+        return entry
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+class EngineScheduler:
+    """
+    Priority scheduler in front of the engine executor.
+
+    At most `slots` tasks are handed to the executor at once; everything else
+    waits here so the ordering decision is made at dispatch time. Interactive
+    work always goes before batch work, and each class is shared between
+    users by weighted fair queuing on iteration cost.
+    """
+
+    def __init__(self, executor: Executor, slots: int, weights: Dict[str, float] = TIER_WEIGHTS):
+        self.executor = executor
+        self.slots = slots
+        self.weights = weights
+
+        self._interactive = _FairQueue()
+        self._batch = _FairQueue()
+        self._seq = itertools.count()
+        self._running = 0
+
+        # Counters exposed through metrics()
+        self.dispatched: Dict[str, int] = {}
+        self.cost: Dict[str, int] = {}
+        self.wait_ms: Dict[str, float] = {}
+
+    async def submit(
+        self,
+        fn: Callable[[], Any],
+        user_id: str,
+        tier: str = "default",
+        cost: int = 1,
+        interactive: bool = True
+    ) -> Any:
+        """Queue fn for the executor and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        label = tier if interactive else "batch"
+        entry = (future, fn, label, cost, time.perf_counter())
+
+        queue = self._interactive if interactive else self._batch
+        queue.push(user_id, cost, self.weights.get(tier, 1.0), next(self._seq), entry)
+        self._dispatch()
+
+        return await future
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depths and per-class dispatch, cost and mean wait"""
+        return {
+            "running": self._running,
+            "slots": self.slots,
+            "queued_interactive": len(self._interactive),
+            "queued_batch": len(self._batch),
+            "dispatched": dict(self.dispatched),
+            "cost": dict(self.cost),
+            "mean_wait_ms": {
+                label: round(self.wait_ms[label] / count, 1)
+                for label, count in self.dispatched.items()
+            }
+        }
+
+    def _dispatch(self):
+        while self._running < self.slots:
+            if self._interactive:
+                queue = self._interactive
+            elif self._batch:
+                queue = self._batch
+            else:
+                return
+
+            future, fn, label, cost, queued_at = queue.pop()
+            if future.cancelled():
+                # Caller went away while queued
+                continue
+
+            self._running += 1
+            self.dispatched[label] = self.dispatched.get(label, 0) + 1
+            self.cost[label] = self.cost.get(label, 0) + cost
+            self.wait_ms[label] = self.wait_ms.get(label, 0.0) + (time.perf_counter() - queued_at) * 1000
+
+            work = asyncio.get_running_loop().run_in_executor(self.executor, fn)
+            work.add_done_callback(lambda done, future=future: self._finish(done, future))
+
+    def _finish(self, done: asyncio.Future, future: asyncio.Future):
+        self._running -= 1
+        if not future.cancelled():
+            if done.cancelled():
+                future.cancel()
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+        self._dispatch()
@@ -1,21 +1,50 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+import asyncio
+import hmac
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from functools import partial
 from pathlib import Path
-from models import AnalysisRequest, AnalysisResponse, HandHistory
-from poker_engine import PokerEngine, Card
-from auth_routes import router as auth_router, get_current_subscribed_user
+from typing import List, Optional, Tuple
+import uuid
+from models import (
+    AnalysisRequest, AnalysisResponse, ComputeUsage, HandHistoryPage, JobStatus, UserStats,
+    SessionCreateRequest, SessionStreetRequest, SessionAnalysis, EquityGridRequest, EquityGrid,
+    IcmRequest, IcmResult, AllInEquity, BoardTexture, BoardTextureRequest
+)
+from poker_engine import PokerEngine, Card, OpponentSpec
+from ranges import parse_range
+from ev import BettingContext
+from icm import all_in_equity, icm_equity
+from hand_history import HandHistoryWriter, get_hand_history_page
+from hand_stats import get_user_stats
+from indexes import SlowQueryListener, audit_query_plans, ensure_indexes
+from singleflight import SingleFlight
+from analysis_jobs import AnalysisJobQueue
+from scheduler import EngineScheduler
+from rate_limit import ComputeRateLimiter
+from hand_session import HandSession
+from cache import TTLCache
+from batch_eval import card_index
+from board_texture import analyze_board
+from equity_grid import GRID_RANKS, EQUITY_SCALE, canonical_board, compute_equity_grid
+from auth_routes import router as auth_router, get_current_user, get_current_subscribed_user
 from auth_models import User
+from auth_service import token_cache, user_cache
+from subscription_service import backfill_subscription_plans
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+slow_query_listener = SlowQueryListener(threshold_ms=int(os.environ.get('MONGO_SLOW_QUERY_MS', 100)))
+client = AsyncIOMotorClient(mongo_url, event_listeners=[slow_query_listener])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -31,10 +60,290 @@ api_router = APIRouter(prefix="/api")
 # Initialize poker engine
 poker_engine = PokerEngine()
 
+# Simulations run off the event loop, ordered by subscription tier and per-user
+# fairness; identical concurrent requests share one run
+ENGINE_WORKERS = int(os.environ.get('ENGINE_WORKERS', os.cpu_count() or 4))
+engine_executor = ThreadPoolExecutor(max_workers=ENGINE_WORKERS, thread_name_prefix="poker-engine")
+engine_scheduler = EngineScheduler(engine_executor, slots=ENGINE_WORKERS)
+analysis_flight = SingleFlight()
+
+# Hard ceiling on engine time per request, applied on top of any client budget
+MAX_ANALYSIS_TIME_MS = int(os.environ.get('MAX_ANALYSIS_TIME_MS', 10000))
+
+# Street-by-street sessions: session id -> (user id, lock, HandSession, request
+# hole cards). Idle sessions expire and the oldest are evicted beyond MAX_SESSIONS;
+# a user starting more than MAX_SESSIONS_PER_USER loses their own oldest first.
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 30 * 60))
+hand_sessions = TTLCache(max_size=int(os.environ.get('MAX_SESSIONS', 200)), ttl=SESSION_TTL)
+MAX_SESSIONS_PER_USER = int(os.environ.get('MAX_SESSIONS_PER_USER', 5))
+
+# Equity grids by (canonical board, player count, samples)
+grid_cache = TTLCache(
+    max_size=int(os.environ.get('GRID_CACHE_SIZE', 256)),
+    ttl=int(os.environ.get('GRID_CACHE_TTL', 60 * 60))
+)
+
+# Board texture and combo scores by canonical board
+texture_cache = TTLCache(
+    max_size=int(os.environ.get('TEXTURE_CACHE_SIZE', 4096)),
+    ttl=int(os.environ.get('TEXTURE_CACHE_TTL', 60 * 60))
+)
+
+# Per-user compute budget in iterations x players; set COMPUTE_LIMIT_STORE to a
+# file path to share buckets between worker processes
+compute_limiter = ComputeRateLimiter(
+    capacity=int(os.environ.get('COMPUTE_BUCKET_CAPACITY', 20000000)),
+    refill_per_second=float(os.environ.get('COMPUTE_REFILL_PER_SECOND', 200000)),
+    store_path=os.environ.get('COMPUTE_LIMIT_STORE')
+)
+
+# Heavy analyses submitted as background jobs get a larger ceiling
+MAX_JOB_TIME_MS = int(os.environ.get('MAX_JOB_TIME_MS', 300000))
+analysis_jobs = AnalysisJobQueue(
+    db,
+    workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_active_per_user=int(os.environ.get('MAX_ACTIVE_JOBS_PER_USER', 3)),
+    result_ttl=float(os.environ.get('JOB_RESULT_TTL', 24 * 60 * 60)),
+    stale_after=float(os.environ.get('JOB_STALE_AFTER', 60))
+)
+
+# Hand history is written behind the response in batches
+hand_history_writer = HandHistoryWriter(
+    db,
+    batch_size=int(os.environ.get('HAND_HISTORY_BATCH_SIZE', 200)),
+    flush_interval=float(os.environ.get('HAND_HISTORY_FLUSH_INTERVAL', 1.0)),
+    max_buffer_size=int(os.environ.get('HAND_HISTORY_BUFFER_SIZE', 10000))
+)
+
 # Get database function for dependency injection
 def get_db() -> AsyncIOMotorDatabase:
     return db
 
+# Card ranks and suits accepted in requests
+VALID_RANKS = frozenset(['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A'])
+VALID_SUITS = frozenset(['hearts', 'diamonds', 'clubs', 'spades'])
+
+def validate_cards(cards: list, label: str):
+    """Raise HTTPException(400) for the first malformed card; None entries are allowed"""
+    for i, card in enumerate(cards):
+        if card and (card.rank not in VALID_RANKS or card.suit not in VALID_SUITS):
+            raise HTTPException(status_code=400, detail=f"Invalid {label} card format at position {i+1}: {card}")
+
+def parse_analysis_cards(request: AnalysisRequest) -> Tuple[List[Card], List[Optional[Card]]]:
+    """
+    Validate the cards of an analysis request and convert them to engine cards.
+
+    Raises HTTPException(400) for malformed, missing or duplicate cards.
+    """
+    # Validate card formats before conversion
+    validate_cards(request.hole_cards, "hole")
+    validate_cards(request.community_cards, "community")
+
+    # Convert request cards to engine format
+    try:
+        hole_cards = [Card(rank=card.rank, suit=card.suit) for card in request.hole_cards if card]
+        community_cards = [
+            Card(rank=card.rank, suit=card.suit) if card else None 
+            for card in request.community_cards
+        ]
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error converting card format: {str(e)}"
+        )
+
+    # Validate hole cards
+    if len(hole_cards) != 2:
+        raise HTTPException(
+            status_code=400, 
+            detail="Exactly 2 hole cards are required"
+        )
+
+    # Validate community cards count
+    community_count = len([c for c in community_cards if c])
+    if community_count > 5:
+        raise HTTPException(
+            status_code=400, 
+            detail="Maximum 5 community cards allowed"
+        )
+
+    # Check for duplicate cards
+    all_cards = hole_cards + [c for c in community_cards if c]
+    card_strings = [f"{c.rank}_{c.suit}" for c in all_cards]
+    if len(card_strings) != len(set(card_strings)):
+        raise HTTPException(
+            status_code=400,
+            detail="Duplicate cards detected"
+        )
+
+    return hole_cards, community_cards
+
+def parse_opponents(
+    request: AnalysisRequest,
+    hole_cards: List[Card],
+    community_cards: List[Optional[Card]]
+) -> Optional[List[OpponentSpec]]:
+    """
+    Validate the opponent seats of an analysis request and convert them to engine specs.
+
+    Raises HTTPException(400) for too many seats, malformed or duplicate cards
+    and invalid ranges.
+    """
+    if not request.opponents:
+        return None
+    if len(request.opponents) > request.player_count - 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {request.player_count - 1} opponents for {request.player_count} players"
+        )
+
+    seen = {f"{c.rank}_{c.suit}" for c in hole_cards + [c for c in community_cards if c]}
+    opponents = []
+    for i, seat in enumerate(request.opponents):
+        if seat.hole_cards:
+            if len(seat.hole_cards) != 2:
+                raise HTTPException(status_code=400, detail=f"Opponent {i+1} needs exactly 2 hole cards")
+            validate_cards(seat.hole_cards, f"opponent {i+1}")
+            for card in seat.hole_cards:
+                if f"{card.rank}_{card.suit}" in seen:
+                    raise HTTPException(status_code=400, detail="Duplicate cards detected")
+                seen.add(f"{card.rank}_{card.suit}")
+            opponents.append(OpponentSpec(
+                hole_cards=[Card(rank=card.rank, suit=card.suit) for card in seat.hole_cards]
+            ))
+        elif seat.range:
+            try:
+                parse_range(seat.range)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid range for opponent {i+1}: {e}")
+            opponents.append(OpponentSpec(range=seat.range))
+        else:
+            opponents.append(OpponentSpec())
+    return opponents
+
+async def run_analysis(
+    request: AnalysisRequest,
+    hole_cards: List[Card],
+    community_cards: List[Optional[Card]],
+    max_time_ms: int,
+    user_id: str,
+    tier: str = "default",
+    interactive: bool = True
+) -> AnalysisResponse:
+    """Run the engine through the scheduler, capped at max_time_ms"""
+    time_budget_ms = min(request.time_budget_ms or max_time_ms, max_time_ms)
+    opponents = parse_opponents(request, hole_cards, community_cards)
+
+    # Perform analysis, joining an identical in-flight request if there is one.
+    # Interactive and batch runs never share a flight: an interactive caller
+    # must not wait behind a batch-tier execution in the scheduler queue.
+    # Cards keep the order given, since the shared result reflects it
+    analysis_key = (
+        interactive,
+        tuple((c.rank, c.suit) for c in hole_cards),
+        tuple((c.rank, c.suit) for c in community_cards if c),
+        request.player_count,
+        request.simulation_iterations,
+        time_budget_ms,
+        tuple(
+            (tuple((c.rank, c.suit) for c in seat.hole_cards or []), seat.range)
+            for seat in opponents or []
+        ),
+        tuple(sorted(request.betting.dict().items())) if request.betting else None,
+        request.include_distribution
+    )
+    cost = request.simulation_iterations * request.player_count
+    try:
+        result = await analysis_flight.do(
+            analysis_key,
+            lambda: engine_scheduler.submit(
+                partial(
+                    poker_engine.analyze_hand,
+                    hole_cards=hole_cards,
+                    community_cards=community_cards,
+                    player_count=request.player_count,
+                    simulation_iterations=request.simulation_iterations,
+                    time_budget_ms=time_budget_ms,
+                    opponents=opponents,
+                    betting=BettingContext(**request.betting.dict()) if request.betting else None,
+                    include_distribution=request.include_distribution
+                ),
+                user_id=user_id,
+                tier=tier,
+                cost=cost,
+                interactive=interactive
+            ),
+            cost=cost
+        )
+    except ValueError as e:
+        # Opponent seats the engine could not resolve, e.g. a range blocked by known cards
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = to_response(result)
+
+    # A cache miss scores 1,326 combos in a few milliseconds; hits take microseconds
+    board = [card_index(card.to_treys_format()) for card in community_cards if card]
+    if len(board) >= 3:
+        hole = [card_index(card.to_treys_format()) for card in hole_cards]
+        response.texture = BoardTexture(**asdict(analyze_board(board, hole, cache=texture_cache)))
+
+    if request.tournament:
+        tournament = request.tournament
+        try:
+            response.icm = AllInEquity(**all_in_equity(
+                tournament.stacks, tournament.payouts,
+                tournament.hero_seat, tournament.opponent_seat,
+                response.win_probability, response.tie_probability,
+                pot=tournament.pot
+            ).__dict__)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid tournament context: {e}")
+    return response
+
+def to_response(result) -> AnalysisResponse:
+    """Convert an engine AnalysisResult to the API response model"""
+    return AnalysisResponse(
+        win_probability=result.win_probability,
+        tie_probability=result.tie_probability,
+        lose_probability=result.lose_probability,
+        hand_strength=result.hand_strength.__dict__,
+        opponent_ranges=[range.__dict__ for range in result.opponent_ranges],
+        recommendation=result.recommendation.__dict__,
+        calculations=result.calculations.__dict__,
+        draws=asdict(result.draws) if result.draws else None,
+        seats=[asdict(seat) for seat in result.seats] if result.seats else None,
+        distribution=asdict(result.distribution) if result.distribution else None
+    )
+
+def settle_analysis_charge(user_id: str, cost: int, request: AnalysisRequest, response: AnalysisResponse):
+    """Settle an up-front charge against the iterations the engine actually ran"""
+    completed = response.calculations.iterations_completed
+    if completed is not None:
+        compute_limiter.settle(user_id, cost, completed * request.player_count)
+
+def user_tier(user: User) -> str:
+    """Scheduler tier for a user's interactive requests"""
+    return user.subscription_plan or "default"
+
+async def analyze_hand_job(payload: dict, user_id: str) -> dict:
+    """Job handler for analyze-hand jobs, scheduled as batch work"""
+    request = AnalysisRequest(**payload)
+    # Charged when the job was submitted
+    cost = request.simulation_iterations * request.player_count
+    try:
+        hole_cards, community_cards = parse_analysis_cards(request)
+        response = await run_analysis(
+            request, hole_cards, community_cards, MAX_JOB_TIME_MS,
+            user_id=user_id, interactive=False
+        )
+    except Exception:
+        compute_limiter.settle(user_id, cost, 0)
+        raise
+    settle_analysis_charge(user_id, cost, request, response)
+    return response.dict()
+
+analysis_jobs.register("analyze-hand", analyze_hand_job)
+
 @api_router.post("/analyze-hand", response_model=AnalysisResponse)
 async def analyze_hand(
     request: AnalysisRequest,
@@ -47,100 +356,28 @@ async def analyze_hand(
     Requires active subscription to access.
     Uses Monte Carlo simulations for early streets (preflop, flop) and combinatorial analysis 
     for later streets (turn, river) when possible.
+    Simulation stops early when time_budget_ms (or the server ceiling) runs out.
     """
     try:
-        # Validate card formats before conversion
-        def validate_card_format(card):
-            if not card:
-                return True  # None is allowed
-            if not hasattr(card, 'rank') or not hasattr(card, 'suit'):
-                return False
-            valid_ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-            valid_suits = ['hearts', 'diamonds', 'clubs', 'spades']
-            return card.rank in valid_ranks and card.suit in valid_suits
-        
-        # Check hole cards format
-        for i, card in enumerate(request.hole_cards):
-            if not validate_card_format(card):
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid hole card format at position {i+1}: {card}"
-                )
-        
-        # Check community cards format
-        for i, card in enumerate(request.community_cards):
-            if not validate_card_format(card):
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid community card format at position {i+1}: {card}"
-                )
+        hole_cards, community_cards = parse_analysis_cards(request)
         
-        # Convert request cards to engine format
+        # Charge the requested work up front, then settle against what the
+        # engine ran: turn and river always run a fixed iteration count
+        cost = request.simulation_iterations * request.player_count
+        compute_limiter.charge(current_user.id, cost)
         try:
-            hole_cards = [Card(rank=card.rank, suit=card.suit) for card in request.hole_cards if card]
-            community_cards = [
-                Card(rank=card.rank, suit=card.suit) if card else None 
-                for card in request.community_cards
-            ]
-        except Exception as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Error converting card format: {str(e)}"
-            )
-        
-        # Validate hole cards
-        if len(hole_cards) != 2:
-            raise HTTPException(
-                status_code=400, 
-                detail="Exactly 2 hole cards are required"
+            response = await run_analysis(
+                request, hole_cards, community_cards, MAX_ANALYSIS_TIME_MS,
+                user_id=current_user.id, tier=user_tier(current_user)
             )
+        except Exception:
+            # No result for the charge, e.g. opponents the engine rejected
+            compute_limiter.settle(current_user.id, cost, 0)
+            raise
+        settle_analysis_charge(current_user.id, cost, request, response)
         
-        # Validate community cards count
-        community_count = len([c for c in community_cards if c])
-        if community_count > 5:
-            raise HTTPException(
-                status_code=400, 
-                detail="Maximum 5 community cards allowed"
-            )
-        
-        # Check for duplicate cards
-        all_cards = hole_cards + [c for c in community_cards if c]
-        card_strings = [f"{c.rank}_{c.suit}" for c in all_cards]
-        if len(card_strings) != len(set(card_strings)):
-            raise HTTPException(
-                status_code=400,
-                detail="Duplicate cards detected"
-            )
-        
-        # Perform analysis
-        result = poker_engine.analyze_hand(
-            hole_cards=hole_cards,
-            community_cards=community_cards,
-            player_count=request.player_count,
-            simulation_iterations=request.simulation_iterations
-        )
-        
-        # Convert to response format
-        response = AnalysisResponse(
-            win_probability=result.win_probability,
-            tie_probability=result.tie_probability,
-            lose_probability=result.lose_probability,
-            hand_strength=result.hand_strength.__dict__,
-            opponent_ranges=[range.__dict__ for range in result.opponent_ranges],
-            recommendation=result.recommendation.__dict__,
-            calculations=result.calculations.__dict__
-        )
-        
-        # Store in database (optional)
-        try:
-            hand_history = HandHistory(
-                analysis_request=request,
-                analysis_response=response,
-                user_id=current_user.id
-            )
-            await db.hand_history.insert_one(hand_history.dict())
-        except Exception as e:
-            logging.warning(f"Failed to save hand history: {e}")
+        # Queue for the write-behind buffer (optional, dropped when full)
+        hand_history_writer.record(request, response, user_id=current_user.id)
         
         return response
         
@@ -153,6 +390,300 @@ async def analyze_hand(
             detail=f"Internal server error during analysis: {str(e)}"
         )
 
+@api_router.post("/jobs/analyze-hand", response_model=JobStatus, status_code=202)
+async def submit_analyze_hand_job(
+    request: AnalysisRequest,
+    current_user: User = Depends(get_current_subscribed_user)
+):
+    """
+    Queue a hand analysis as a background job and return its id.
+
+    Jobs may run up to the job time ceiling instead of the interactive one.
+    Poll GET /api/jobs/{job_id} for the result.
+    """
+    # Reject bad cards now rather than in the worker
+    parse_analysis_cards(request)
+    cost = request.simulation_iterations * request.player_count
+    compute_limiter.charge(current_user.id, cost)
+    try:
+        return await analysis_jobs.submit(current_user.id, "analyze-hand", request.dict())
+    except HTTPException:
+        # Too many active jobs; the job was never queued
+        compute_limiter.settle(current_user.id, cost, 0)
+        raise
+
+@api_router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get the status, and once completed the result, of a background job"""
+    job = await analysis_jobs.get(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def get_session(session_id: str, current_user: User) -> tuple:
+    """A user's session entry, 404 if missing, expired or owned by someone else"""
+    entry = hand_sessions.get(session_id)
+    if entry is None or entry[0] != current_user.id:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return entry
+
+async def advance_session(
+    session_id: str,
+    community_cards: List[Optional[Card]],
+    current_user: User
+) -> SessionAnalysis:
+    """Refine a session to a new board through the scheduler"""
+    entry = get_session(session_id, current_user)
+    _, lock, session, _ = entry
+
+    board = [card.to_treys_format() for card in community_cards if card]
+    if set(board) & set(session.dead_cards):
+        raise HTTPException(status_code=400, detail="Duplicate cards detected")
+
+    cost = session.pool_size * session.player_count
+    compute_limiter.charge(current_user.id, cost)
+
+    async with lock:
+        try:
+            result = await engine_scheduler.submit(
+                partial(session.advance, board),
+                user_id=current_user.id,
+                tier=user_tier(current_user),
+                cost=cost
+            )
+        except ValueError as e:
+            compute_limiter.refund(current_user.id, cost)
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception:
+            # The pool may be half-updated, so the session can't be refined further
+            compute_limiter.refund(current_user.id, cost)
+            hand_sessions.invalidate(session_id)
+            raise
+        # Only deals that were redealt or freshly sampled ran the evaluator
+        compute_limiter.settle(current_user.id, cost, (session.redealt + session.fresh) * session.player_count)
+
+    # Restart the session's lifetime, unless it was deleted meanwhile
+    hand_sessions.touch(session_id)
+    return SessionAnalysis(
+        session_id=session_id,
+        expires_in_seconds=SESSION_TTL,
+        analysis=to_response(result)
+    )
+
+@api_router.post("/sessions", response_model=SessionAnalysis)
+async def create_session(
+    request: SessionCreateRequest,
+    current_user: User = Depends(get_current_subscribed_user)
+):
+    """
+    Start a street-by-street analysis session and analyze the current street.
+
+    The engine keeps its sampled deals between calls, so adding the flop,
+    turn and river through POST /api/sessions/{session_id}/street refines the
+    previous estimate instead of starting over.
+    """
+    hole_cards, community_cards = parse_analysis_cards(AnalysisRequest(
+        hole_cards=request.hole_cards,
+        community_cards=request.community_cards,
+        player_count=request.player_count
+    ))
+
+    validate_cards(request.dead_cards, "dead")
+    dead_cards = [Card(rank=card.rank, suit=card.suit).to_treys_format() for card in request.dead_cards]
+    hole = [card.to_treys_format() for card in hole_cards]
+    if len(set(dead_cards)) != len(dead_cards) or set(dead_cards) & set(hole):
+        raise HTTPException(status_code=400, detail="Duplicate cards detected")
+
+    # Keep one user from filling the shared session cache
+    owned = [key for key, entry in hand_sessions.items() if entry[0] == current_user.id]
+    for key in owned[:max(0, len(owned) - MAX_SESSIONS_PER_USER + 1)]:
+        hand_sessions.invalidate(key)
+
+    session_id = str(uuid.uuid4())
+    session = HandSession(poker_engine, hole, request.player_count, dead_cards, request.pool_size)
+    hand_sessions.set(session_id, (current_user.id, asyncio.Lock(), session, request.hole_cards))
+
+    try:
+        return await advance_session(session_id, community_cards, current_user)
+    except Exception:
+        # A session whose first street failed has nothing to refine
+        hand_sessions.invalidate(session_id)
+        raise
+
+@api_router.post("/sessions/{session_id}/street", response_model=SessionAnalysis)
+async def add_session_street(
+    session_id: str,
+    request: SessionStreetRequest,
+    current_user: User = Depends(get_current_subscribed_user)
+):
+    """Analyze the next street of a session; the board must extend the previous one"""
+    _, _, session, hole_cards = get_session(session_id, current_user)
+    _, community_cards = parse_analysis_cards(AnalysisRequest(
+        hole_cards=hole_cards,
+        community_cards=request.community_cards,
+        player_count=session.player_count
+    ))
+    return await advance_session(session_id, community_cards, current_user)
+
+@api_router.delete("/sessions/{session_id}")
+async def delete_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """End a session and release its state"""
+    get_session(session_id, current_user)
+    hand_sessions.invalidate(session_id)
+    return {"message": "Session deleted"}
+
+def parse_board(cards: list, label: str = "community") -> List[int]:
+    """
+    Batch evaluator indices of request cards.
+
+    Raises HTTPException(400) for malformed or duplicate cards and more than
+    five of them.
+    """
+    validate_cards(cards, label)
+    if len(cards) > 5:
+        raise HTTPException(status_code=400, detail="Maximum 5 community cards allowed")
+
+    board = [card_index(Card(rank=card.rank, suit=card.suit).to_treys_format()) for card in cards]
+    if len(set(board)) != len(board):
+        raise HTTPException(status_code=400, detail="Duplicate cards detected")
+    return board
+
+@api_router.post("/equity-grid", response_model=EquityGrid)
+async def equity_grid(
+    request: EquityGridRequest,
+    current_user: User = Depends(get_current_subscribed_user)
+):
+    """
+    Equity of all 169 starting-hand classes on a board, for a heatmap.
+
+    Every runout is evaluated once for all 1,326 combos in a single
+    vectorized pass instead of one analysis per hand. Grids are cached per
+    board up to a relabeling of suits. The computation stops at
+    MAX_ANALYSIS_TIME_MS; runouts and deals report how far it got, and such
+    partial grids are not cached.
+    """
+    community_cards = [card for card in request.community_cards if card]
+    board = parse_board(community_cards)
+
+    key = (canonical_board(board), request.player_count, request.samples)
+    grid = grid_cache.get(key)
+    cached = grid is not None
+    if not cached:
+        cost = request.samples * request.player_count
+        compute_limiter.charge(current_user.id, cost)
+
+        async def compute():
+            result = await engine_scheduler.submit(
+                partial(
+                    compute_equity_grid, list(key[0]), request.player_count, request.samples,
+                    time_budget_ms=MAX_ANALYSIS_TIME_MS
+                ),
+                user_id=current_user.id,
+                tier=user_tier(current_user),
+                cost=cost
+            )
+            if result.complete:
+                grid_cache.set(key, result)
+            return result
+
+        try:
+            grid = await analysis_flight.do(("equity-grid",) + key, compute, cost=cost)
+        except Exception:
+            compute_limiter.settle(current_user.id, cost, 0)
+            raise
+        compute_limiter.settle(current_user.id, cost, grid.deals * request.player_count)
+
+    return EquityGrid(
+        community_cards=community_cards,
+        player_count=request.player_count,
+        ranks=GRID_RANKS,
+        scale=EQUITY_SCALE,
+        equity=grid.equity,
+        runouts=grid.runouts,
+        deals=grid.deals,
+        enumerated=grid.enumerated,
+        cached=cached
+    )
+
+@api_router.post("/board-texture", response_model=BoardTexture)
+async def board_texture(
+    request: BoardTextureRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Texture of a flop, turn or river: pairing, suits, connectedness and the
+    nut hand. With hole cards, also counts the opponent combos that beat or
+    tie them. Boards are scored once per relabeling of suits and cached.
+    """
+    board = parse_board([card for card in request.community_cards if card])
+    hole_cards = parse_board(request.hole_cards or [], label="hole")
+    if hole_cards and len(hole_cards) != 2:
+        raise HTTPException(status_code=400, detail="Exactly 2 hole cards are required")
+    try:
+        texture = analyze_board(board, hole_cards, cache=texture_cache)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return BoardTexture(**asdict(texture))
+
+@api_router.post("/icm", response_model=IcmResult)
+async def icm(
+    request: IcmRequest,
+    current_user: User = Depends(get_current_subscribed_user)
+):
+    """
+    Tournament prize equity of each stack under the Malmuth-Harville (ICM) model.
+    """
+    try:
+        equities = icm_equity(request.stacks, request.payouts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    total = sum(request.stacks)
+    return IcmResult(
+        equities=[round(value, 4) for value in equities],
+        chip_shares=[round(stack / total * 100, 2) if total else 0.0 for stack in request.stacks]
+    )
+
+@api_router.get("/hand-history", response_model=HandHistoryPage)
+async def get_hand_history(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """
+    Get the current user's analyzed hands, newest first.
+
+    Pass the returned next_cursor to fetch the following page.
+    """
+    try:
+        return await get_hand_history_page(db, current_user.id, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@api_router.get("/stats", response_model=UserStats)
+async def get_stats(
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """
+    Get the current user's analysis statistics.
+
+    Served from aggregates maintained as hand history is written.
+    """
+    return await get_user_stats(db, current_user.id)
+
+@api_router.get("/usage", response_model=ComputeUsage)
+async def get_usage(current_user: User = Depends(get_current_user)):
+    """Get the current user's compute budget and usage counters"""
+    return compute_limiter.usage(current_user.id)
+
 @api_router.get("/hand-rankings")
 async def get_hand_rankings():
     """
@@ -176,6 +707,31 @@ async def get_hand_rankings():
 async def root():
     return {"message": "Poker Probability Calculator API", "version": "1.0.0"}
 
+# Metrics are for operators only: requests must send METRICS_TOKEN in the
+# X-Metrics-Token header, and the endpoint is closed while it is unset
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    if not METRICS_TOKEN or not x_metrics_token or not hmac.compare_digest(x_metrics_token, METRICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Metrics access denied")
+
+@api_router.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    """Internal counters for background services"""
+    return {
+        "hand_history": hand_history_writer.metrics(),
+        "database": {"slow_commands": slow_query_listener.slow_commands},
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "analysis_coalescing": analysis_flight.metrics(),
+        "jobs": analysis_jobs.metrics(),
+        "scheduler": engine_scheduler.metrics(),
+        "compute_limit": compute_limiter.metrics(),
+        "sessions": hand_sessions.stats(),
+        "equity_grid_cache": grid_cache.stats(),
+        "board_texture_cache": texture_cache.stats()
+    }
+
 @api_router.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -204,6 +760,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_background_services():
+    await ensure_indexes(db)
+    await audit_query_plans(db)
+    # Scheduler tiers come from subscription_plan, missing for older subscribers
+    backfilled = await backfill_subscription_plans(db)
+    if backfilled:
+        logger.info(f"Backfilled subscription plans for {backfilled} users")
+    hand_history_writer.start()
+    await analysis_jobs.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    # Stop jobs and flush buffered hand history before the connection goes away
+    await analysis_jobs.stop()
+    await hand_history_writer.stop()
+    client.close()
+    engine_executor.shutdown(wait=False)
\ No newline at end of file
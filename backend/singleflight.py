@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key onto one in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it
+    runs await the same task and receive the same result or exception. The
+    task is shielded, so a caller disconnecting does not cancel the work for
+    the others. Nothing is cached once the task completes.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+        # Counters exposed through metrics()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.coalesced_cost = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], cost: int = 0) -> Any:
+        """Run fn() unless an identical call is already in flight; cost feeds the metrics"""
+        self.calls += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            self.coalesced_cost += cost
+
+        return await asyncio.shield(task)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            "coalesced_cost": self.coalesced_cost
+        }
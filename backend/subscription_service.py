@@ -38,6 +38,44 @@ SUBSCRIPTION_PACKAGES: Dict[str, SubscriptionPackage] = {
     )
 }
 
+async def backfill_subscription_plans(db: AsyncIOMotorDatabase) -> int:
+    """
+    Set subscription_plan on active users who subscribed before it was stored
+
+    The plan is the package of the payment named by the user's subscription_id,
+    or else of their latest paid transaction. Safe to run on every startup:
+    only users without a plan are read. Returns the number of users updated.
+    """
+    # Import here to avoid circular imports
+    from auth_service import user_cache
+
+    updated = 0
+    users = db.users.find(
+        {"subscription_status": "active", "subscription_plan": None},
+        {"_id": 0, "id": 1, "subscription_id": 1}
+    )
+    async for user in users:
+        transaction = None
+        if user.get("subscription_id"):
+            transaction = await db.payment_transactions.find_one(
+                {"session_id": user["subscription_id"], "payment_status": "paid"}, {"package_id": 1}
+            )
+        if transaction is None:
+            transaction = await db.payment_transactions.find_one(
+                {"user_id": user["id"], "payment_status": "paid"}, {"package_id": 1},
+                sort=[("updated_at", -1)]
+            )
+
+        plan = transaction.get("package_id") if transaction else None
+        if plan in SUBSCRIPTION_PACKAGES:
+            await db.users.update_one(
+                {"id": user["id"], "subscription_plan": None},
+                {"$set": {"subscription_plan": plan}}
+            )
+            user_cache.invalidate(user["id"])
+            updated += 1
+    return updated
+
 class SubscriptionService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
@@ -150,7 +188,8 @@ class SubscriptionService:
                 await auth_service.update_user_subscription(
                     user_id=user_id,
                     subscription_status="active",
-                    subscription_id=session_id
+                    subscription_id=session_id,
+                    subscription_plan=transaction.get("package_id")
                 )
     
     async def handle_webhook(self, webhook_body: bytes, signature: str):
@@ -202,5 +241,6 @@ class SubscriptionService:
                 await auth_service.update_user_subscription(
                     user_id=user_id,
                     subscription_status="active",
-                    subscription_id=session_id
+                    subscription_id=session_id,
+                    subscription_plan=transaction.get("package_id")
                 )
\ No newline at end of file
@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from cache import TTLCache
+
+def test_set_after_invalidation_is_dropped():
+    cache = TTLCache(max_size=10, ttl=60)
+
+    # A reader misses and loads while a writer invalidates the entry
+    generation = cache.generation()
+    cache.invalidate("user")
+    cache.set("user", {"plan": "monthly"}, generation=generation)
+    assert cache.get("user") is None
+
+    generation = cache.generation()
+    cache.set("user", {"plan": "yearly"}, generation=generation)
+    assert cache.get("user") == {"plan": "yearly"}
+
+def test_entries_expire_and_evict_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert [key for key, _ in cache.items()] == ["a", "c"]
+    assert cache.evictions == 1
+
+    cache.set("d", 4, ttl=0)
+    assert cache.get("d") is None
+    assert not cache.touch("d")
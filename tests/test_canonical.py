@@ -0,0 +1,77 @@
+import itertools
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from canonical import canonicalize, enumerate_canonical, permute, restore
+from poker_engine import Card, PokerEngine
+
+SUIT_NAMES = ["clubs", "diamonds", "hearts", "spades"]
+RANK_NAMES = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
+
+def test_isomorphic_situations_share_a_canonical_form():
+    rng = random.Random(3)
+    for _ in range(500):
+        cards = rng.sample(range(52), rng.randint(2, 9))
+        hole, board, dead = cards[:2], cards[2:7], cards[7:]
+        canonical = canonicalize(hole, board, dead)
+        for perm in itertools.permutations(range(4)):
+            other = canonicalize(
+                rng.sample(permute(hole, perm), len(hole)),
+                rng.sample(permute(board, perm), len(board)),
+                rng.sample(permute(dead, perm), len(dead))
+            )
+            assert other.situation == canonical.situation
+            assert other.key == canonical.key
+
+def test_restore_maps_canonical_cards_back():
+    rng = random.Random(5)
+    for _ in range(200):
+        cards = rng.sample(range(52), 7)
+        canonical = canonicalize(cards[:2], cards[2:])
+        assert sorted(restore(canonical.situation.board, canonical)) == sorted(cards[2:])
+        assert sorted(restore(canonical.situation.hole, canonical)) == sorted(cards[:2])
+
+def test_enumeration_covers_every_situation_once():
+    preflop = list(enumerate_canonical("preflop"))
+    assert len(preflop) == 169
+    assert sum(canonical.weight for canonical in preflop) == 1326
+
+    flops = list(enumerate_canonical("flop", hole_cards=0))
+    assert len(flops) == 1755
+    assert sum(canonical.weight for canonical in flops) == 22100
+    assert len({canonical.key for canonical in flops}) == 1755
+
+def cards_for(indices):
+    return [Card(rank=RANK_NAMES[index >> 2], suit=SUIT_NAMES[index & 3]) for index in indices]
+
+def test_isomorphic_inputs_give_identical_engine_outputs():
+    engine = PokerEngine()
+    # A♥ K♥ on K♠ 7♥ 2♥, and the same hand with suits relabeled
+    hole, board = [12 * 4 + 2, 11 * 4 + 2], [11 * 4 + 3, 5 * 4 + 2, 0 * 4 + 2]
+    results = []
+    for perm in [(0, 1, 2, 3), (3, 0, 1, 2), (1, 3, 0, 2)]:
+        random.seed(11)
+        result = engine.analyze_hand(
+            cards_for(permute(hole, perm)),
+            cards_for(permute(board, perm)[::-1]),
+            player_count=3,
+            simulation_iterations=10000
+        )
+        results.append((perm, result))
+
+    _, first = results[0]
+    for perm, result in results[1:]:
+        assert result.win_probability == first.win_probability
+        assert result.tie_probability == first.tie_probability
+        assert result.draws.improve_probability == first.draws.improve_probability
+
+        # Next-card results are in the caller's suits; suits that play no part
+        # in the hand are interchangeable, so compare them per rank
+        def by_rank(draws):
+            return sorted((entry.card['rank'], entry.win_probability, entry.tie_probability) for entry in draws.next_cards)
+        assert by_rank(result.draws) == by_rank(first.draws)
+        suits = {card['suit'] for card in result.draws.outs}
+        assert SUIT_NAMES[perm[2]] in suits
@@ -0,0 +1,84 @@
+import itertools
+import math
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from colex import (
+    HAND_COUNT, open_table, rank_combo, rank_combos, rank_hand, rank_situation,
+    situation_count, unrank_combo, unrank_situation
+)
+
+def test_ranks_are_contiguous_for_every_combo():
+    for k in range(1, 5):
+        combos = np.array(list(itertools.combinations(range(52), k)), dtype=np.intp)
+        ranks = np.sort(rank_combos(combos))
+        assert np.array_equal(ranks, np.arange(math.comb(52, k))), k
+
+def test_scalar_and_vector_ranks_agree():
+    rng = random.Random(1)
+    for _ in range(2000):
+        cards = rng.sample(range(52), rng.randint(1, 7))
+        assert rank_combo(cards) == int(rank_combos(np.array([cards]))[0])
+        assert rank_combo(cards) == rank_combo(reversed(cards))
+
+def test_hand_ranks_cover_every_two_card_hand():
+    ranks = sorted(rank_hand(first, second) for first, second in itertools.combinations(range(52), 2))
+    assert ranks == list(range(HAND_COUNT))
+    assert rank_hand(51, 0) == rank_hand(0, 51) == rank_combo([0, 51])
+
+def test_unrank_round_trips():
+    for k in range(1, 4):
+        for rank in range(math.comb(52, k)):
+            cards = unrank_combo(rank, k)
+            assert list(cards) == sorted(set(cards)) and len(cards) == k
+            assert rank_combo(cards) == rank
+
+    rng = random.Random(2)
+    for k in range(4, 8):
+        for _ in range(2000):
+            rank = rng.randrange(math.comb(52, k))
+            assert rank_combo(unrank_combo(rank, k)) == rank
+            cards = tuple(sorted(rng.sample(range(52), k)))
+            assert unrank_combo(rank_combo(cards), k) == cards
+
+def test_situation_indexes_are_dense():
+    count = situation_count(2, 1)
+    assert count == HAND_COUNT * 50
+    seen = bytearray(count)
+    for hole in itertools.combinations(range(52), 2):
+        for card in range(52):
+            if card in hole:
+                continue
+            index = rank_situation(hole, [card])
+            assert unrank_situation(index, 2, 1) == (hole, (card,))
+            seen[index] += 1
+    assert all(hit == 1 for hit in seen)
+
+def test_situation_round_trips_on_later_streets():
+    rng = random.Random(3)
+    for board_cards in (3, 4, 5):
+        count = situation_count(2, board_cards)
+        for _ in range(2000):
+            cards = rng.sample(range(52), 2 + board_cards)
+            hole, board = tuple(sorted(cards[:2])), tuple(sorted(cards[2:]))
+            index = rank_situation(hole, board)
+            assert 0 <= index < count
+            assert rank_situation(reversed(hole), board[::-1]) == index
+            assert unrank_situation(index, 2, board_cards) == (hole, board)
+
+def test_open_table_addresses_one_slot_per_situation(tmp_path):
+    path = str(tmp_path / "flop.bin")
+    table = open_table(path, 2, 1, mode="w+")
+    assert len(table) == situation_count(2, 1)
+    table[rank_situation([12 * 4 + 3, 12 * 4 + 2], [0])] = 0.85
+    table.flush()
+    del table
+
+    table = open_table(path, 2, 1)
+    assert table[rank_situation([12 * 4 + 2, 12 * 4 + 3], [0])] == np.float32(0.85)
+    assert np.count_nonzero(table) == 1
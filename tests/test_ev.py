@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ev import BettingContext, best_action, expected_values, pot_odds, raise_amount
+
+def test_pot_odds():
+    # Calling 50 into 150 (100 plus the bet) wins 200
+    assert pot_odds(BettingContext(pot=150, to_call=50, stack=1000)) == pytest.approx(25.0)
+    assert pot_odds(BettingContext(pot=100, to_call=0, stack=1000)) == 0.0
+    # Short stack: 40 of the 100 bet is called and 60 goes back to the bettor
+    assert pot_odds(BettingContext(pot=200, to_call=100, stack=40)) == pytest.approx(40 / 180 * 100)
+
+def test_raise_amount():
+    # Pot-sized: call 50, then raise by the 200 pot after calling
+    assert raise_amount(BettingContext(pot=150, to_call=50, stack=1000)) == 250
+    assert raise_amount(BettingContext(pot=100, to_call=0, stack=1000)) == 100
+    assert raise_amount(BettingContext(pot=150, to_call=50, stack=120)) == 120
+    assert raise_amount(BettingContext(pot=150, to_call=50, stack=1000, raise_to=400)) == 400
+    assert raise_amount(BettingContext(pot=150, to_call=50, stack=300, raise_to=400)) == 300
+
+def test_expected_values_heads_up():
+    context = BettingContext(pot=150, to_call=50, stack=1000)
+    evs = expected_values(50.0, context, opponents=1)
+    assert evs["fold"] == 0.0
+    assert evs["call"] == pytest.approx(0.5 * 200 - 50)
+    # Hero puts in 250, the bettor adds 200 on top of the 50 already in the pot
+    assert evs["raise"] == pytest.approx(0.5 * (150 + 250 + 200) - 250)
+
+def test_multiway_callers_also_owe_the_bet():
+    context = BettingContext(pot=150, to_call=50, stack=1000)
+    evs = expected_values(40.0, context, opponents=3)
+    # Bettor adds 200; the two opponents still to act put in 250 each
+    assert evs["raise"] == pytest.approx(0.4 * (150 + 250 + 200 + 2 * 250) - 250)
+
+    # Unopened pot: every opponent calls the full bet
+    unopened = BettingContext(pot=100, to_call=0, stack=1000)
+    assert expected_values(40.0, unopened, opponents=3)["raise"] == pytest.approx(0.4 * (100 + 4 * 100) - 100)
+
+def test_opponent_stack_caps_what_opponents_put_in():
+    context = BettingContext(pot=150, to_call=50, stack=1000, opponent_stack=120)
+    evs = expected_values(40.0, context, opponents=3)
+    # Hero's raise is only matched up to 120; others put in at most 120
+    assert evs["raise"] == pytest.approx(0.4 * (150 + 170 + 120 + 2 * 120) - 170)
+
+def test_no_raise_when_the_stack_only_covers_a_call():
+    evs = expected_values(60.0, BettingContext(pot=200, to_call=100, stack=80), opponents=1)
+    assert set(evs) == {"fold", "call"}
+    # 20 of the bet goes back to the bettor
+    assert evs["call"] == pytest.approx(0.6 * (200 - 20 + 80) - 80)
+
+def test_best_action():
+    context = BettingContext(pot=150, to_call=50, stack=1000)
+    action, evs, stable = best_action(10.0, 1.0, context, opponents=1)
+    assert (action, stable) == ("fold", True)
+    assert evs == expected_values(10.0, context, opponents=1)
+
+    # Pot odds are 25%; raising (600 contested for 250) beats calling above 50%
+    assert best_action(35.0, 1.0, context, opponents=1)[0] == "call"
+    assert best_action(70.0, 1.0, context, opponents=1)[0] == "raise"
+
+    action, _, stable = best_action(25.5, 1.0, context, opponents=1)
+    assert action == "call" and not stable
@@ -0,0 +1,147 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from hand_history import (
+    CARD_RANKS, CARD_SUITS, _decode_cursor, _encode_cursor, _to_entry, decode_card,
+    decode_hand_history, encode_card, encode_hand_history
+)
+from models import AnalysisRequest, AnalysisResponse, Card, HandHistory
+from poker_engine import ACTION_CODES, EV_CONFIDENCES, OPPONENT_PROFILES, RECOMMENDATIONS
+
+TIMESTAMP = datetime(2026, 3, 14, 15, 9, 26, 535000)
+
+def cards(*names):
+    """Cards from short names, e.g. cards("Ah", "10c")"""
+    suits = {suit[0]: suit for suit in CARD_SUITS}
+    return [Card(rank=name[:-1], suit=suits[name[-1]]) for name in names]
+
+def make_response(player_count, recommendation, method, confidence, completed, hand=("Pair", "made_hand")):
+    return AnalysisResponse(
+        win_probability=62.35,
+        tie_probability=1.5,
+        lose_probability=36.15,
+        hand_strength={"name": hand[0], "description": "Pair of Kings", "strength": 2, "category": hand[1]},
+        opponent_ranges=[
+            {"profile": profile, "range": range_text, "likely_holdings": list(holdings)}
+            for profile, range_text, holdings in OPPONENT_PROFILES[:min(player_count - 1, len(OPPONENT_PROFILES))]
+        ],
+        recommendation=recommendation,
+        calculations={
+            "method": method,
+            "confidence": confidence,
+            "cards_remaining": 47,
+            "simulation_time_ms": 183,
+            "iterations_completed": completed
+        }
+    )
+
+def round_trip(request, response):
+    doc = encode_hand_history(request, response, "user", TIMESTAMP, history_id="hand")
+    history = decode_hand_history(doc)
+    assert history.id == "hand"
+    assert history.user_id == "user"
+    assert history.timestamp == TIMESTAMP
+    assert history.analysis_request == request
+    assert history.analysis_response == response
+    return doc
+
+def test_cards_round_trip():
+    codes = [encode_card(Card(rank=rank, suit=suit)) for rank in CARD_RANKS for suit in CARD_SUITS]
+    assert sorted(codes) == list(range(52))
+    assert all(encode_card(decode_card(code)) == code for code in codes)
+
+def test_table_recommendation_round_trips_as_codes():
+    request = AnalysisRequest(
+        hole_cards=cards("Kh", "Kd"),
+        community_cards=cards("Kc", "7s", "2h") + [None, None],
+        player_count=6,
+        simulation_iterations=20000
+    )
+    action, reason, confidence = RECOMMENDATIONS[0]
+    response = make_response(
+        6,
+        {"action": action, "reason": reason, "confidence": confidence, "action_code": ACTION_CODES[action]},
+        "Monte Carlo (20,000 simulations)", "±0.67%", 20000
+    )
+    doc = round_trip(request, response)
+    assert doc["v"] == 4
+    assert doc["r"] == 0
+    assert doc["c"][:2] == [1, 67]
+    assert doc["s"][0] != "Pair"
+
+def test_ev_recommendation_and_options_round_trip():
+    request = AnalysisRequest(
+        hole_cards=cards("As", "10s"),
+        community_cards=cards("Js", "9s", "2d", "Qc") + [None],
+        player_count=4,
+        simulation_iterations=50000,
+        opponents=[
+            {"hole_cards": cards("Kd", "Kc")},
+            {"range": "QQ+, AKs"},
+            {}
+        ],
+        betting={"pot": 150, "to_call": 50, "stack": 1000, "raise_to": 400, "opponent_stack": 800},
+        tournament={"stacks": [4000, 2500, 1200, 800], "payouts": [50, 30, 20], "hero_seat": 1, "opponent_seat": 0, "pot": 300},
+        include_distribution=True
+    )
+    response = make_response(
+        4,
+        {
+            "action": "Call",
+            "reason": "41.2% equity against 25.0% pot odds; call EV +32.40 chips",
+            "confidence": EV_CONFIDENCES[1],
+            "expected_values": {"Fold": 0.0, "Call": 32.4, "Raise": -11.5},
+            "pot_odds": 25.0,
+            "action_code": "call"
+        },
+        "Exact enumeration (44 deals)", "±0.00%", 44
+    )
+    doc = round_trip(request, response)
+    assert doc["r"][0] == 2 and doc["r"][2] == 1
+    assert doc["r"][3] == [0.0, 32.4, -11.5]
+    assert doc["c"][0] == 2
+    assert doc["o"] == [[encode_card(card) for card in cards("Kd", "Kc")], "QQ+, AKs", None]
+
+def test_values_outside_the_tables_round_trip_as_text():
+    request = AnalysisRequest(
+        hole_cards=cards("7c", "2d"),
+        community_cards=[None] * 5,
+        player_count=2,
+        simulation_iterations=10000,
+        betting={"pot": 100, "to_call": 0, "stack": 50}
+    )
+    response = make_response(
+        2,
+        {"action": "Shove", "reason": "Short stack", "confidence": "Medium", "action_code": None},
+        "Lookup table", "n/a", None,
+        hand=("Seven High", "trash")
+    )
+    doc = round_trip(request, response)
+    assert doc["s"][0] == "Seven High" and doc["s"][3] == "trash"
+    assert doc["r"][:3] == ["Shove", "Short stack", "Medium"]
+    assert doc["c"][:2] == ["Lookup table", "n/a"]
+
+def test_legacy_documents_decode_and_list_like_compact_ones():
+    request = AnalysisRequest(hole_cards=cards("Ah", "Kh"), community_cards=[None] * 5, player_count=3)
+    action, reason, confidence = RECOMMENDATIONS[1]
+    response = make_response(
+        3, {"action": action, "reason": reason, "confidence": confidence},
+        "Monte Carlo (100,000 simulations)", "±0.30%", None
+    )
+    legacy = HandHistory(id="old", analysis_request=request, analysis_response=response, timestamp=TIMESTAMP).dict()
+    assert decode_hand_history(legacy).analysis_response == response
+
+    compact = encode_hand_history(request, response, None, TIMESTAMP, history_id="old")
+    assert _to_entry(legacy) == _to_entry(compact)
+
+def test_cursors_round_trip_and_reject_bad_timestamps():
+    cursor = _encode_cursor({"timestamp": TIMESTAMP, "id": "hand_1"})
+    assert _decode_cursor(cursor) == (TIMESTAMP, "hand_1")
+    for bad in ("99999999999999999999_x", "-99999999999999999_x", "abc_x", "1700000000000"):
+        with pytest.raises(ValueError):
+            _decode_cursor(bad)
@@ -0,0 +1,97 @@
+import itertools
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from treys import Card, Evaluator
+
+from hand_tables import (
+    BACKDOOR, DOUBLE_GUTSHOT, GUTSHOT, NO_DRAW, OPEN_ENDED,
+    STRAIGHT_DRAW, STRAIGHT_HIGH, STRAIGHT_OUTS, classify_cards
+)
+
+RANKS = "23456789TJQKA"
+SUITS = "cdhs"
+
+def brute_straight_high(ranks):
+    """Top rank of the best straight in a set of rank indices, -1 if none"""
+    # The ace also plays as a one below the deuce
+    values = set(ranks) | ({-1} if 12 in ranks else set())
+    for top in range(12, 2, -1):
+        if all(value in values for value in range(top - 4, top + 1)):
+            return top
+    return -1
+
+def brute_draw(ranks):
+    outs = [rank for rank in range(13) if rank not in ranks and brute_straight_high(ranks | {rank}) >= 0]
+    if len(outs) >= 2:
+        # Open-ended: four in a row, completed by the rank just below or just above
+        values = set(ranks) | ({-1} if 12 in ranks else set())
+        for low in range(0, 9):
+            if all(value in values for value in range(low, low + 4)):
+                return outs, OPEN_ENDED
+        return outs, DOUBLE_GUTSHOT
+    if outs:
+        return outs, GUTSHOT
+    missing = [rank for rank in range(13) if rank not in ranks]
+    if any(brute_straight_high(ranks | {a, b}) >= 0 for a, b in itertools.combinations(missing, 2)):
+        return outs, BACKDOOR
+    return outs, NO_DRAW
+
+def test_straight_tables_match_brute_force_for_every_rank_mask():
+    for mask in range(1 << 13):
+        ranks = {rank for rank in range(13) if mask >> rank & 1}
+        assert STRAIGHT_HIGH[mask] == brute_straight_high(ranks), mask
+        if STRAIGHT_HIGH[mask] >= 0:
+            continue
+        outs, kind = brute_draw(ranks)
+        assert STRAIGHT_OUTS[mask] == sum(1 << rank for rank in outs), mask
+        assert STRAIGHT_DRAW[mask] == kind, mask
+
+def made_class(evaluator, cards):
+    # A royal flush is reported as a straight flush
+    hand_class = max(evaluator.get_rank_class(evaluator.evaluate(cards[:2], cards[2:])), 1)
+    return evaluator.class_to_string(hand_class)
+
+def test_made_hands_match_treys_for_every_rank_multiset():
+    evaluator = Evaluator()
+    for size in (5, 6):
+        for ranks in itertools.combinations_with_replacement(range(13), size):
+            if max(ranks.count(rank) for rank in ranks) > 4:
+                continue
+
+            # Consecutive suits never give five of one suit
+            cards = [Card.new(RANKS[rank] + SUITS[i % 4]) for i, rank in enumerate(ranks)]
+            name, _, _, category = classify_cards(cards)
+            expected = made_class(evaluator, cards)
+            if expected == "High Card":
+                assert category in ("high_card", "drawing_hand"), (ranks, name)
+            else:
+                assert name == expected, (ranks, name, expected)
+
+            # The same ranks with five distinct ones suited
+            distinct = sorted(set(ranks))
+            if len(distinct) >= 5:
+                suited = set(distinct[:5])
+                cards, used = [], set()
+                for i, rank in enumerate(ranks):
+                    suit = "s" if rank in suited and rank not in used else SUITS[i % 3]
+                    used.add(rank)
+                    cards.append(Card.new(RANKS[rank] + suit))
+                if len(set(cards)) == len(cards):
+                    name, _, _, _ = classify_cards(cards)
+                    assert name == made_class(evaluator, cards), (ranks, name)
+
+def test_flush_draws_on_random_flops_and_turns():
+    rng = random.Random(7)
+    deck = [Card.new(rank + suit) for rank in RANKS for suit in SUITS]
+    for _ in range(20000):
+        cards = rng.sample(deck, rng.choice((5, 6)))
+        suit_counts = [sum(1 for card in cards if (card >> 12) & 0xF == bit) for bit in (1, 2, 4, 8)]
+        name, description, _, _ = classify_cards(cards)
+        if max(suit_counts) == 4 and name in ("High Card", "Pair", "Flush Draw", "Straight Flush Draw", "Straight Draw"):
+            assert name in ("Flush Draw", "Straight Flush Draw") or "flush draw" in description, (cards, name)
+        if max(suit_counts) == 3 and len(cards) == 5 and name in ("High Card", "Pair"):
+            assert "backdoor flush draw" in description
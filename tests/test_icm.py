@@ -0,0 +1,66 @@
+import itertools
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from icm import MAX_ICM_PLAYERS, all_in_equity, icm_equity
+
+def brute_icm(stacks, payouts):
+    """Malmuth-Harville equity by walking every finishing order"""
+    equity = [0.0] * len(stacks)
+    for order in itertools.permutations(range(len(stacks))):
+        probability, rest = 1.0, sum(stacks)
+        for player in order:
+            probability *= stacks[player] / rest
+            rest -= stacks[player]
+        for place, player in enumerate(order[:len(payouts)]):
+            equity[player] += probability * payouts[place]
+    return equity
+
+@pytest.mark.parametrize("players", [3, 7])
+def test_icm_matches_every_finishing_order(players):
+    rng = random.Random(players)
+    for _ in range(20):
+        stacks = [rng.randint(1, 5000) for _ in range(players)]
+        payouts = sorted((rng.uniform(1, 100) for _ in range(rng.randint(1, players))), reverse=True)
+        expected = brute_icm(stacks, payouts)
+        actual = icm_equity(stacks, payouts)
+        assert actual == pytest.approx(expected, rel=1e-9, abs=1e-9), (stacks, payouts)
+        assert sum(actual) == pytest.approx(sum(payouts))
+
+def test_busted_players_split_the_places_below_everyone_left():
+    stacks, payouts = [3000, 0, 1500, 0, 500], [50, 30, 15, 5]
+    equity = icm_equity(stacks, payouts)
+    alive = brute_icm([3000, 1500, 500], payouts[:3])
+    assert [equity[0], equity[2], equity[4]] == pytest.approx(alive)
+    assert equity[1] == equity[3] == pytest.approx(5 / 2)
+
+def test_equal_stacks_share_equally():
+    equity = icm_equity([1000] * 6, [60, 40])
+    assert equity == pytest.approx([100 / 6] * 6)
+
+def test_invalid_tables_raise_value_error():
+    with pytest.raises(ValueError):
+        icm_equity([100] * (MAX_ICM_PLAYERS + 1), [50])
+    with pytest.raises(ValueError):
+        icm_equity([100, -1], [50])
+    with pytest.raises(ValueError):
+        icm_equity([100, 100], [])
+
+def test_calling_at_the_required_equity_breaks_even():
+    stacks, payouts = [4000, 2500, 1200, 800], [50, 30, 20]
+    result = all_in_equity(stacks, payouts, hero=1, opponent=0, win_probability=50.0, tie_probability=0.0, pot=300)
+    at_break_even = all_in_equity(
+        stacks, payouts, hero=1, opponent=0,
+        win_probability=result.required_equity, tie_probability=0.0, pot=300
+    )
+    assert at_break_even.call_equity == pytest.approx(at_break_even.fold_equity, abs=1e-2)
+    # Survival is worth more than chips near the money, so ICM asks for more equity
+    assert result.required_equity > result.chip_required_equity
+    assert result.chip_required_equity == pytest.approx(2500 / (2 * 2500 + 300) * 100, abs=0.01)
+    assert math.isclose(result.fold_equity, icm_equity([4300, 2500, 1200, 800], payouts)[1], abs_tol=1e-4)
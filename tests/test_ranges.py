@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+from treys import Card as TreysCard
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from poker_engine import Card, OpponentSpec, PokerEngine
+from ranges import parse_range
+
+def hands(text):
+    """Parsed combos as sorted card-string pairs, e.g. ("Ah", "Kh")"""
+    return {tuple(sorted(TreysCard.int_to_str(card) for card in combo)) for combo in parse_range(text)}
+
+@pytest.mark.parametrize("text, count", [
+    ("AA", 6), ("AKs", 4), ("AKo", 12), ("AK", 16), ("KA", 16),
+    ("QQ+", 18), ("22+", 78), ("ATs+", 16), ("ATo+", 48), ("AT+", 64),
+    ("22-55", 24), ("55-22", 24), ("A2s-A5s", 16), ("AhKh", 1),
+    ("QQ+, AKs, ATo+, 76s, 22-55, A2s-A5s, AhKh", 18 + 4 + 48 + 4 + 24 + 16)
+])
+def test_token_combo_counts(text, count):
+    assert len(parse_range(text)) == count
+
+def test_overlapping_tokens_are_counted_once():
+    assert len(parse_range("AK, AKs, AhKh")) == 16
+    assert len(parse_range("KK+, AA, QQ-KK")) == 18
+    assert hands("AsKs, KsAs") == {("As", "Ks")}
+
+def test_tokens_expand_to_the_expected_hands():
+    assert hands("AKs") == {("Ac", "Kc"), ("Ad", "Kd"), ("Ah", "Kh"), ("As", "Ks")}
+    assert {first[0] + second[0] for first, second in hands("ATs+")} == {"AT", "AJ", "AQ", "AK"}
+    assert {first[0] for first, _ in hands("22-55")} == {"2", "3", "4", "5"}
+    assert all(first[1] != second[1] for first, second in hands("ATo+"))
+
+@pytest.mark.parametrize("text", [
+    "", " , ", "AX", "AAs", "AAo+", "AK+s", "AhAh", "A2s-A5o", "22-A5s", "A2s-K5s", "1010", "Ahk"
+])
+def test_invalid_ranges_raise_value_error(text):
+    with pytest.raises(ValueError):
+        parse_range(text)
+
+def test_known_cards_block_range_combos():
+    engine = PokerEngine()
+    hole = [Card(rank="A", suit="spades"), Card(rank="A", suit="hearts")]
+    board = [Card(rank="A", suit="diamonds"), Card(rank="7", suit="clubs"), Card(rank="2", suit="hearts"), None, None]
+
+    # Hero and the board hold three aces, so AA has no combo left
+    with pytest.raises(ValueError):
+        engine.analyze_hand(hole, board, 2, 10000, opponents=[OpponentSpec(range="AA")])
+
+    # Only the four AK combos with the club ace remain, all drawing thin against a set
+    result = engine.analyze_hand(hole, board, 2, 10000, opponents=[OpponentSpec(range="AK")])
+    assert result.win_probability > 90
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from rate_limit import ComputeRateLimiter
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    # Refills slowly enough that a test never sees a whole token come back
+    store_path = str(tmp_path / "buckets.db") if request.param == "sqlite" else None
+    return ComputeRateLimiter(capacity=1000, refill_per_second=0.001, store_path=store_path)
+
+def test_charge_rejects_with_retry_after(limiter):
+    limiter.charge("user", 600)
+    with pytest.raises(HTTPException) as error:
+        limiter.charge("user", 600)
+    assert error.value.status_code == 429
+    # 200 missing tokens at 0.001 per second
+    assert int(error.value.headers["Retry-After"]) == pytest.approx(200000, abs=1)
+
+    usage = limiter.usage("user")
+    assert usage["available"] == 400
+    assert (usage["charged"], usage["requests"], usage["rejected"]) == (600, 1, 1)
+    assert limiter.metrics() == {"allowed": 1, "rejected": 1, "store_errors": 0}
+
+def test_oversized_requests_cost_at_most_a_full_bucket(limiter):
+    limiter.charge("user", 5000)
+    assert limiter.usage("user")["available"] == 0
+
+def test_refund_returns_tokens_and_charged(limiter):
+    limiter.charge("user", 600)
+    limiter.refund("user", 600)
+    usage = limiter.usage("user")
+    assert (usage["available"], usage["charged"]) == (1000, 0)
+    limiter.charge("user", 1000)
+
+def test_settle_refunds_under_use(limiter):
+    limiter.charge("user", 600)
+    limiter.settle("user", 600, 250)
+    usage = limiter.usage("user")
+    assert (usage["available"], usage["charged"]) == (750, 250)
+
+def test_settle_takes_over_use_without_rejecting(limiter):
+    limiter.charge("user", 600)
+    limiter.settle("user", 600, 1500)
+    usage = limiter.usage("user")
+    assert usage["available"] == pytest.approx(-500, abs=1)
+    assert (usage["charged"], usage["rejected"]) == (1500, 0)
+    with pytest.raises(HTTPException):
+        limiter.charge("user", 1)
+
+def test_users_have_separate_buckets(limiter):
+    limiter.charge("first", 1000)
+    limiter.charge("second", 1000)
+    with pytest.raises(HTTPException):
+        limiter.charge("first", 1)
+
+def test_sqlite_buckets_are_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    first = ComputeRateLimiter(capacity=1000, refill_per_second=0.001, store_path=path)
+    second = ComputeRateLimiter(capacity=1000, refill_per_second=0.001, store_path=path)
+    first.charge("user", 800)
+    with pytest.raises(HTTPException):
+        second.charge("user", 800)
+
+def test_locked_store_fails_open(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    limiter = ComputeRateLimiter(capacity=1000, refill_per_second=0.001, store_path=path)
+    limiter.charge("user", 1000)
+
+    # Another process holding the write lock
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        limiter.charge("user", 1000)
+        limiter.settle("user", 1000, 0)
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+
+    assert limiter.metrics()["store_errors"] == 2
+    # Nothing was written while the store was locked
+    assert limiter.usage("user")["available"] == 0
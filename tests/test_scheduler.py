@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from scheduler import TIER_WEIGHTS, EngineScheduler
+
+def run_queued(submissions, weights=TIER_WEIGHTS):
+    """
+    Order in which queued tasks reach the executor
+
+    A first task holds the only slot until everything else is queued, so the
+    order is decided by the scheduler alone.
+    """
+    async def main():
+        executor = ThreadPoolExecutor(max_workers=1)
+        scheduler = EngineScheduler(executor, slots=1, weights=weights)
+        release = threading.Event()
+        order = []
+
+        blocker = asyncio.ensure_future(scheduler.submit(release.wait, user_id="blocker"))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.ensure_future(scheduler.submit(
+                lambda label=label: order.append(label), user_id=user, tier=tier, cost=cost, interactive=interactive
+            ))
+            for label, user, tier, cost, interactive in submissions
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(blocker, *tasks)
+        executor.shutdown()
+        return order, scheduler.metrics()
+
+    return asyncio.run(main())
+
+def test_tiers_are_served_in_proportion_to_their_weights():
+    submissions = []
+    for i in range(40):
+        submissions.append(("yearly", "yearly-user", "yearly", 1000, True))
+        submissions.append(("default", "default-user", "default", 1000, True))
+    order, metrics = run_queued(submissions)
+
+    # While both users have work queued, yearly gets 3 tasks for every default one
+    first = order[:40]
+    assert first.count("yearly") == 30
+    assert first.count("default") == 10
+    assert metrics["dispatched"] == {"default": 41, "yearly": 40}
+
+def test_cost_is_shared_not_task_count():
+    submissions = []
+    for i in range(20):
+        submissions.append(("cheap", "cheap-user", "default", 1000, True))
+    for i in range(5):
+        submissions.append(("expensive", "expensive-user", "default", 4000, True))
+    order, _ = run_queued(submissions)
+
+    # Equal weights: four cheap tasks cost as much as one expensive one
+    first = order[:10]
+    assert first.count("cheap") == 8
+    assert first.count("expensive") == 2
+
+def test_interactive_work_goes_before_batch():
+    submissions = [("batch", "user-a", "yearly", 1, False) for _ in range(5)]
+    submissions += [("interactive", "user-b", "default", 100000, True) for _ in range(5)]
+    order, metrics = run_queued(submissions)
+    assert order == ["interactive"] * 5 + ["batch"] * 5
+    assert metrics["dispatched"]["batch"] == 5
+
+def test_unknown_tiers_get_the_default_weight():
+    submissions = []
+    for i in range(20):
+        submissions.append(("unknown", "user-a", "legacy-plan", 1000, True))
+        submissions.append(("default", "user-b", "default", 1000, True))
+    order, _ = run_queued(submissions)
+    first = order[:20]
+    assert first.count("unknown") == first.count("default") == 10
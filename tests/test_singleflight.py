@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from singleflight import SingleFlight
+
+def counting(result="done"):
+    """An async function that records how many times it ran and waits to be released"""
+    calls = []
+    release = asyncio.Event()
+
+    async def fn():
+        calls.append(1)
+        await release.wait()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return fn, calls, release
+
+def test_identical_concurrent_calls_run_once():
+    async def main():
+        flight = SingleFlight()
+        fn, calls, release = counting()
+        callers = [asyncio.ensure_future(flight.do(("analysis", 1), fn, cost=100)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers)
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == ["done"] * 3
+    metrics = flight.metrics()
+    assert (metrics["calls"], metrics["executions"], metrics["coalesced"]) == (3, 1, 2)
+    assert metrics["coalesced_cost"] == 200
+    assert metrics["in_flight"] == 0
+
+def test_different_keys_and_later_calls_run_separately():
+    async def main():
+        flight = SingleFlight()
+        fn, calls, release = counting()
+        release.set()
+        await asyncio.gather(flight.do("a", fn), flight.do("b", fn))
+        # Nothing is cached once the first flight lands
+        await flight.do("a", fn)
+        return calls
+
+    assert len(asyncio.run(main())) == 3
+
+def test_every_caller_sees_the_exception():
+    async def main():
+        flight = SingleFlight()
+        fn, calls, release = counting(ValueError("blocked range"))
+        callers = [asyncio.ensure_future(flight.do("key", fn)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        return calls, await asyncio.gather(*callers, return_exceptions=True)
+
+    calls, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def main():
+        flight = SingleFlight()
+        fn, calls, release = counting()
+        first = asyncio.ensure_future(flight.do("key", fn))
+        second = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"